@@ -0,0 +1,926 @@
+#!/usr/bin/env python3
+"""Benchmark the command handler against a stand-in Intentgine API.
+
+Runs against a throwaway Home Assistant core with fake device services,
+so it needs homeassistant installed but no API key or network.
+
+    python benchmark.py bulk [--commands 20] [--latency 0.15]
+    python benchmark.py replay intentgine_traffic.<entry_id>.jsonl.gz.1 intentgine_traffic.<entry_id>.jsonl.gz
+    python benchmark.py load [--clients 1,4,16,64] [--error-rate 0.02]
+    python benchmark.py sync [--entities 20000] [--max-stall-ms 50]
+    python benchmark.py startup [--import-budget-ms 200] [--setup-budget-ms 250]
+    python benchmark.py semantic [--sizes 1000,10000,100000]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+
+sys.path.insert(0, "custom_components")
+
+from intentgine.api_client import IntentgineAPIClient, endpoint_name  # noqa: E402
+from intentgine.area_matcher import AreaMatcher  # noqa: E402
+from intentgine.command_handler import CommandHandler  # noqa: E402
+from intentgine.const import DOMAIN  # noqa: E402
+from intentgine.loop_monitor import LoopStallMonitor, get_loop_monitor  # noqa: E402
+from intentgine.metrics import get_metrics  # noqa: E402
+from intentgine.semantic_cache import SemanticCache  # noqa: E402
+from intentgine.toolset_manager import ToolsetManager, build_name_index  # noqa: E402
+from intentgine.tracing import finish_span, start_span  # noqa: E402
+from intentgine.traffic import read_traffic  # noqa: E402
+from intentgine.usage import UsageTracker  # noqa: E402
+
+AREAS = ["kitchen", "bedroom", "living_room", "office", "garage", "hallway"]
+
+
+def _area(query: str) -> str | None:
+    """Return the first area mentioned in a query."""
+    text = query.lower().replace("living room", "living_room")
+    return next((area for area in AREAS if area in text), None)
+
+
+def fake_classification(query: str) -> dict:
+    """Route a query to an area, extracting compound commands."""
+    parts = [p for p in re.split(r"\s+and\s+", query) if p]
+    result = {"input": query, "classification": _area(query)}
+    if len(parts) > 1:
+        result["extracted"] = [
+            {"query": part, "classification": _area(part)} for part in parts
+        ]
+    return result
+
+
+def fake_resolution(query: str, area: str) -> dict:
+    """Map a query to a light or cover tool call on an area's entity."""
+    text = query.lower()
+    if "blind" in text or "cover" in text:
+        tool = "control_cover"
+        entity_id = f"cover.{area}_blinds"
+        action = "open" if "open" in text else "close"
+    else:
+        tool = "control_light"
+        entity_id = f"light.{area}"
+        action = "turn_off" if " off" in text else "turn_on"
+    return {
+        "resolved": {
+            "tool": tool,
+            "parameters": {"entity_id": entity_id, "action": action},
+        },
+        "metadata": {},
+    }
+
+
+class FakeAPIClient:
+    """Stand-in for IntentgineAPIClient with fixed latency per request.
+
+    classify picks the area named in the query (splitting on " and " the
+    way server-side extraction does); resolve maps the query to a light or
+    cover tool call on that area's entity.
+    """
+
+    def __init__(self, usage, latency: float = 0.15):
+        """Initialize the stand-in."""
+        self.usage = usage
+        self.metrics = None
+        self.latency = latency
+        self.requests: dict[str, int] = {}
+
+    async def _call(self, path: str):
+        """Simulate one round trip, traced like the real client's requests."""
+        self.requests[path] = self.requests.get(path, 0) + 1
+        span = start_span("api", endpoint=f"POST {path}")
+        await asyncio.sleep(self.latency)
+        finish_span(span, status=200)
+
+    async def classify(self, queries, classification_set, context=None):
+        """Route a query to an area, extracting compound commands."""
+        await self._call("/v1/classify")
+        return {"results": [fake_classification(queries)], "metadata": {}}
+
+    async def resolve(self, query, toolsets, banks=None):
+        """Resolve a query to a tool call."""
+        await self._call("/v1/resolve")
+        return fake_resolution(query, toolsets[0])
+
+
+class _StandInResponse:
+    """Enough of aiohttp.ClientResponse for IntentgineAPIClient."""
+
+    def __init__(self, status: int, body):
+        """Initialize the response."""
+        self.status = status
+        self.headers = {}
+        self._body = body
+
+    async def json(self):
+        """Return the body."""
+        return self._body
+
+    async def text(self):
+        """Return the body as text."""
+        return json.dumps(self._body)
+
+
+class _StandInExchange:
+    """Async context manager standing in for session.request(...)."""
+
+    def __init__(self, session, method: str, url: str, headers: dict, data):
+        """Initialize the exchange."""
+        self.session = session
+        self.args = (method, url.split("://", 1)[-1].split("/", 1)[-1], headers, data)
+
+    async def __aenter__(self):
+        """Wait out the simulated latency and produce the response."""
+        session = self.session
+        await asyncio.sleep(
+            max(session.latency + random.uniform(-1, 1) * session.jitter, 0)
+        )
+        return _StandInResponse(*session.handle(*self.args))
+
+    async def __aexit__(self, *exc):
+        """Nothing to release."""
+
+
+class StandInSession:
+    """aiohttp.ClientSession stand-in that plays the Intentgine API.
+
+    The real IntentgineAPIClient runs on top of it, JWT exchange and
+    401 retry included, so client-side contention shows up. Latency gets
+    uniform jitter, a fraction of requests fail with a 500, and JWTs
+    expire after jwt_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        latency: float,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        jwt_ttl: float = 3600,
+    ):
+        """Initialize the stand-in."""
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.jwt_ttl = jwt_ttl
+        self.requests: dict[str, int] = {}
+        self._tokens: dict[str, float] = {}
+
+    def post(self, url: str, headers: dict = None, json=None, **kwargs):
+        """Stand in for session.post."""
+        return _StandInExchange(self, "POST", url, headers or {}, json)
+
+    def request(self, method: str, url: str, headers: dict = None, json=None, **kwargs):
+        """Stand in for session.request."""
+        return _StandInExchange(self, method, url, headers or {}, json)
+
+    async def close(self):
+        """Nothing to close."""
+
+    def handle(self, method: str, path: str, headers: dict, data) -> tuple:
+        """Return (status, body) for a request."""
+        path = "/" + path
+        self.requests[path] = self.requests.get(path, 0) + 1
+        if path == "/v1/auth":
+            token = f"jwt-{len(self._tokens)}"
+            expires = time.time() + self.jwt_ttl
+            self._tokens[token] = expires
+            expires_at = datetime.fromtimestamp(expires, timezone.utc).isoformat()
+            return 200, {"token": token, "expires_at": expires_at}
+
+        token = headers.get("Authorization", "").removeprefix("Bearer ")
+        if self._tokens.get(token, 0) < time.time():
+            return 401, {"error": "token expired"}
+        if random.random() < self.error_rate:
+            return 500, {"error": "injected failure"}
+
+        if path == "/v1/classify":
+            return 200, {"results": [fake_classification(data["data"])]}
+        if path == "/v1/classify-batch":
+            return 200, {"results": [fake_classification(d) for d in data["data"]]}
+        if path in ("/v1/resolve", "/v1/resolve-respond"):
+            return 200, fake_resolution(data["query"], data["toolsets"][0])
+        if method == "GET":
+            return 200, []
+        return 200, {}
+
+
+class ReplayAPIClient(IntentgineAPIClient):
+    """Stand-in that serves the API exchanges of a recorded command.
+
+    Requests are matched on method, path and body; a request the recording
+    doesn't have fails, which is how a behavior change shows up. Recorded
+    latency is reproduced, scaled by speed (0 for none).
+    """
+
+    def __init__(self, usage, speed: float = 1.0):
+        """Initialize the stand-in."""
+        super().__init__("replay", "http://replay.invalid", usage=usage)
+        self.speed = speed
+        self.unrecorded = 0
+        self._exchanges: dict[tuple, list[dict]] = {}
+
+    @staticmethod
+    def _key(method: str, path: str, data) -> tuple:
+        """Match key for a request."""
+        return method, path, json.dumps(data, sort_keys=True, default=str)
+
+    def load(self, exchanges: list[dict]):
+        """Serve a command's recorded exchanges, in order per request."""
+        self._exchanges = {}
+        for exchange in exchanges or []:
+            key = self._key(exchange["method"], exchange["path"], exchange["request"])
+            self._exchanges.setdefault(key, []).append(exchange)
+
+    async def _request(self, method: str, path: str, data: dict = None) -> dict:
+        """Replay the recorded response for a request."""
+        span = start_span("api", endpoint=endpoint_name(method, path))
+        queue = self._exchanges.get(self._key(method, path, data))
+        if not queue:
+            self.unrecorded += 1
+            finish_span(span, error="unrecorded")
+            raise Exception(f"No recorded response for {method} {path}")
+        exchange = queue.pop(0)
+        await asyncio.sleep(exchange["ms"] / 1000 * self.speed)
+        finish_span(span, status=exchange["status"])
+        if exchange["error"]:
+            raise Exception(exchange["error"])
+        return exchange["response"]
+
+
+class FakeToolsetManager:
+    """Toolset manager that is always synced and has no local schemas."""
+
+    def __init__(self, area_prefilter: bool = False):
+        """Initialize the stand-in."""
+        self.toolsets: dict[str, list] = {}
+        self.entity_names: dict[str, str] = {}
+        self.correction_bank_id = None
+        self.area_names = {
+            area: [area.replace("_", " "), area.replace("_", " ").title()]
+            for area in AREAS
+        }
+        self.area_matcher = AreaMatcher(self.area_names if area_prefilter else None)
+
+    async def ensure_synced(self):
+        """Nothing to sync."""
+
+    def rank_areas(self, query: str) -> list[str]:
+        """Areas named in the query."""
+        return self.area_matcher.find_all(query)
+
+
+def make_queries(count: int) -> list[str]:
+    """Build automation-style commands with a few repeats."""
+    queries = []
+    for i in range(count):
+        area = AREAS[i % len(AREAS)].replace("_", " ")
+        kind = (i // len(AREAS)) % 4
+        if i % 10 == 9:
+            queries.append(queries[i - 5])
+        elif kind == 0:
+            queries.append(f"Turn off the {area} lights")
+        elif kind == 1:
+            queries.append(f"Close the {area} blinds")
+        elif kind == 2:
+            queries.append(f"Turn on the {area} lights")
+        else:
+            queries.append(f"Open the {area} blinds")
+    return queries
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def make_core(config_dir: str, service_latency: float) -> HomeAssistant:
+    """Create a core whose device services just sleep."""
+    hass = HomeAssistant(config_dir)
+
+    async def fake_service(call):
+        await asyncio.sleep(service_latency)
+
+    for domain, services in (
+        ("light", ("turn_on", "turn_off", "toggle")),
+        ("switch", ("turn_on", "turn_off", "toggle")),
+        ("cover", ("open_cover", "close_cover", "stop_cover", "toggle")),
+        ("climate", ("set_temperature", "set_hvac_mode", "turn_on")),
+        ("scene", ("turn_on",)),
+    ):
+        for service in services:
+            hass.services.async_register(domain, service, fake_service)
+    return hass
+
+
+async def setup(
+    config_dir: str,
+    latency: float,
+    service_latency: float,
+    area_prefilter: bool = False,
+):
+    """Create a core with fake services and a command handler."""
+    hass = make_core(config_dir, service_latency)
+    usage = UsageTracker(hass)
+    client = FakeAPIClient(usage, latency)
+    handler = CommandHandler(hass, client, FakeToolsetManager(area_prefilter))
+    await handler.async_setup()
+    return hass, client, handler
+
+
+def rss_kb() -> int:
+    """Current resident set size in KiB (peak where /proc is unavailable)."""
+    try:
+        with open(f"/proc/{os.getpid()}/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def bench_load(args):
+    """Drive commands from N concurrent simulated satellites per level."""
+    levels = [int(level) for level in args.clients.split(",")]
+    # Injected failures are counted below; one log line each is just noise
+    logging.getLogger("intentgine").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = make_core(config_dir, args.service_latency)
+        session = StandInSession(
+            args.latency, args.jitter, args.error_rate, args.jwt_ttl
+        )
+        client = IntentgineAPIClient(
+            "sk-load",
+            "http://stand-in.invalid",
+            usage=UsageTracker(hass),
+            metrics=get_metrics(hass),
+            classify_batch_size=args.batch_size,
+            classify_batch_wait=args.batch_window / 1000,
+            rate_limit=args.rate_limit,
+        )
+        client.session = session
+        manager = FakeToolsetManager(args.area_prefilter)
+        handler = CommandHandler(hass, client, manager)
+        await handler.async_setup()
+
+        if args.via == "conversation":
+            from homeassistant.components import conversation
+            from homeassistant.core import Context
+            from intentgine.conversation import IntentgineConversationEntity
+
+            entry = SimpleNamespace(entry_id="load")
+            hass.data.setdefault(DOMAIN, {})["load"] = {"command_handler": handler}
+            entity = IntentgineConversationEntity(hass, entry)
+
+            async def run(query: str, satellite: int):
+                result = await entity.async_process(
+                    conversation.ConversationInput(
+                        text=query,
+                        context=Context(),
+                        conversation_id=None,
+                        device_id=f"satellite_{satellite}",
+                        language="en",
+                        agent_id=None,
+                    )
+                )
+                return not result.response.speech["plain"]["speech"].startswith(
+                    "Sorry"
+                )
+
+        else:
+
+            async def run(query: str, satellite: int):
+                result = await handler.handle_command(query)
+                return result.get("success", False)
+
+        queries = make_queries(60)
+        baseline_rss = rss_kb()
+        print(
+            f"{args.latency * 1000:.0f}±{args.jitter * 1000:.0f} ms API latency, "
+            f"{args.error_rate:.0%} injected errors, via {args.via}"
+        )
+        print(
+            "clients  cmd/s    p50 ms   p95 ms   p99 ms  errors  auth  "
+            "max lag ms  RSS +KiB"
+        )
+
+        for clients in levels:
+            latencies: list[float] = []
+            errors = 0
+            auth_before = session.requests.get("/v1/auth", 0)
+
+            async def satellite(index: int):
+                nonlocal errors
+                rng = random.Random(index)
+                for _ in range(args.commands):
+                    query = rng.choice(queries)
+                    start = time.perf_counter()
+                    try:
+                        ok = await run(query, index)
+                    except Exception:
+                        ok = False
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    errors += not ok
+                    if args.think:
+                        await asyncio.sleep(rng.uniform(0, args.think))
+
+            monitor = LoopStallMonitor(hass)
+            monitor.start()
+            start = time.perf_counter()
+            await asyncio.gather(*(satellite(i) for i in range(clients)))
+            elapsed = time.perf_counter() - start
+            monitor.stop()
+
+            print(
+                f"{clients:7d} {len(latencies) / elapsed:6.1f} "
+                f"{percentile(latencies, 0.5):9.1f}"
+                f"{percentile(latencies, 0.95):9.1f}"
+                f"{percentile(latencies, 0.99):9.1f}"
+                f"{errors:8d}"
+                f"{session.requests.get('/v1/auth', 0) - auth_before:6d}"
+                f"{monitor.max_stall * 1000:12.1f}"
+                f"{rss_kb() - baseline_rss:10d}"
+            )
+
+        await hass.async_stop(force=True)
+
+
+async def bench_bulk(args):
+    """Compare N execute_command calls with one execute_commands call."""
+    queries = make_queries(args.commands)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass, client, handler = await setup(
+            config_dir, args.latency, args.service_latency, args.area_prefilter
+        )
+
+        start = time.perf_counter()
+        for query in queries:
+            await handler.handle_command(query)
+        sequential = time.perf_counter() - start
+        sequential_requests = sum(client.requests.values())
+
+        client.requests.clear()
+        start = time.perf_counter()
+        results = await handler.handle_commands(
+            queries, max_concurrency=args.concurrency
+        )
+        bulk = time.perf_counter() - start
+        bulk_requests = sum(client.requests.values())
+
+        await hass.async_stop(force=True)
+
+    failed = sum(1 for r in results if not r["success"])
+    print(f"{len(queries)} commands, {args.latency * 1000:.0f} ms API latency")
+    print(
+        f"  sequential: {sequential:7.2f} s  "
+        f"{len(queries) / sequential:6.1f} cmd/s  {sequential_requests} requests"
+    )
+    print(
+        f"  bulk:       {bulk:7.2f} s  "
+        f"{len(queries) / bulk:6.1f} cmd/s  {bulk_requests} requests"
+    )
+    print(f"  speedup:    {sequential / bulk:.1f}x  ({failed} failed)")
+
+
+async def populate_registries(hass: HomeAssistant, entities: int, areas: int):
+    """Fill the registries with entities, a share of them exposed."""
+    from homeassistant.helpers import (
+        area_registry as ar,
+        device_registry as dr,
+        entity_registry as er,
+        floor_registry as fr,
+        label_registry as lr,
+    )
+
+    for registry in (lr, fr, ar, dr, er):
+        await registry.async_load(hass)
+    area_ids = [ar.async_get(hass).async_create(f"Room {i}").id for i in range(areas)]
+    entity_reg = er.async_get(hass)
+    domains = ("light", "switch", "cover", "climate", "scene", "sensor")
+    exposed = 0
+    for i in range(entities):
+        domain = domains[i % len(domains)]
+        entry = entity_reg.async_get_or_create(
+            domain, "benchmark", str(i), suggested_object_id=f"bench_{i}"
+        )
+        hass.states.async_set(entry.entity_id, "on", {"friendly_name": f"Bench {i}"})
+        # Like a real install: most entities (sensors above all) aren't exposed
+        if domain == "sensor" or i % 3:
+            continue
+        exposed += 1
+        entity_reg.async_update_entity_options(
+            entry.entity_id, "conversation", {"should_expose": True}
+        )
+        if i % 7:
+            entity_reg.async_update_entity(
+                entry.entity_id, area_id=area_ids[i % len(area_ids)]
+            )
+    return exposed
+
+
+async def bench_sync(args):
+    """Sync a large install and report how long it held up the event loop."""
+    logging.getLogger("intentgine").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = make_core(config_dir, 0)
+        exposed = await populate_registries(hass, args.entities, args.areas)
+        session = StandInSession(args.latency)
+        client = IntentgineAPIClient(
+            "sk-sync", "http://stand-in.invalid", usage=UsageTracker(hass)
+        )
+        client.session = session
+        manager = ToolsetManager(hass, client)
+        manager.configure(not args.no_area_toolsets, None)
+
+        # What one uninterrupted scan costs, i.e. the stall sliced code avoids
+        start = time.perf_counter()
+        manager.get_exposed_entities()
+        blocking = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with get_loop_monitor(hass).watch("benchmark") as lag:
+            await manager.sync_all()
+        elapsed = time.perf_counter() - start
+
+        await hass.async_stop(force=True)
+
+    print(
+        f"{args.entities} entities, {exposed} exposed, "
+        f"{len(manager.toolsets)} toolsets, {sum(session.requests.values())} requests"
+    )
+    print(f"  sync:           {elapsed * 1000:9.1f} ms")
+    print(f"  blocking scan:  {blocking * 1000:9.1f} ms")
+    print(f"  max loop stall: {lag.max_stall * 1000:9.1f} ms  ({lag.cause})")
+    if args.max_stall_ms and lag.max_stall * 1000 > args.max_stall_ms:
+        print(f"  FAIL: stall above {args.max_stall_ms} ms")
+        sys.exit(1)
+
+
+# Times importing the integration in a fresh interpreter that has already
+# loaded what Home Assistant loads before it gets to us
+IMPORT_PROBE = """
+import sys, time
+sys.path.insert(0, "custom_components")
+import aiohttp, voluptuous
+import homeassistant.config_entries, homeassistant.helpers.event
+import homeassistant.helpers.storage
+from homeassistant.components import conversation, http, websocket_api
+start = time.perf_counter()
+import intentgine, intentgine.config_flow, intentgine.conversation
+print((time.perf_counter() - start) * 1000)
+assert "intentgine.profiler" not in sys.modules and "numpy" not in sys.modules
+start = time.perf_counter()
+import intentgine.profiler, numpy
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def import_ms(runs: int) -> tuple[float, float]:
+    """Best-of-runs cold import time of the integration, in ms.
+
+    Also returns what the modules loaded on first use (the profiler and
+    NumPy for the semantic cache) would have added to it.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    times, deferred = [], []
+    for _ in range(runs):
+        probe = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE],
+            cwd=here,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        lines = probe.stdout.strip().splitlines()
+        times.append(float(lines[-2]))
+        deferred.append(float(lines[-1]))
+    return min(times), min(deferred)
+
+
+async def _noop(*args, **kwargs):
+    """Stand in for setup steps that belong to other integrations."""
+
+
+async def bench_startup(args):
+    """Time import and async_setup_entry against a budget."""
+    import intentgine
+    from intentgine import client_pool
+
+    imported, deferred = import_ms(args.import_runs)
+    logging.getLogger("intentgine").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = make_core(config_dir, 0)
+        await populate_registries(hass, args.entities, 20)
+        hass.http = SimpleNamespace(
+            async_register_static_paths=_noop, register_view=lambda view: None
+        )
+        hass.config_entries = SimpleNamespace(async_forward_entry_setups=_noop)
+        session = StandInSession(args.latency)
+
+        class StandInClient(IntentgineAPIClient):
+            """The pool's client, talking to the stand-in API."""
+
+            async def _get_session(self):
+                self.session = session
+                return session
+
+        client_pool.IntentgineAPIClient = StandInClient
+        entry = SimpleNamespace(
+            entry_id="startup",
+            data={"api_key": "sk-startup", "endpoint": "http://stand-in.invalid"},
+            options={},
+            async_on_unload=lambda unsub: None,
+            add_update_listener=lambda listener: lambda: None,
+        )
+
+        monitor = LoopStallMonitor(hass)
+        monitor.start()
+        start = time.perf_counter()
+        await intentgine.async_setup_entry(hass, entry)
+        setup = time.perf_counter() - start
+        await hass.async_block_till_done(wait_background_tasks=True)
+        ready = time.perf_counter() - start
+        monitor.stop()
+
+        await hass.async_stop(force=True)
+
+    over = []
+    print(f"{args.entities} entities, {args.latency * 1000:.0f} ms API latency")
+    for label, value, budget in (
+        ("import", imported, args.import_budget_ms),
+        ("async_setup_entry", setup * 1000, args.setup_budget_ms),
+    ):
+        verdict = "ok" if value <= budget else "OVER"
+        print(f"  {label:18s} {value:8.1f} ms  (budget {budget:.0f} ms, {verdict})")
+        if value > budget:
+            over.append(label)
+    print(f"  {'first-use imports':18s} {deferred:8.1f} ms  (profiler and NumPy)")
+    print(f"  {'synced and warm':18s} {ready * 1000:8.1f} ms  (in the background)")
+    print(f"  {'max loop stall':18s} {monitor.max_stall * 1000:8.1f} ms")
+    if over:
+        sys.exit(1)
+
+
+def device_names(count: int, rng: random.Random) -> list[str]:
+    """Distinct made-up two-word device names."""
+    syllables = ["ka", "lo", "mi", "ser", "tan", "vo", "rin", "del", "pu", "gho"]
+    names = set()
+    while len(names) < count:
+        names.add(
+            " ".join(
+                "".join(rng.choices(syllables, k=rng.randint(2, 3))) for _ in range(2)
+            )
+        )
+    return sorted(names)
+
+
+# Rewordings of "turn {action} the {name} in the {area}"
+PARAPHRASES = (
+    "switch {action} {name} in the {area}",
+    "please turn {action} the {name} {area}",
+    "{name} in the {area} {action}",
+    "could you turn the {area} {name} {action}",
+)
+
+
+async def bench_semantic(args):
+    """Fill the semantic cache and time inserts, lookups and a resync."""
+    rng = random.Random(0)
+    print(f"{len(AREAS)} toolsets, threshold {args.threshold}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        names = device_names(size + args.lookups, rng)
+        cached, novel = names[:size], names[size:]
+        devices = {}
+        for index, name in enumerate(cached):
+            area = AREAS[index % len(AREAS)]
+            devices[name] = (f"ha-{area}-v1", area.replace("_", " "))
+        entity_names = {f"light.{name.replace(' ', '_')}": name for name in devices}
+        manager = SimpleNamespace(
+            toolsets={},
+            toolset_pushes={},
+            name_index=build_name_index(
+                {
+                    entity_id: devices[name][0]
+                    for entity_id, name in entity_names.items()
+                },
+                entity_names,
+            ),
+            area_names={signature: [area] for signature, area in devices.values()},
+        )
+        cache = SemanticCache(manager, args.threshold, max_entries=size)
+
+        start = time.perf_counter()
+        for index, (name, (signature, area)) in enumerate(devices.items()):
+            action = "on" if index % 2 else "off"
+            cache.add(
+                f"turn {action} the {name} in the {area}",
+                "control_light",
+                {"entity_id": f"light.{name.replace(' ', '_')}", "action": action},
+                signature,
+            )
+        insert = (time.perf_counter() - start) / size
+
+        # Paraphrases of cached commands should hit; unknown devices must not
+        samples = rng.sample(range(size), min(args.lookups, size))
+        hit_ms, hits = [], 0
+        for index in samples:
+            name = cached[index]
+            query = rng.choice(PARAPHRASES).format(
+                action="on" if index % 2 else "off",
+                name=name,
+                area=devices[name][1],
+            )
+            start = time.perf_counter()
+            hits += cache.lookup(query) is not None
+            hit_ms.append((time.perf_counter() - start) * 1000)
+        miss_ms, false_hits = [], 0
+        for name in novel:
+            start = time.perf_counter()
+            false_hits += cache.lookup(f"turn on the {name} in the kitchen") is not None
+            miss_ms.append((time.perf_counter() - start) * 1000)
+
+        # A sync that removes 1% of the devices
+        gone = set(rng.sample(cached, size // 100))
+        for signature in {signature for signature, _ in devices.values()}:
+            entities = [
+                f"light.{name.replace(' ', '_')}"
+                for name, (device_signature, _) in devices.items()
+                if device_signature == signature and name not in gone
+            ]
+            manager.toolsets[signature] = [
+                {
+                    "name": "control_light",
+                    "parameters": {"properties": {"entity_id": {"enum": entities}}},
+                }
+            ]
+        # Only the toolset of the command looked up is pruned
+        start = time.perf_counter()
+        cache.lookup(f"turn off the {cached[0]} in the {devices[cached[0]][1]}")
+        resync = time.perf_counter() - start
+
+        memory = sum(toolset["bytes"] for toolset in cache.stats().values())
+        print(f"  {size} cached commands, {memory / 1024 / 1024:.1f} MiB")
+        print(f"    insert:          {insert * 1e6:8.1f} us")
+        print(
+            f"    lookup (hit):    p50 {percentile(hit_ms, 0.5):6.2f} ms  "
+            f"p95 {percentile(hit_ms, 0.95):6.2f} ms  "
+            f"{hits}/{len(samples)} paraphrases hit"
+        )
+        print(
+            f"    lookup (miss):   p50 {percentile(miss_ms, 0.5):6.2f} ms  "
+            f"p95 {percentile(miss_ms, 0.95):6.2f} ms  "
+            f"{false_hits}/{len(novel)} unknown devices hit"
+        )
+        print(
+            f"    resync + lookup: {resync * 1000:8.1f} ms  "
+            f"({size - len(cache)} dropped)"
+        )
+
+
+def _comparable(result: dict | None) -> dict | None:
+    """The parts of a command result that a replay should reproduce."""
+    if result is None:
+        return None
+    keys = ("success", "tool", "parameters", "area", "extracted", "results", "error")
+    return {key: result[key] for key in keys if key in result}
+
+
+async def bench_replay(args):
+    """Replay recorded traffic and compare results and latency."""
+    matched, mismatched, recorded_ms, replayed_ms = 0, [], [], []
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = make_core(config_dir, args.service_latency)
+        client = ReplayAPIClient(UsageTracker(hass), args.speed)
+        manager = ToolsetManager(hass, client)
+        handler = CommandHandler(hass, client, manager)
+        await handler.async_setup()
+
+        for path in args.files:
+            for record in read_traffic(path):
+                if record["type"] == "toolsets":
+                    manager.restore(record)
+                    continue
+                client.load(record["exchanges"])
+                start = time.perf_counter()
+                result = await handler.handle_command(
+                    record["query"], **record["options"]
+                )
+                replayed_ms.append((time.perf_counter() - start) * 1000)
+                recorded_ms.append(record["duration_ms"])
+                if _comparable(result) == _comparable(record["result"]):
+                    matched += 1
+                else:
+                    mismatched.append((record["query"], record["result"], result))
+
+        await hass.async_stop(force=True)
+
+    total = matched + len(mismatched)
+    print(f"{total} commands replayed, {matched} matched, {len(mismatched)} differ")
+    print(f"  requests missing from the recording: {client.unrecorded}")
+    for label, values in (("recorded", recorded_ms), ("replayed", replayed_ms)):
+        print(
+            f"  {label}: p50 {percentile(values, 0.5):7.1f} ms  "
+            f"p95 {percentile(values, 0.95):7.1f} ms"
+        )
+    for query, before, after in mismatched[: args.show]:
+        print(f"\n  {query!r}\n    recorded: {_comparable(before)}")
+        print(f"    replayed: {_comparable(after)}")
+
+
+def main():
+    """Parse arguments and run a benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    bulk = sub.add_parser("bulk", help="execute_commands vs execute_command")
+    bulk.add_argument("--commands", type=int, default=20)
+    bulk.add_argument("--concurrency", type=int, default=4)
+    bulk.add_argument("--latency", type=float, default=0.15)
+    bulk.add_argument("--service-latency", type=float, default=0.02)
+    bulk.add_argument(
+        "--area-prefilter",
+        action="store_true",
+        help="match area names locally instead of classifying",
+    )
+    bulk.set_defaults(func=bench_bulk)
+
+    load = sub.add_parser("load", help="concurrent satellites against a stand-in")
+    load.add_argument("--clients", default="1,2,4,8,16,32,64")
+    load.add_argument("--commands", type=int, default=20, help="per client")
+    load.add_argument("--via", choices=("handler", "conversation"), default="handler")
+    load.add_argument("--latency", type=float, default=0.15)
+    load.add_argument("--jitter", type=float, default=0.05)
+    load.add_argument("--error-rate", type=float, default=0.0)
+    load.add_argument("--jwt-ttl", type=float, default=3600)
+    load.add_argument("--think", type=float, default=0.0, help="max pause, s")
+    load.add_argument("--service-latency", type=float, default=0.02)
+    load.add_argument("--batch-window", type=float, default=0, help="classify, ms")
+    load.add_argument("--batch-size", type=int, default=8)
+    load.add_argument("--rate-limit", type=float, default=0, help="requests/s")
+    load.add_argument("--area-prefilter", action="store_true")
+    load.set_defaults(func=bench_load)
+
+    sync = sub.add_parser("sync", help="toolset sync of a large install")
+    sync.add_argument("--entities", type=int, default=20000)
+    sync.add_argument("--areas", type=int, default=50)
+    sync.add_argument("--latency", type=float, default=0.01)
+    sync.add_argument("--no-area-toolsets", action="store_true")
+    sync.add_argument(
+        "--max-stall-ms",
+        type=float,
+        default=0,
+        help="exit non-zero if the sync stalls the loop for longer",
+    )
+    sync.set_defaults(func=bench_sync)
+
+    startup = sub.add_parser("startup", help="import and setup time vs a budget")
+    startup.add_argument("--entities", type=int, default=2000)
+    startup.add_argument("--latency", type=float, default=0.15)
+    startup.add_argument("--import-runs", type=int, default=3)
+    startup.add_argument("--import-budget-ms", type=float, default=200)
+    startup.add_argument("--setup-budget-ms", type=float, default=250)
+    startup.set_defaults(func=bench_startup)
+
+    semantic = sub.add_parser("semantic", help="semantic cache at scale")
+    semantic.add_argument("--sizes", default="1000,10000,100000")
+    semantic.add_argument("--lookups", type=int, default=200)
+    semantic.add_argument("--threshold", type=float, default=0.9)
+    semantic.set_defaults(func=bench_semantic)
+
+    replay = sub.add_parser("replay", help="replay recorded command traffic")
+    replay.add_argument("files", nargs="+", help="recordings, oldest first")
+    replay.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="scale recorded API latency (0 = no delay)",
+    )
+    replay.add_argument("--service-latency", type=float, default=0.0)
+    replay.add_argument("--show", type=int, default=10, help="differences to print")
+    replay.set_defaults(func=bench_replay)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,123 +2,281 @@
 
 import logging
 import os
-import traceback
+
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers import entity_registry as er
+from homeassistant.core import HomeAssistant, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
 
-from .const import DOMAIN
-from .api_client import IntentgineAPIClient
-from .toolset_manager import ToolsetManager
+from .const import (
+    DOMAIN,
+    SERVICE_PROFILE,
+    PROFILE_MAX_RUNS,
+    SERVICE_EXECUTE_COMMANDS,
+    BULK_MAX_CONCURRENCY,
+    BULK_EXECUTE_BATCH,
+    BULK_MAX_TIMEOUT_SECONDS,
+    COMMAND_TIMEOUT_SECONDS,
+    BULK_TIMEOUT_SECONDS,
+    CONF_TOPK_RESOLVE,
+    CONF_TOPK_MARGIN,
+    DEFAULT_TOPK_RESOLVE,
+    DEFAULT_TOPK_MARGIN,
+    CONF_SHADOW_MODE,
+    DEFAULT_SHADOW_MODE,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_RECORD_TRAFFIC,
+    CONF_SEMANTIC_CACHE_THRESHOLD,
+    DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+)
+from .client_pool import get_client_pool, get_entry_data
 from .command_handler import CommandHandler
+from .metrics import IntentgineMetricsView
+from .websocket_api import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.CONVERSATION]
 FRONTEND_REGISTERED = False
 
+# Checked at import, which Home Assistant runs in the executor
+WWW_PATH = os.path.join(os.path.dirname(__file__), "www")
+HAS_WWW = os.path.isdir(WWW_PATH)
+
+EXECUTE_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required("query"): cv.string,
+        vol.Optional("timeout", default=COMMAND_TIMEOUT_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=BULK_MAX_TIMEOUT_SECONDS)
+        ),
+        vol.Optional("entry_id"): cv.string,
+    }
+)
+
+EXECUTE_COMMANDS_SCHEMA = vol.Schema(
+    {
+        vol.Required("queries"): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional("max_concurrency", default=BULK_MAX_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=16)
+        ),
+        vol.Optional("batch_size", default=BULK_EXECUTE_BATCH): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=32)
+        ),
+        vol.Optional("timeout", default=BULK_TIMEOUT_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=BULK_MAX_TIMEOUT_SECONDS)
+        ),
+        vol.Optional("entry_id"): cv.string,
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("target", default="command"): vol.In(["command", "sync"]),
+        vol.Optional("count", default=1): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=PROFILE_MAX_RUNS)
+        ),
+    }
+)
 
-def _write_error(msg: str):
-    """Write error to file for debugging."""
+
+async def _async_initial_sync(toolset_manager):
+    """Sync toolsets after setup; errors are logged and retried later."""
     try:
-        with open("/config/intentgine_setup_error.txt", "a") as f:
-            f.write(f"{msg}\n")
-    except:
-        pass
+        await toolset_manager.sync_all()
+    except Exception as err:
+        _LOGGER.warning("Initial toolset sync failed (will retry later): %s", err)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Intentgine from a config entry."""
-    _LOGGER.info("=== Intentgine async_setup_entry START ===")
-    _write_error("=== async_setup_entry START ===")
+    """Set up Intentgine from a config entry.
 
+    Nothing here waits on the network: API warm-up and the initial toolset
+    sync run in the background, so setup stays well inside Home
+    Assistant's slow-setup warning.
+    """
+    backend = None
     try:
-        # Register frontend static files (once)
+        # Register frontend static files, views and websocket commands (once)
         global FRONTEND_REGISTERED
         if not FRONTEND_REGISTERED:
-            _LOGGER.info("Registering frontend...")
-            www_path = os.path.join(os.path.dirname(__file__), "www")
-            if os.path.isdir(www_path):
+            if HAS_WWW:
                 from homeassistant.components.http import StaticPathConfig
 
                 await hass.http.async_register_static_paths(
-                    [StaticPathConfig("/intentgine", www_path, cache_headers=True)]
+                    [StaticPathConfig("/intentgine", WWW_PATH, cache_headers=True)]
                 )
                 _LOGGER.debug("Registered frontend static path: /intentgine")
+            hass.http.register_view(IntentgineMetricsView())
+            async_register_websocket_commands(hass)
             FRONTEND_REGISTERED = True
-            _LOGGER.info("Frontend registered")
 
-        _LOGGER.info("Creating API client...")
-        _write_error(
-            f"Creating API client with endpoint: {entry.data.get('endpoint', 'https://api.intentgine.dev')}"
+        endpoint = entry.data.get("endpoint", "https://api.intentgine.dev")
+        backend, created = await get_client_pool(hass).acquire(
+            endpoint, entry.data["api_key"], entry.options
         )
-        api_client = IntentgineAPIClient(
-            entry.data["api_key"],
-            entry.data.get("endpoint", "https://api.intentgine.dev"),
+        api_client = backend.api_client
+        toolset_manager = backend.toolset_manager
+        _LOGGER.debug(
+            "API client for %s %s",
+            endpoint,
+            "created" if created else "shared with another entry",
         )
-        _LOGGER.info("API client created")
-
-        _LOGGER.info("Creating toolset manager...")
-        toolset_manager = ToolsetManager(hass, api_client)
-        _LOGGER.info("Toolset manager created")
 
-        _LOGGER.info("Creating command handler...")
-        command_handler = CommandHandler(hass, api_client, toolset_manager)
-        _LOGGER.info("Command handler created")
+        command_handler = CommandHandler(
+            hass,
+            api_client,
+            toolset_manager,
+            topk=entry.options.get(CONF_TOPK_RESOLVE, DEFAULT_TOPK_RESOLVE),
+            topk_margin=entry.options.get(CONF_TOPK_MARGIN, DEFAULT_TOPK_MARGIN),
+            shadow_mode=entry.options.get(CONF_SHADOW_MODE, DEFAULT_SHADOW_MODE),
+            record_traffic=entry.options.get(
+                CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC
+            ),
+            semantic_threshold=entry.options.get(
+                CONF_SEMANTIC_CACHE_THRESHOLD, DEFAULT_SEMANTIC_CACHE_THRESHOLD
+            ),
+            entry_id=entry.entry_id,
+        )
+        await command_handler.async_setup()
 
-        _LOGGER.info("Setting up hass.data...")
         hass.data.setdefault(DOMAIN, {})
         hass.data[DOMAIN][entry.entry_id] = {
             "api_client": api_client,
             "toolset_manager": toolset_manager,
             "command_handler": command_handler,
+            "usage": backend.usage,
+            "backend": backend,
         }
-        _LOGGER.info("hass.data configured")
 
-        # Initial sync - non-blocking, errors logged but don't fail setup
-        _LOGGER.info("Starting toolset sync...")
-        try:
-            await toolset_manager.sync_all()
-            _LOGGER.info("Toolset sync completed")
-        except Exception as err:
-            _LOGGER.warning("Initial toolset sync failed (will retry later): %s", err)
-            _write_error(f"Toolset sync failed: {err}\n{traceback.format_exc()}")
+        # A shared toolset manager was synced by the entry that created it.
+        # Commands arriving first use the toolsets the API already has.
+        if created:
+            hass.async_create_background_task(
+                _async_initial_sync(toolset_manager), "intentgine initial sync"
+            )
 
         # Forward to platforms (conversation entity will be set up)
-        _LOGGER.info("Forwarding to platforms...")
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-        _LOGGER.info("Platforms forwarded")
 
-        # Register services
-        _LOGGER.info("Registering services...")
+        entry.async_on_unload(entry.add_update_listener(_async_update_options))
 
-        async def handle_execute_command(call):
-            """Handle execute_command service."""
-            query = call.data.get("query")
-            result = await command_handler.handle_command(query)
-            return result
+        # Services are shared by all entries and dispatch on entry_id
+        if not hass.services.has_service(DOMAIN, "execute_command"):
+            _async_register_services(hass)
 
-        async def handle_sync_toolsets(call):
-            """Handle sync_toolsets service."""
-            await toolset_manager.sync_all()
+        _LOGGER.debug("Entry %s set up", entry.entry_id)
+        return True
 
-        hass.services.async_register(DOMAIN, "execute_command", handle_execute_command)
-        hass.services.async_register(DOMAIN, "sync_toolsets", handle_sync_toolsets)
-        _LOGGER.info("Services registered")
+    except Exception:
+        _LOGGER.exception("Intentgine setup failed")
+        if backend is not None:
+            hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+            await get_client_pool(hass).release(backend)
+        raise
 
-        _LOGGER.info("=== Intentgine async_setup_entry SUCCESS ===")
-        _write_error("=== async_setup_entry SUCCESS ===")
-        return True
 
-    except Exception as err:
-        _LOGGER.error("=== Intentgine async_setup_entry FAILED ===")
-        _LOGGER.error("Error: %s", err)
-        _LOGGER.error("Traceback: %s", traceback.format_exc())
-        _write_error(
-            f"=== async_setup_entry FAILED ===\nError: {err}\n{traceback.format_exc()}"
+async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """Apply changed options to the running entry instead of reloading it.
+
+    The session, JWT and synced toolsets are kept; a resync only runs when
+    the change alters the toolsets on the server.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    options = entry.options
+    data["command_handler"].configure(
+        topk=options.get(CONF_TOPK_RESOLVE, DEFAULT_TOPK_RESOLVE),
+        topk_margin=options.get(CONF_TOPK_MARGIN, DEFAULT_TOPK_MARGIN),
+        shadow_mode=options.get(CONF_SHADOW_MODE, DEFAULT_SHADOW_MODE),
+        record_traffic=options.get(CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC),
+        semantic_threshold=options.get(
+            CONF_SEMANTIC_CACHE_THRESHOLD, DEFAULT_SEMANTIC_CACHE_THRESHOLD
+        ),
+    )
+    if data["backend"].configure(options):
+        _LOGGER.info("Toolset layout changed, resyncing")
+        hass.async_create_background_task(
+            data["toolset_manager"].sync_all(), "intentgine toolset resync"
         )
-        raise
+    _LOGGER.info("Options applied")
+
+
+def _entry_data(hass: HomeAssistant, call) -> dict:
+    """Return the data of the entry a service call targets."""
+    entry_id = call.data.get("entry_id")
+    data = get_entry_data(hass, entry_id)
+    if data is None:
+        raise HomeAssistantError(
+            f"Intentgine entry {entry_id} is not loaded"
+            if entry_id
+            else "Intentgine is not loaded"
+        )
+    return data
+
+
+def _async_register_services(hass: HomeAssistant):
+    """Register the integration's services."""
+
+    async def handle_execute_command(call):
+        """Handle execute_command service."""
+        command_handler = _entry_data(hass, call)["command_handler"]
+        result = await command_handler.handle_command(
+            call.data["query"],
+            timeout=call.data["timeout"],
+        )
+        return result if call.return_response else None
+
+    async def handle_execute_commands(call):
+        """Handle execute_commands service."""
+        command_handler = _entry_data(hass, call)["command_handler"]
+        results = await command_handler.handle_commands(
+            call.data["queries"],
+            max_concurrency=call.data["max_concurrency"],
+            batch_size=call.data["batch_size"],
+            timeout=call.data["timeout"],
+        )
+        return {"results": results} if call.return_response else None
+
+    async def handle_sync_toolsets(call):
+        """Handle sync_toolsets service.
+
+        Without an entry_id every account is synced once, however many
+        entries share it.
+        """
+        if call.data.get("entry_id"):
+            await _entry_data(hass, call)["toolset_manager"].sync_all()
+            return
+        for backend in get_client_pool(hass).backends():
+            await backend.toolset_manager.sync_all()
+
+    async def handle_profile(call):
+        """Handle profile service."""
+        # Profiling is a diagnostic; its module is loaded when first asked for
+        from .profiler import get_profiler
+
+        profiler = get_profiler(hass)
+        await profiler.async_load()
+        profiler.arm(call.data["target"], call.data["count"])
+
+    hass.services.async_register(
+        DOMAIN,
+        "execute_command",
+        handle_execute_command,
+        schema=EXECUTE_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXECUTE_COMMANDS,
+        handle_execute_commands,
+        schema=EXECUTE_COMMANDS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(DOMAIN, "sync_toolsets", handle_sync_toolsets)
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, handle_profile, schema=PROFILE_SCHEMA
+    )
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -127,15 +285,17 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
-        # Unregister services
-        hass.services.async_remove(DOMAIN, "execute_command")
-        hass.services.async_remove(DOMAIN, "sync_toolsets")
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        await data["command_handler"].async_unload()
 
-        # Close API client session
-        api_client = hass.data[DOMAIN][entry.entry_id]["api_client"]
-        await api_client.close()
+        # Close the API client session once no other entry shares it
+        await get_client_pool(hass).release(data["backend"])
 
-        # Remove data
-        hass.data[DOMAIN].pop(entry.entry_id)
+        # Unregister services with the last entry
+        if not hass.data[DOMAIN]:
+            hass.services.async_remove(DOMAIN, "execute_command")
+            hass.services.async_remove(DOMAIN, "sync_toolsets")
+            hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+            hass.services.async_remove(DOMAIN, SERVICE_EXECUTE_COMMANDS)
 
     return unload_ok
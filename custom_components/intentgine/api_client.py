@@ -1,63 +1,288 @@
 """Intentgine API client."""
 
+import asyncio
+import contextvars
 import logging
 import time
 import aiohttp
 from typing import Any
 
+from .const import (
+    CONNECTION_KEEPALIVE_SECONDS,
+    JWT_REFRESH_MARGIN_SECONDS,
+    WARM_INTERVAL_SECONDS,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_RESERVE,
+)
+from .rate_limiter import PRIORITIES, RateLimiter, request_priority
+from .deadline import current_deadline, deadline_at, stage
+from .tracing import start_span, finish_span
+from .traffic import record_exchange
+
 _LOGGER = logging.getLogger(__name__)
 
 
+def endpoint_name(method: str, path: str) -> str:
+    """Collapse resource ids so endpoints aggregate, e.g. PUT /v1/toolsets/{id}."""
+    parts = path.split("/")
+    if len(parts) > 3:
+        parts[3] = "{id}"
+    return f"{method} {'/'.join(parts)}"
+
+
+class ClassifyBatcher:
+    """Coalesce concurrent classify calls into /v1/classify-batch requests.
+
+    The first call for a (classification set, context) pair opens a window
+    of max_wait seconds; calls arriving within it join the batch, which is
+    sent when the window closes or max_size is reached. Each caller gets a
+    classify-shaped response holding just its own result, and stops waiting
+    when its own deadline runs out. The batch request runs in a copy of the
+    context of the call that opened the window, whichever call fills it, so
+    its usage and trace span are attributed to that command; its deadline
+    is the latest of the callers', so no caller is cut short by another's.
+    """
+
+    def __init__(self, client, max_size: int, max_wait: float):
+        """Initialize the batcher."""
+        self.client = client
+        self.max_size = max_size
+        self.max_wait = max_wait
+        # key -> [(text, future, deadline)]
+        self._pending: dict[tuple, list[tuple]] = {}
+        self._timers: dict[tuple, asyncio.TimerHandle] = {}
+        self._contexts: dict[tuple, contextvars.Context] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_calls = 0
+
+    async def classify(
+        self, data_text: str, classification_set: str, context: str = None
+    ) -> dict:
+        """Queue a classify call and wait for its share of the batch."""
+        loop = asyncio.get_running_loop()
+        key = (classification_set, context)
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((data_text, future, current_deadline()))
+        if len(batch) == 1:
+            self._contexts[key] = contextvars.copy_context()
+        if len(batch) >= self.max_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key: tuple):
+        """Send the pending batch for a key."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        context = self._contexts.pop(key, None)
+        batch = self._pending.pop(key, None)
+        if batch:
+            deadlines = [when for _, _, when in batch]
+            when = None if None in deadlines else max(deadlines)
+            # The loop only keeps weak references to tasks
+            task = asyncio.get_running_loop().create_task(
+                self._send(key, batch, when), context=context
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, key: tuple, batch: list[tuple], when: float | None):
+        """Make the request by the deadline and hand each waiter its result."""
+        # Callers cancelled while waiting don't need classifying
+        batch = [(text, future) for text, future, _ in batch if not future.done()]
+        if not batch:
+            return
+        classification_set, context = key
+        # Repeated texts are sent once and share the result
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            if len(texts) == 1:
+                with deadline_at(when):
+                    response = await self.client._classify_one(texts[0], *key)
+                responses = {texts[0]: response}
+            else:
+                with deadline_at(when):
+                    result = await self.client.classify_batch(
+                        texts, classification_set, context
+                    )
+                metadata = dict(result.get("metadata") or {}, batch_size=len(batch))
+                responses = {
+                    text: {"results": [item], "metadata": metadata}
+                    for text, item in _match_results(texts, result["results"]).items()
+                }
+        except Exception as err:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+
+        self.batches += 1
+        self.batched_calls += len(batch)
+        for text, future in batch:
+            if future.done():
+                continue
+            if text in responses:
+                future.set_result(responses[text])
+            else:
+                future.set_exception(
+                    Exception(f"classify-batch returned no result for '{text}'")
+                )
+
+
+def _match_results(texts: list[str], results: list[dict]) -> dict[str, dict]:
+    """Map batch results to their input texts.
+
+    Results come in input order; if the server returns fewer (it
+    deduplicates), each is placed by its "index", else by its "input".
+    """
+    if len(results) == len(texts):
+        return dict(zip(texts, results))
+    matched = {}
+    for item in results:
+        index = item.get("index")
+        if isinstance(index, int) and 0 <= index < len(texts):
+            matched[texts[index]] = item
+        elif item.get("input") in texts:
+            matched[item["input"]] = item
+    return matched
+
+
 class IntentgineAPIClient:
     """Client for Intentgine API."""
 
-    def __init__(self, api_key: str, endpoint: str):
-        """Initialize the API client."""
+    def __init__(
+        self,
+        api_key: str,
+        endpoint: str,
+        usage=None,
+        metrics=None,
+        classify_batch_size: int = 1,
+        classify_batch_wait: float = 0.0,
+        rate_limit: float = 0.0,
+        ssl_context=None,
+    ):
+        """Initialize the API client.
+
+        With classify_batch_size > 1 and a positive classify_batch_wait
+        (seconds), concurrent classify calls are micro-batched. A positive
+        rate_limit (requests per second) queues requests client-side,
+        interactive ones ahead of background sync traffic. Pass Home
+        Assistant's shared ssl_context where there is one; otherwise a
+        context is created in the executor with the session.
+        """
         self.api_key = api_key
         self.endpoint = endpoint.rstrip("/")
+        self.ssl_context = ssl_context
         self.session = None
+        self._session_lock = asyncio.Lock()
+        self._auth_lock = asyncio.Lock()
         self._jwt_token = None
         self._jwt_expires_at = 0
+        self.usage = usage
+        self.metrics = metrics
+        self.last_request = 0.0
+        self.warmup_duration: float | None = None
+        self.batcher = None
+        self.limiter = None
+        self.configure(classify_batch_size, classify_batch_wait, rate_limit)
+
+    def configure(
+        self,
+        classify_batch_size: int = 1,
+        classify_batch_wait: float = 0.0,
+        rate_limit: float = 0.0,
+    ):
+        """Apply batching and rate-limit settings, keeping session and JWT.
+
+        Calls already waiting in a replaced batcher or limiter finish there.
+        """
+        batcher = self.batcher
+        if classify_batch_size > 1 and classify_batch_wait > 0:
+            if (
+                batcher is None
+                or batcher.max_size != classify_batch_size
+                or batcher.max_wait != classify_batch_wait
+            ):
+                self.batcher = ClassifyBatcher(
+                    self, classify_batch_size, classify_batch_wait
+                )
+        else:
+            self.batcher = None
+
+        if rate_limit <= 0:
+            self.limiter = None
+        elif self.limiter is None:
+            self.limiter = RateLimiter(
+                rate_limit, RATE_LIMIT_BURST, RATE_LIMIT_RESERVE, self.metrics
+            )
+        else:
+            self.limiter.set_rate(rate_limit)
 
     async def _get_session(self):
         """Get or create aiohttp session."""
-        if self.session is None:
-            # Use a more permissive SSL context and explicit timeout
-            import ssl
-
-            ssl_context = ssl.create_default_context()
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            timeout = aiohttp.ClientTimeout(total=30)
-            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
-            _LOGGER.info("Created new aiohttp session for endpoint: %s", self.endpoint)
+        if self.session is not None:
+            return self.session
+        async with self._session_lock:
+            if self.session is None:
+                if self.ssl_context is None:
+                    # Loading the CA bundle is blocking file I/O
+                    import ssl
+
+                    self.ssl_context = await asyncio.get_running_loop().run_in_executor(
+                        None, ssl.create_default_context
+                    )
+                connector = aiohttp.TCPConnector(
+                    ssl=self.ssl_context,
+                    keepalive_timeout=CONNECTION_KEEPALIVE_SECONDS,
+                )
+                timeout = aiohttp.ClientTimeout(total=30)
+                self.session = aiohttp.ClientSession(
+                    connector=connector, timeout=timeout
+                )
+                _LOGGER.debug("Created aiohttp session for %s", self.endpoint)
         return self.session
 
-    async def _ensure_token(self):
-        """Exchange API key for JWT if needed."""
+    async def _ensure_token(self, margin: float = 30):
+        """Exchange API key for JWT if it expires within margin seconds."""
         _LOGGER.debug(
             "_ensure_token called, current token: %s, expires: %s, now: %s",
             bool(self._jwt_token),
             self._jwt_expires_at,
             time.time(),
         )
-        if self._jwt_token and time.time() < self._jwt_expires_at - 30:
+        if self._jwt_token and time.time() < self._jwt_expires_at - margin:
             _LOGGER.debug("Token still valid, reusing")
             return
 
+        # One exchange at a time; whoever waited reuses the fresh token
+        async with self._auth_lock:
+            if self._jwt_token and time.time() < self._jwt_expires_at - margin:
+                return
+            await self._exchange_token()
+
+    async def _exchange_token(self):
+        """Exchange the API key for a JWT."""
         session = await self._get_session()
         url = f"{self.endpoint}/v1/auth"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
-        _LOGGER.info("Exchanging API key for JWT at %s", url)
+        _LOGGER.debug("Exchanging API key for JWT at %s", url)
 
+        span = start_span("api", endpoint="POST /v1/auth")
+        start = self.last_request = time.monotonic()
+        status = "error"
         try:
-            _LOGGER.info("About to POST to %s", url)
             async with session.post(
                 url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)
             ) as resp:
-                _LOGGER.info("Auth response status: %s", resp.status)
+                status = resp.status
+                _LOGGER.debug("Auth response status: %s", resp.status)
                 if resp.status == 401:
                     raise Exception("Invalid API key")
                 if resp.status >= 400:
@@ -75,10 +300,37 @@ class IntentgineAPIClient:
         except aiohttp.ClientError as err:
             _LOGGER.error("Connection error during auth: %s", err)
             raise Exception(f"Connection error during auth: {err}")
+        finally:
+            finish_span(span, status=status)
+            if self.metrics is not None:
+                self.metrics.api_latency.observe(
+                    time.monotonic() - start, "POST /v1/auth", str(status)
+                )
+                ok = status != "error" and status < 400
+                self.metrics.jwt_refreshes.inc("success" if ok else "failure")
 
-    async def _request(self, method: str, path: str, data: dict = None) -> dict:
-        """Make authenticated API request."""
+    async def _request(
+        self, method: str, path: str, data: dict = None, priority: str = None
+    ) -> dict:
+        """Make authenticated API request.
+
+        The priority class defaults to the path's, see request_priority().
+        Queueing, JWT refresh and the request itself are bounded by the
+        calling command's deadline, if it has one.
+        """
+        async with stage(f"waiting for {endpoint_name(method, path)}"):
+            return await self._send_request(method, path, data, priority)
+
+    async def _send_request(
+        self, method: str, path: str, data: dict | None, priority: str | None
+    ) -> dict:
+        """Queue, authenticate and send a request."""
         _LOGGER.debug("_request called: %s %s", method, path)
+        if self.limiter is not None:
+            priority = priority or request_priority(path)
+            span = start_span("rate_limit", priority=priority)
+            await self.limiter.acquire(priority)
+            finish_span(span)
         await self._ensure_token()
         session = await self._get_session()
         url = f"{self.endpoint}{path}"
@@ -96,8 +348,14 @@ class IntentgineAPIClient:
             headers["Content-Type"] = "application/json"
             kwargs["json"] = data
 
+        name = endpoint_name(method, path)
+        span = start_span("api", endpoint=name)
+        start = self.last_request = time.monotonic()
+        status = "error"
+        result = error = None
         try:
             async with session.request(method, url, headers=headers, **kwargs) as resp:
+                status = resp.status
                 if resp.status == 401:
                     # Token may have expired, clear and retry once
                     self._jwt_token = None
@@ -106,18 +364,97 @@ class IntentgineAPIClient:
                     async with session.request(
                         method, url, headers=headers, **kwargs
                     ) as retry_resp:
+                        status = retry_resp.status
                         if retry_resp.status >= 400:
                             text = await retry_resp.text()
                             raise Exception(f"API error {retry_resp.status}: {text}")
-                        return await retry_resp.json()
+                        result = await retry_resp.json()
+                        self._record_usage(method, path, retry_resp, result)
+                        return result
                 if resp.status == 402:
-                    raise Exception("Insufficient requests remaining")
+                    if self.usage is None:
+                        raise Exception("Insufficient requests remaining")
+                    self.usage.record_exhausted(resp.headers)
+                    raise Exception(self.usage.quota_message())
                 if resp.status >= 400:
                     text = await resp.text()
                     raise Exception(f"API error {resp.status}: {text}")
-                return await resp.json()
+                result = await resp.json()
+                self._record_usage(method, path, resp, result)
+                return result
         except aiohttp.ClientError as err:
-            raise Exception(f"Connection error: {err}")
+            error = f"Connection error: {err}"
+            raise Exception(error)
+        except Exception as err:
+            error = str(err)
+            raise
+        finally:
+            duration = time.monotonic() - start
+            finish_span(span, status=status)
+            if self.metrics is not None:
+                self.metrics.api_latency.observe(duration, name, str(status))
+            if result is not None or error is not None:
+                record_exchange(method, path, data, result, status, error, duration)
+
+    async def warm_up(self, ping: bool = False):
+        """Get the session, connection and JWT ready before a command needs them.
+
+        Refreshes the JWT early if it would expire before the next check-in.
+        With ping, an idle pooled connection is kept open with an unbilled
+        GET /v1/banks, so the next command skips TCP and TLS setup.
+        """
+        start = time.monotonic()
+        await self._get_session()
+        await self._ensure_token(WARM_INTERVAL_SECONDS + JWT_REFRESH_MARGIN_SECONDS)
+        if ping and start - self.last_request >= WARM_INTERVAL_SECONDS:
+            await self._request("GET", "/v1/banks")
+        if self.warmup_duration is None:
+            self.warmup_duration = time.monotonic() - start
+            _LOGGER.debug("Warmed up in %.0f ms", self.warmup_duration * 1000)
+
+    def connection_stats(self) -> dict:
+        """Session, connection pool, JWT and queueing state (read-only)."""
+        now = time.time()
+        connector = getattr(self.session, "connector", None)
+        stats = {
+            "session_open": self.session is not None
+            and not getattr(self.session, "closed", False),
+            "jwt_valid": bool(self._jwt_token) and now < self._jwt_expires_at,
+            "jwt_expires_in_s": (
+                round(self._jwt_expires_at - now) if self._jwt_token else None
+            ),
+            "idle_s": (
+                round(time.monotonic() - self.last_request, 1)
+                if self.last_request
+                else None
+            ),
+            "warmup_ms": (
+                round(self.warmup_duration * 1000, 1)
+                if self.warmup_duration is not None
+                else None
+            ),
+        }
+        if connector is not None:
+            stats["pool"] = {
+                "limit": connector.limit,
+                "limit_per_host": connector.limit_per_host,
+            }
+        if self.batcher is not None:
+            stats["classify_batches"] = self.batcher.batches
+            stats["classify_batched_calls"] = self.batcher.batched_calls
+        if self.limiter is not None:
+            stats["rate_limit"] = {
+                "rate": self.limiter.rate,
+                "queued": {p: self.limiter.queued(p) for p in PRIORITIES},
+            }
+        return stats
+
+    def _record_usage(self, method: str, path: str, resp, result):
+        """Account the request with the usage tracker, if any."""
+        if self.usage is None:
+            return
+        metadata = result.get("metadata") if isinstance(result, dict) else None
+        self.usage.record_request(method, path, metadata, resp.headers)
 
     async def resolve(
         self, query: str, toolsets: list[str], banks: list[str] = None
@@ -131,12 +468,34 @@ class IntentgineAPIClient:
     async def classify(
         self, data_text: str, classification_set: str, context: str = None
     ) -> dict:
-        """Classify text."""
+        """Classify text, micro-batched with concurrent calls if enabled."""
+        if self.batcher is not None:
+            # Bounds this call's wait; the batch runs until the last
+            # caller's deadline
+            async with stage("waiting for POST /v1/classify-batch"):
+                return await self.batcher.classify(
+                    data_text, classification_set, context
+                )
+        return await self._classify_one(data_text, classification_set, context)
+
+    async def _classify_one(
+        self, data_text: str, classification_set: str, context: str = None
+    ) -> dict:
+        """Classify one text in its own request."""
         data = {"data": data_text, "classification_set": classification_set}
         if context:
             data["context"] = context
         return await self._request("POST", "/v1/classify", data)
 
+    async def classify_batch(
+        self, texts: list[str], classification_set: str, context: str = None
+    ) -> dict:
+        """Classify several texts in one request; results are in input order."""
+        data = {"data": texts, "classification_set": classification_set}
+        if context:
+            data["context"] = context
+        return await self._request("POST", "/v1/classify-batch", data)
+
     async def respond(
         self, query: str, toolsets: list[str], persona: str = None
     ) -> dict:
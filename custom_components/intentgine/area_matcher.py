@@ -0,0 +1,73 @@
+"""Local area-name matching so single-room commands can skip classification."""
+
+import re
+
+# Phrases that suggest the user is correcting the previous command, which
+# only the router's correction class can handle
+_CORRECTION_CUE = re.compile(
+    r"\b(?:no|nope|not|wrong|meant|instead|actually|other one|undo)\b", re.I
+)
+
+# Conjunctions that suggest several intents; extraction has to split those
+_MULTI_INTENT_CUE = re.compile(r"\b(?:and|then|also|plus)\b|[,;]", re.I)
+
+
+def has_correction_cue(query: str) -> bool:
+    """Whether a query looks like it corrects the previous command."""
+    return _CORRECTION_CUE.search(query) is not None
+
+
+def _phrase_pattern(phrase: str) -> str:
+    """Regex for a name, tolerant of spacing, underscores and hyphens."""
+    words = re.findall(r"[a-z0-9']+", phrase.lower())
+    return r"[\s_-]+".join(re.escape(word) for word in words)
+
+
+class AreaMatcher:
+    """Precompiled matcher over area names and aliases.
+
+    match() returns a toolset signature only when the query names exactly
+    one known area and has no correction or multi-intent cue; anything
+    else goes to the router classification as before.
+    """
+
+    def __init__(self, areas: dict[str, list[str]] | None = None):
+        """Compile a matcher from {toolset signature: [names and aliases]}."""
+        self._signatures: dict[str, str] = {}
+        alternatives = []
+        for signature, names in (areas or {}).items():
+            for name in names:
+                pattern = _phrase_pattern(name)
+                if not pattern:
+                    continue
+                group = f"a{len(alternatives)}"
+                self._signatures[group] = signature
+                alternatives.append((len(name), f"(?P<{group}>{pattern})"))
+
+        self._pattern = None
+        if alternatives:
+            # Longest names first, so "master bedroom" wins over "bedroom"
+            alternatives.sort(key=lambda item: item[0], reverse=True)
+            self._pattern = re.compile(
+                r"\b(?:" + "|".join(p for _, p in alternatives) + r")\b", re.I
+            )
+
+    def __len__(self) -> int:
+        """Number of compiled names and aliases."""
+        return len(self._signatures)
+
+    def find_all(self, query: str) -> list[str]:
+        """Return the area toolsets a query names, in order of mention."""
+        if self._pattern is None:
+            return []
+        found = [self._signatures[m.lastgroup] for m in self._pattern.finditer(query)]
+        return list(dict.fromkeys(found))
+
+    def match(self, query: str) -> str | None:
+        """Return the one area toolset a query is about, if unambiguous."""
+        found = self.find_all(query)
+        if len(found) != 1:
+            return None
+        if has_correction_cue(query) or _MULTI_INTENT_CUE.search(query):
+            return None
+        return found[0]
@@ -0,0 +1,195 @@
+"""API clients and toolset managers shared between config entries."""
+
+import asyncio
+import hashlib
+import logging
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util.ssl import get_default_context
+
+from .api_client import IntentgineAPIClient
+from .const import (
+    DOMAIN,
+    DATA_CLIENT_POOL,
+    CONF_CLASSIFY_BATCH_WINDOW,
+    CONF_CLASSIFY_BATCH_SIZE,
+    DEFAULT_CLASSIFY_BATCH_WINDOW,
+    DEFAULT_CLASSIFY_BATCH_SIZE,
+    CONF_KEEPALIVE,
+    DEFAULT_KEEPALIVE,
+    CONF_RATE_LIMIT,
+    DEFAULT_RATE_LIMIT,
+    CONF_ENABLE_AREA_TOOLSETS,
+    DEFAULT_ENABLE_AREA_TOOLSETS,
+    CONF_SYNC_FREQUENCY,
+    DEFAULT_SYNC_FREQUENCY,
+    SYNC_FREQUENCIES,
+    WARM_INTERVAL_SECONDS,
+)
+from .metrics import get_metrics
+from .toolset_manager import ToolsetManager
+from .usage import UsageTracker
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def account_id(endpoint: str, api_key: str) -> str:
+    """Short stable id of an account, safe to use in file names and labels."""
+    return hashlib.sha256(f"{endpoint}\n{api_key}".encode()).hexdigest()[:12]
+
+
+class SharedBackend:
+    """One account's API client, usage tracker and toolset manager."""
+
+    def __init__(
+        self,
+        key: tuple[str, str],
+        api_client: IntentgineAPIClient,
+        usage: UsageTracker,
+        toolset_manager: ToolsetManager,
+    ):
+        """Initialize the backend."""
+        self.key = key
+        self.account = account_id(*key)
+        self.api_client = api_client
+        self.usage = usage
+        self.toolset_manager = toolset_manager
+        self.refs = 0
+        self.keepalive = False
+        self.unsub_warm = None
+
+    def configure(self, options: dict) -> bool:
+        """Apply client and sync options; returns whether to resync."""
+        self.api_client.configure(
+            classify_batch_size=options.get(
+                CONF_CLASSIFY_BATCH_SIZE, DEFAULT_CLASSIFY_BATCH_SIZE
+            ),
+            classify_batch_wait=options.get(
+                CONF_CLASSIFY_BATCH_WINDOW, DEFAULT_CLASSIFY_BATCH_WINDOW
+            )
+            / 1000,
+            rate_limit=options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT),
+        )
+        self.keepalive = options.get(CONF_KEEPALIVE, DEFAULT_KEEPALIVE)
+        frequency = options.get(CONF_SYNC_FREQUENCY, DEFAULT_SYNC_FREQUENCY)
+        return self.toolset_manager.configure(
+            options.get(CONF_ENABLE_AREA_TOOLSETS, DEFAULT_ENABLE_AREA_TOOLSETS),
+            SYNC_FREQUENCIES.get(frequency, SYNC_FREQUENCIES[DEFAULT_SYNC_FREQUENCY]),
+        )
+
+
+class ClientPool:
+    """Reference-counted backends keyed by (endpoint, API key).
+
+    Entries configured with the same account share one aiohttp session,
+    JWT, rate limiter, usage tracker and toolset manager, so the house is
+    synced once per account instead of once per entry. Client and sync
+    options are shared too: they come from the entry that created the
+    backend, until an entry's options are changed.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the pool."""
+        self.hass = hass
+        self._backends: dict[tuple[str, str], SharedBackend] = {}
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        """Number of live backends."""
+        return len(self._backends)
+
+    def backends(self) -> list[SharedBackend]:
+        """Return the live backends."""
+        return list(self._backends.values())
+
+    async def acquire(
+        self, endpoint: str, api_key: str, options: dict
+    ) -> tuple[SharedBackend, bool]:
+        """Return the account's backend and whether it was just created."""
+        key = (endpoint, api_key)
+        async with self._lock:
+            backend = self._backends.get(key)
+            created = backend is None
+            if created:
+                backend = await self._create(key, options)
+                self._backends[key] = backend
+            backend.refs += 1
+            _LOGGER.debug(
+                "Backend for %s %s (%d entries)",
+                endpoint,
+                "created" if created else "shared",
+                backend.refs,
+            )
+            return backend, created
+
+    async def release(self, backend: SharedBackend):
+        """Drop an entry's reference, closing the backend after the last one."""
+        async with self._lock:
+            backend.refs -= 1
+            if backend.refs > 0:
+                return
+            self._backends.pop(backend.key, None)
+        if backend.unsub_warm is not None:
+            backend.unsub_warm()
+        backend.toolset_manager.stop()
+        await backend.api_client.close()
+        _LOGGER.debug("Backend for %s closed", backend.key[0])
+
+    async def _create(self, key: tuple[str, str], options: dict) -> SharedBackend:
+        """Build a backend and start warming it up."""
+        endpoint, api_key = key
+        usage = UsageTracker(self.hass, account_id(endpoint, api_key))
+        await usage.async_load()
+        api_client = IntentgineAPIClient(
+            api_key,
+            endpoint,
+            usage=usage,
+            metrics=get_metrics(self.hass),
+            ssl_context=get_default_context(),
+        )
+        backend = SharedBackend(
+            key, api_client, usage, ToolsetManager(self.hass, api_client)
+        )
+        backend.configure(options)
+
+        async def _async_warm_up():
+            """Pay for the TLS handshake and JWT before the first command."""
+            try:
+                await api_client.warm_up()
+            except Exception as err:
+                _LOGGER.warning("API warm-up failed (will retry later): %s", err)
+
+        # In the background, so entry setup doesn't wait on the network
+        self.hass.async_create_background_task(
+            _async_warm_up(), "intentgine API warm-up"
+        )
+
+        async def _async_warm(now=None):
+            """Keep the JWT (and optionally the connection) warm."""
+            try:
+                await api_client.warm_up(ping=backend.keepalive)
+            except Exception as err:
+                _LOGGER.debug("API warm-up failed: %s", err)
+
+        backend.unsub_warm = async_track_time_interval(
+            self.hass, _async_warm, timedelta(seconds=WARM_INTERVAL_SECONDS)
+        )
+        return backend
+
+
+def get_client_pool(hass: HomeAssistant) -> ClientPool:
+    """Return the shared client pool, creating it on first use."""
+    pool = hass.data.get(DATA_CLIENT_POOL)
+    if pool is None:
+        pool = hass.data[DATA_CLIENT_POOL] = ClientPool(hass)
+    return pool
+
+
+def get_entry_data(hass: HomeAssistant, entry_id: str | None) -> dict | None:
+    """Return a loaded entry's data, or the first loaded entry's."""
+    entries = hass.data.get(DOMAIN, {})
+    if entry_id is not None:
+        return entries.get(entry_id)
+    return next(iter(entries.values()), None)
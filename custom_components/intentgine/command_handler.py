@@ -1,23 +1,139 @@
 """Command handler for Intentgine integration."""
 
+import asyncio
 import logging
 import time
+from collections import OrderedDict
+from collections.abc import Callable
+from contextvars import ContextVar
 from homeassistant.core import HomeAssistant
 
-from .const import CORRECTION_WINDOW_SECONDS
+from .const import (
+    CORRECTION_WINDOW_SECONDS,
+    RESULT_CACHE_SIZE,
+    BULK_MAX_CONCURRENCY,
+    BULK_EXECUTE_BATCH,
+    DEFAULT_TOPK_RESOLVE,
+    DEFAULT_TOPK_MARGIN,
+    DEFAULT_SHADOW_MODE,
+    DEFAULT_RECORD_TRAFFIC,
+    DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+    BUDGET_NORMAL,
+    BUDGET_LOW,
+    BUDGET_EXHAUSTED,
+    DATA_PROFILER,
+)
+from .correction_index import CorrectionIndex, normalize_query
+from .deadline import DeadlineExceeded, start_deadline, reset_deadline, stage
+from .intent_splitter import split_command
+from .loop_monitor import get_loop_monitor
+from .metrics import get_metrics
+from .responses import ResponseSynthesizer
+from .semantic_cache import SemanticCache
+from .shadow import ShadowRecorder
+from .traffic import TrafficRecorder
+from .tracing import (
+    get_tracer,
+    current_trace_id,
+    current_spans,
+    start_span,
+    finish_span,
+)
+from .param_validator import ParameterValidator
 
 _LOGGER = logging.getLogger(__name__)
 
+# Progress listener for the command running in the current task
+_progress: ContextVar[Callable[[str, dict], None] | None] = ContextVar(
+    "intentgine_progress", default=None
+)
+
+
+def _emit(event: str, **data):
+    """Report a pipeline step to the current command's progress listener."""
+    listener = _progress.get()
+    if listener is not None:
+        listener(event, data)
+
+
+def _conflict_free_batches(calls: list[dict], batch_size: int) -> list[list[dict]]:
+    """Split calls, in order, into batches that never repeat an entity."""
+    batches: list[list[dict]] = [[]]
+    entities: set = set()
+    for call in calls:
+        entity_id = call["parameters"].get("entity_id")
+        targets = set(entity_id) if isinstance(entity_id, list) else {entity_id}
+        if len(batches[-1]) >= batch_size or not entities.isdisjoint(targets):
+            batches.append([])
+            entities = set()
+        batches[-1].append(call)
+        entities |= targets
+    return [batch for batch in batches if batch]
+
 
 class CommandHandler:
     """Handle natural language commands."""
 
-    def __init__(self, hass: HomeAssistant, api_client, toolset_manager):
-        """Initialize command handler."""
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api_client,
+        toolset_manager,
+        topk: int = DEFAULT_TOPK_RESOLVE,
+        topk_margin: float = DEFAULT_TOPK_MARGIN,
+        shadow_mode: bool = DEFAULT_SHADOW_MODE,
+        record_traffic: bool = DEFAULT_RECORD_TRAFFIC,
+        semantic_threshold: float = DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+        entry_id: str | None = None,
+    ):
+        """Initialize command handler; local state is kept per entry_id."""
         self.hass = hass
+        self.topk = topk
+        self.topk_margin = topk_margin
         self.api_client = api_client
         self.toolset_manager = toolset_manager
         self._last_command: dict | None = None
+        self.correction_index = CorrectionIndex(hass, entry_id=entry_id)
+        self.validator = ParameterValidator(toolset_manager)
+        self.usage = api_client.usage
+        self.metrics = get_metrics(hass)
+        self.loop_monitor = get_loop_monitor(hass)
+        self.tracer = get_tracer(hass)
+        self._recent_results: OrderedDict[str, dict] = OrderedDict()
+        self.semantic_cache = SemanticCache(toolset_manager, semantic_threshold)
+        self.shadow = ShadowRecorder(hass, enabled=shadow_mode, entry_id=entry_id)
+        self.responder = ResponseSynthesizer(toolset_manager)
+        self.traffic = TrafficRecorder(
+            hass, toolset_manager, enabled=record_traffic, entry_id=entry_id
+        )
+        # End-to-end time of the first command since setup (cold start)
+        self.first_command_duration: float | None = None
+
+    def configure(
+        self,
+        topk: int = DEFAULT_TOPK_RESOLVE,
+        topk_margin: float = DEFAULT_TOPK_MARGIN,
+        shadow_mode: bool = DEFAULT_SHADOW_MODE,
+        record_traffic: bool = DEFAULT_RECORD_TRAFFIC,
+        semantic_threshold: float = DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+    ):
+        """Apply routing, caching and recording options to the running handler."""
+        self.topk = topk
+        self.topk_margin = topk_margin
+        self.shadow.enabled = shadow_mode
+        self.traffic.enabled = record_traffic
+        self.semantic_cache.threshold = semantic_threshold
+        if not semantic_threshold:
+            self.semantic_cache.clear()
+
+    async def async_setup(self):
+        """Load persisted local state."""
+        await self.correction_index.async_load()
+        await self.shadow.async_load()
+
+    async def async_unload(self):
+        """Write out recorded traffic before the entry goes away."""
+        await self.traffic.async_close()
 
     def _get_banks(self) -> list[str] | None:
         """Get correction bank list if available."""
@@ -34,6 +150,30 @@ class CommandHandler:
             "timestamp": time.time(),
         }
 
+    def _cache_result(self, query: str, tool: str, parameters: dict, area: str):
+        """Remember a successful single command for budget-constrained reuse."""
+        key = " ".join(normalize_query(query))
+        self._recent_results.pop(key, None)
+        self._recent_results[key] = {
+            "tool": tool,
+            "parameters": dict(parameters),
+            "area": area,
+        }
+        while len(self._recent_results) > RESULT_CACHE_SIZE:
+            self._recent_results.popitem(last=False)
+        self.semantic_cache.add(query, tool, parameters, area)
+
+    def _cached_result(self, query: str) -> dict | None:
+        """Return a previously resolved tool call for the same phrasing."""
+        key = " ".join(normalize_query(query))
+        cached = self._recent_results.get(key)
+        if cached is not None:
+            self._recent_results.move_to_end(key)
+        self.metrics.cache_lookups.inc(
+            "result_cache", "miss" if cached is None else "hit"
+        )
+        return cached
+
     def _has_recent_command(self) -> bool:
         """Check if there's a recent command within the correction window."""
         if not self._last_command:
@@ -42,7 +182,7 @@ class CommandHandler:
             time.time() - self._last_command["timestamp"]
         ) < CORRECTION_WINDOW_SECONDS
 
-    async def _handle_correction(self, query: str, use_respond: bool = False):
+    async def _handle_correction(self, query: str):
         """Handle a correction by re-resolving with context and saving to memory bank."""
         prev = self._last_command
         bank_id = self.toolset_manager.correction_bank_id
@@ -53,22 +193,28 @@ class CommandHandler:
         # Build a combined query: original intent + correction hint
         corrected_query = f"{prev['query']} (correction: {query})"
 
-        if use_respond:
-            result = await self.api_client.respond(corrected_query, [toolset_signature])
-            response_text = result.get("response", {}).get("text", "")
-        else:
-            result = await self.api_client.resolve(
-                corrected_query, [toolset_signature], banks=self._get_banks()
-            )
+        result = await self.api_client.resolve(
+            corrected_query, [toolset_signature], banks=self._get_banks()
+        )
 
         tool_name = result["resolved"]["tool"]
         parameters = result["resolved"]["parameters"]
 
         # Execute the corrected tool
-        success = await self.execute_tool(tool_name, parameters)
+        success = await self.execute_tool(
+            tool_name, parameters, toolset_signature, corrected_query
+        )
 
-        # Fire correction to memory bank (original query → correct tool/params)
-        if bank_id:
+        # Learn locally so the same phrasing skips classify + resolve next time
+        if success:
+            self.correction_index.add(
+                prev["query"], tool_name, parameters, prev["area"]
+            )
+            self.semantic_cache.add(prev["query"], tool_name, parameters, prev["area"])
+
+        # Fire correction to memory bank (original query → correct tool/params).
+        # Skipped when the budget is tight; the local index already has it.
+        if bank_id and self.usage.budget_level() in (BUDGET_NORMAL, BUDGET_LOW):
             try:
                 await self.api_client.correct(
                     query=prev["query"],
@@ -94,29 +240,291 @@ class CommandHandler:
             "metadata": result.get("metadata", {}),
         }
 
-        if use_respond:
-            response_data["response"] = response_text
-
         return response_data
 
+    async def _execute_local(self, query: str, match: dict, source: str):
+        """Execute a locally known tool call without any API round trip."""
+        tool_name = match["tool"]
+        parameters = dict(match["parameters"])
+        area = match["area"]
+        _LOGGER.debug("Local %s hit for '%s' → %s", source, query, tool_name)
+        _emit("classified", area=area, source=source)
+
+        success = await self.execute_tool(tool_name, parameters, area, query)
+        self._save_last_command(query, tool_name, parameters, area)
+
+        return {
+            "success": success,
+            "tool": tool_name,
+            "parameters": parameters,
+            "area": area,
+            "extracted": False,
+            "local": True,
+            "metadata": {"source": source},
+        }
+
     async def handle_command(
-        self, query: str, use_respond: bool = False, use_classify_respond: bool = False
+        self,
+        query: str,
+        use_respond: bool = False,
+        use_classify_respond: bool = False,
+        on_progress: Callable[[str, dict], None] | None = None,
+        timeout: float | None = None,
+        remote_response: bool = True,
     ):
         """Process a natural language command with classification.
 
         Args:
             query: Natural language command
-            use_respond: If True, use resolve/respond endpoint for natural language responses.
+            use_respond: If True, add a spoken confirmation as "response".
+            remote_response: With use_respond, whether tool calls no local
+                template covers are described by the (billed) respond
+                endpoint; if False, "response" is left out for the caller
+                to word.
             use_classify_respond: If True, use classify/respond endpoint for chat-like responses.
+            on_progress: Called with (event, data) as the command is classified,
+                and as each tool call is resolved and executed.
+            timeout: Seconds the whole command may take. Every API call and
+                service call is bounded by what is left; once it runs out,
+                pending work is cancelled and the result has "timed_out".
         """
-        # Ensure toolsets are synced (lazy refresh if stale)
-        await self.toolset_manager.ensure_synced()
+        progress_token = _progress.set(on_progress)
+        deadline_token = start_deadline(timeout)
+        try:
+            # The profiler only exists once the profile service armed it
+            profiler = self.hass.data.get(DATA_PROFILER)
+            if profiler is not None and profiler.pending_commands:
+                return await profiler.run(
+                    "command",
+                    query,
+                    self._run_command,
+                    query,
+                    use_respond,
+                    use_classify_respond,
+                    remote_response,
+                )
+            return await self._run_command(
+                query, use_respond, use_classify_respond, remote_response
+            )
+        finally:
+            reset_deadline(deadline_token)
+            _progress.reset(progress_token)
+
+    async def _run_command(
+        self,
+        query: str,
+        use_respond: bool,
+        use_classify_respond: bool,
+        remote_response: bool = True,
+    ):
+        """Handle a command with usage accounting, metrics and tracing."""
+        start = time.monotonic()
+        token = self.usage.start_command()
+        trace_token = self.tracer.start(query)
+        traffic_token = self.traffic.start()
+        outcome = "error"
+        result = None
+        with self.loop_monitor.watch("command") as lag:
+            try:
+                try:
+                    result = await self._handle_command(query, use_classify_respond)
+                except DeadlineExceeded as err:
+                    result = self._timed_out(err)
+                if use_respond and "response" not in result:
+                    await self._add_response(query, result, remote_response)
+                if result.get("timed_out"):
+                    outcome = "timeout"
+                else:
+                    outcome = "success" if result.get("success") else "failure"
+                result["trace_id"] = current_trace_id()
+                return result
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            finally:
+                cost = self.usage.finish_command(token)
+                path = cost.get("path", "unknown")
+                duration = time.monotonic() - start
+                if self.first_command_duration is None:
+                    self.first_command_duration = duration
+                self.metrics.commands.inc(path, outcome)
+                self.metrics.command_duration.observe(duration, path)
+                trace = self.tracer.finish(
+                    trace_token,
+                    path=path,
+                    outcome=outcome,
+                    requests=cost.get("requests", 0),
+                    loop_stall_ms=round(lag.max_stall * 1000, 3),
+                )
+                self.traffic.finish(
+                    traffic_token,
+                    query,
+                    {
+                        "use_respond": use_respond,
+                        "use_classify_respond": use_classify_respond,
+                    },
+                    result,
+                    trace,
+                )
+                _LOGGER.debug(
+                    "Command '%s' [%s] took path %s in %.0f ms (%d billed requests)",
+                    query,
+                    trace["trace_id"],
+                    path,
+                    trace["duration_ms"],
+                    cost.get("requests", 0),
+                )
+
+    async def _handle_command(self, query: str, use_classify_respond: bool):
+        """Route a command, preferring cheaper paths as the budget runs low."""
+        budget = self.usage.budget_level()
+        if budget != BUDGET_NORMAL and use_classify_respond:
+            _LOGGER.debug("Request budget %s, skipping classify/respond", budget)
+            use_classify_respond = False
 
         # If using classify/respond, handle it separately
         if use_classify_respond:
+            self.usage.set_path("classify_respond")
+            await self.toolset_manager.ensure_synced()
             return await self.handle_command_with_classify_respond(query)
 
+        if self.shadow.enabled and budget == BUDGET_NORMAL:
+            return await self._handle_shadowed(query)
+
+        # Previously corrected phrasing resolves locally, no API round trip
+        corrected = self.correction_index.lookup(query)
+        self.metrics.cache_lookups.inc(
+            "correction_index", "miss" if corrected is None else "hit"
+        )
+        if corrected is not None:
+            self.usage.set_path("local_correction")
+            return await self._execute_local(query, corrected, "correction_index")
+
+        # So does a paraphrase of a command resolved before
+        if self.semantic_cache.enabled:
+            similar = self.semantic_cache.lookup(query)
+            self.metrics.cache_lookups.inc(
+                "semantic_cache", "miss" if similar is None else "hit"
+            )
+            if similar is not None:
+                self.usage.set_path("semantic_cache")
+                return await self._execute_local(query, similar, "semantic_cache")
+
+        if budget != BUDGET_NORMAL:
+            cached = self._cached_result(query)
+            if cached is not None:
+                self.usage.set_path("cached")
+                return await self._execute_local(query, cached, "result_cache")
+
+        if budget == BUDGET_EXHAUSTED:
+            self.usage.set_path("quota_exhausted")
+            return {"success": False, "error": self.usage.quota_message()}
+
+        # Ensure toolsets are synced (lazy refresh if stale)
+        span = start_span("ensure_synced")
+        await self.toolset_manager.ensure_synced()
+        finish_span(span)
+
+        return await self._handle_remote(query)
+
+    async def _handle_shadowed(self, query: str) -> dict:
+        """Run the remote pipeline and compare each local path's prediction.
+
+        No local prediction is acted on. The latency a local path would have
+        had is the remote time minus the API calls it would have skipped,
+        taken from the command's trace spans.
+        """
+        span = start_span("ensure_synced")
+        await self.toolset_manager.ensure_synced()
+        finish_span(span)
+
+        predictions = {}
+        start = time.perf_counter()
+        match = self.correction_index.lookup(query)
+        if match is not None:
+            predictions["correction_index"] = (
+                {"tool": match["tool"], "parameters": match["parameters"]},
+                (time.perf_counter() - start) * 1000,
+            )
+        start = time.perf_counter()
+        cached = self._recent_results.get(" ".join(normalize_query(query)))
+        if cached is not None:
+            predictions["result_cache"] = (
+                {"tool": cached["tool"], "parameters": cached["parameters"]},
+                (time.perf_counter() - start) * 1000,
+            )
+        start = time.perf_counter()
+        similar = self.semantic_cache.lookup(query)
+        if similar is not None:
+            predictions["semantic_cache"] = (
+                {"tool": similar["tool"], "parameters": similar["parameters"]},
+                (time.perf_counter() - start) * 1000,
+            )
+        start = time.perf_counter()
+        area = self.toolset_manager.area_matcher.match(query)
+        if area is not None:
+            predictions["area_prefilter"] = (
+                area,
+                (time.perf_counter() - start) * 1000,
+            )
+
+        start = time.perf_counter()
+        result = await self._handle_remote(query, prefilter=False)
+        remote_ms = (time.perf_counter() - start) * 1000
+        self.shadow.finish_command()
+        if "error" in result:
+            # No ground truth to compare against
+            return result
+
+        api_ms = classify_ms = 0.0
+        for api_span in current_spans():
+            if api_span["name"] != "api":
+                continue
+            api_ms += api_span.get("duration_ms", 0.0)
+            if api_span["endpoint"].startswith("POST /v1/classify"):
+                classify_ms += api_span.get("duration_ms", 0.0)
+
+        extracted = result.get("extracted")
+        for path, (prediction, local_ms) in predictions.items():
+            if path == "area_prefilter":
+                remote = None if extracted else result.get("area")
+                would_take = remote_ms - classify_ms + local_ms
+            else:
+                remote = None
+                if not extracted:
+                    remote = {
+                        "tool": result.get("tool"),
+                        "parameters": result.get("parameters"),
+                    }
+                would_take = remote_ms - api_ms + local_ms
+            agreed = self.shadow.record(
+                path, query, prediction, remote, would_take, remote_ms
+            )
+            self.metrics.shadow_comparisons.inc(
+                path, "agree" if agreed else "disagree"
+            )
+        return result
+
+    async def _handle_remote(self, query: str, prefilter: bool = True) -> dict:
+        """Classify (unless one area is named), resolve and execute a command."""
         try:
+            if prefilter:
+                # Commands joined by "and"/"then", each naming one area,
+                # need neither the router nor its extraction
+                plan = split_command(query, self.toolset_manager.area_matcher)
+                if plan is not None:
+                    return await self._handle_split(plan)
+
+                # A query naming exactly one known area needs no router
+                area = self.toolset_manager.area_matcher.match(query)
+                self.metrics.cache_lookups.inc(
+                    "area_prefilter", "miss" if area is None else "hit"
+                )
+                if area is not None:
+                    _emit("classified", area=area, source="area_prefilter")
+                    self.usage.set_path("area_prefilter")
+                    return await self._resolve_single(query, area, self._get_banks())
+
             # Step 1: Classify to determine area (1-2 requests depending on extraction)
             classification_result = await self.api_client.classify(
                 query,
@@ -126,11 +534,17 @@ class CommandHandler:
 
             result_data = classification_result["results"][0]
             area = result_data["classification"]
+            _emit(
+                "classified",
+                area=area,
+                extracted=[e["query"] for e in result_data.get("extracted") or []],
+            )
 
             # Check for correction classification
             if area == "correction" and self._has_recent_command():
                 _LOGGER.info("Correction detected for previous command")
-                return await self._handle_correction(query, use_respond)
+                self.usage.set_path("correction")
+                return await self._handle_correction(query)
             elif area == "correction":
                 _LOGGER.info("Correction detected but no recent command to correct")
                 return {
@@ -142,36 +556,42 @@ class CommandHandler:
 
             # Check if extraction was performed
             if result_data.get("extracted"):
+                self.usage.set_path("extracted")
                 # Handle multiple extracted commands
                 _LOGGER.info(
                     "Processing %d extracted commands", len(result_data["extracted"])
                 )
                 results = []
-                responses = []
+                timed_out = None
 
-                for extracted in result_data["extracted"]:
+                for index, extracted in enumerate(result_data["extracted"]):
                     sub_query = extracted["query"]
                     sub_area = extracted["classification"]
                     toolset_signature = sub_area
 
-                    if use_respond:
-                        respond_result = await self.api_client.respond(
-                            sub_query, [toolset_signature]
-                        )
-                        tool_name = respond_result["resolved"]["tool"]
-                        parameters = respond_result["resolved"]["parameters"]
-                        response_text = respond_result.get("response", {}).get(
-                            "text", ""
-                        )
-                        responses.append(response_text)
-                    else:
+                    try:
                         resolve_result = await self.api_client.resolve(
                             sub_query, [toolset_signature], banks=banks
                         )
                         tool_name = resolve_result["resolved"]["tool"]
                         parameters = resolve_result["resolved"]["parameters"]
 
-                    success = await self.execute_tool(tool_name, parameters)
+                        success = await self.execute_tool(
+                            tool_name, parameters, toolset_signature, sub_query
+                        )
+                    except DeadlineExceeded as err:
+                        # Report what ran; the rest is listed as not run
+                        timed_out = err
+                        results.extend(
+                            {
+                                "query": skipped["query"],
+                                "success": False,
+                                "area": skipped["classification"],
+                                "ran": False,
+                            }
+                            for skipped in result_data["extracted"][index:]
+                        )
+                        break
 
                     results.append(
                         {
@@ -184,8 +604,9 @@ class CommandHandler:
                     )
 
                 # Save last executed command for correction window
-                if results:
-                    last = results[-1]
+                executed = [r for r in results if r.get("ran", True)]
+                if executed:
+                    last = executed[-1]
                     self._save_last_command(
                         last["query"], last["tool"], last["parameters"], last["area"]
                     )
@@ -196,10 +617,15 @@ class CommandHandler:
                     "results": results,
                     "metadata": classification_result.get("metadata", {}),
                 }
-
-                if use_respond and responses:
-                    response_data["response"] = " ".join(responses)
-
+                if timed_out is not None:
+                    response_data.update(
+                        timed_out=True,
+                        stage=timed_out.stage,
+                        error=(
+                            f"{timed_out} after {len(executed)} of "
+                            f"{len(results)} commands; the rest were not run"
+                        ),
+                    )
                 return response_data
             else:
                 # Single command
@@ -215,41 +641,377 @@ class CommandHandler:
                         ),
                     }
 
-                toolset_signature = area
+                candidates = self._topk_candidates(query, result_data)
+                if len(candidates) > 1:
+                    self.usage.set_path("topk")
+                    return await self._resolve_top_k(query, candidates, banks)
 
-                if use_respond:
-                    result = await self.api_client.respond(query, [toolset_signature])
-                    response_text = result.get("response", {}).get("text", "")
+                self.usage.set_path("single")
+                return await self._resolve_single(query, area, banks)
+
+        except DeadlineExceeded:
+            raise
+        except Exception as err:
+            _LOGGER.error("Command failed: %s", err)
+            return {"success": False, "error": str(err)}
+
+    async def _resolve_part(
+        self, query: str, area: str, banks: list[str] | None
+    ) -> dict:
+        """Turn one part of a split command into a tool call, locally if known."""
+        match = self.correction_index.lookup(query)
+        self.metrics.cache_lookups.inc(
+            "correction_index", "miss" if match is None else "hit"
+        )
+        if match is not None:
+            return {
+                "query": query,
+                "tool": match["tool"],
+                "parameters": dict(match["parameters"]),
+                "area": match["area"],
+                "local": True,
+            }
+        result = await self.api_client.resolve(query, [area], banks=banks)
+        return {
+            "query": query,
+            "tool": result["resolved"]["tool"],
+            "parameters": result["resolved"]["parameters"],
+            "area": area,
+        }
+
+    async def _execute_batches(
+        self, calls: list[dict], batch_size: int
+    ) -> DeadlineExceeded | None:
+        """Execute calls in order, concurrently within conflict-free batches.
+
+        Each call gets "success", and "error" when it raised. Once a call
+        runs out of time no further batch starts; the calls left get
+        "ran": False. Returns the first timeout. Only cancellation
+        propagates.
+        """
+        timed_out = None
+        batches = _conflict_free_batches(calls, batch_size)
+        for index, batch in enumerate(batches):
+            outcomes = await asyncio.gather(
+                *(
+                    self.execute_tool(
+                        call["tool"], call["parameters"], call["area"], call["query"]
+                    )
+                    for call in batch
+                ),
+                return_exceptions=True,
+            )
+            for call, success in zip(batch, outcomes):
+                if isinstance(success, DeadlineExceeded):
+                    timed_out = timed_out or success
+                elif isinstance(success, Exception):
+                    _LOGGER.error("Tool call %s failed: %s", call["tool"], success)
+                elif isinstance(success, BaseException):
+                    raise success
+                if isinstance(success, Exception):
+                    call["success"] = False
+                    call["error"] = str(success)
                 else:
-                    result = await self.api_client.resolve(
-                        query, [toolset_signature], banks=banks
+                    call["success"] = success
+            if timed_out is not None:
+                skipped = f"{timed_out}; not run"
+                for later in batches[index + 1 :]:
+                    for call in later:
+                        call.update(success=False, ran=False, error=skipped)
+                break
+        return timed_out
+
+    async def _handle_split(self, plan: list[list[tuple[str, str]]]) -> dict:
+        """Run a command split locally by split_command().
+
+        Stages run in order, so "then" is honored. The parts of a stage are
+        resolved concurrently against their area toolsets and executed
+        together, except that a second call on the same entity waits for
+        the first. Once the deadline runs out, later parts are not run.
+        """
+        self.usage.set_path("local_split")
+        _emit(
+            "classified",
+            extracted=[part for stage in plan for part, _ in stage],
+            source="local_split",
+        )
+        banks = self._get_banks()
+        results = []
+        timed_out = None
+
+        for index, parts in enumerate(plan):
+            resolved = await asyncio.gather(
+                *(self._resolve_part(part, area, banks) for part, area in parts),
+                return_exceptions=True,
+            )
+            calls = []
+            for (part, area), call in zip(parts, resolved):
+                if isinstance(call, DeadlineExceeded):
+                    timed_out = timed_out or call
+                    results.append(
+                        {
+                            "query": part,
+                            "success": False,
+                            "area": area,
+                            "ran": False,
+                            "error": str(call),
+                        }
+                    )
+                elif isinstance(call, Exception):
+                    _LOGGER.error("Command part '%s' failed: %s", part, call)
+                    results.append(
+                        {
+                            "query": part,
+                            "success": False,
+                            "area": area,
+                            "error": str(call),
+                        }
                     )
+                elif isinstance(call, BaseException):
+                    raise call
+                else:
+                    calls.append(call)
+                    results.append(call)
 
-                tool_name = result["resolved"]["tool"]
-                parameters = result["resolved"]["parameters"]
+            late = await self._execute_batches(calls, BULK_EXECUTE_BATCH)
+            timed_out = timed_out or late
+            if timed_out is not None:
+                skipped = f"{timed_out}; not run"
+                results.extend(
+                    {
+                        "query": part,
+                        "success": False,
+                        "area": area,
+                        "ran": False,
+                        "error": skipped,
+                    }
+                    for later in plan[index + 1 :]
+                    for part, area in later
+                )
+                break
 
-                success = await self.execute_tool(tool_name, parameters)
+        # Only calls that went through are remembered for caching and
+        # corrections; a failed or cancelled one may not have acted
+        executed = [r for r in results if r.get("success") is True]
+        for call in executed:
+            if not call.get("local"):
+                self._cache_result(
+                    call["query"], call["tool"], call["parameters"], call["area"]
+                )
+        if executed:
+            last = executed[-1]
+            self._save_last_command(
+                last["query"], last["tool"], last["parameters"], last["area"]
+            )
 
-                # Save for correction window
-                self._save_last_command(query, tool_name, parameters, area)
+        response_data = {
+            "success": all(r["success"] for r in results),
+            "extracted": True,
+            "split": "local",
+            "results": results,
+        }
+        if timed_out is not None:
+            response_data.update(
+                timed_out=True,
+                stage=timed_out.stage,
+                error=(
+                    f"{timed_out} after {len(executed)} of {len(results)} "
+                    "commands succeeded; the rest failed or were not run"
+                ),
+            )
+        return response_data
 
-                response_data = {
-                    "success": success,
-                    "tool": tool_name,
-                    "parameters": parameters,
-                    "area": area,
-                    "extracted": False,
-                    "metadata": result.get("metadata", {}),
-                }
+    async def _resolve_single(
+        self, query: str, area: str, banks: list[str] | None
+    ) -> dict:
+        """Resolve and execute a single-intent command on one area toolset."""
+        toolset_signature = area
 
-                if use_respond:
-                    response_data["response"] = response_text
+        result = await self.api_client.resolve(query, [toolset_signature], banks=banks)
 
-                return response_data
+        tool_name = result["resolved"]["tool"]
+        parameters = result["resolved"]["parameters"]
 
-        except Exception as err:
-            _LOGGER.error("Command failed: %s", err)
-            return {"success": False, "error": str(err)}
+        success = await self.execute_tool(
+            tool_name, parameters, toolset_signature, query
+        )
+
+        # Save for correction window
+        self._save_last_command(query, tool_name, parameters, area)
+        if success:
+            self._cache_result(query, tool_name, parameters, area)
+
+        return {
+            "success": success,
+            "tool": tool_name,
+            "parameters": parameters,
+            "area": area,
+            "extracted": False,
+            "metadata": result.get("metadata", {}),
+        }
+
+    @staticmethod
+    def _timed_out(err: DeadlineExceeded) -> dict:
+        """Result for a command cut short by its deadline."""
+        if err.stage.startswith("running "):
+            detail = "it may not have completed"
+        else:
+            detail = "nothing was run"
+        return {
+            "success": False,
+            "timed_out": True,
+            "stage": err.stage,
+            "error": f"{err}; {detail}",
+        }
+
+    async def _add_response(self, query: str, result: dict, remote: bool = True):
+        """Attach a spoken confirmation of the executed tool calls.
+
+        Sentences are synthesized locally; the respond endpoint is only
+        asked about tool calls no template covers, and only when remote.
+        Otherwise such a call leaves the result without a "response".
+        """
+        if "tool" in result:
+            calls = [(query, result)]
+        else:
+            calls = [(r["query"], r) for r in result.get("results", []) if "tool" in r]
+        if not calls:
+            if result.get("timed_out"):
+                result["response"] = (
+                    "Sorry, that took too long and may not have finished."
+                    if result["stage"].startswith("running ")
+                    else "Sorry, that took too long, so nothing was done."
+                )
+            return
+
+        described = [
+            self.responder.describe(
+                call["tool"], call["parameters"], call.get("area"), call["success"]
+            )
+            for _, call in calls
+        ]
+        if not remote and None in described:
+            return
+
+        sentences = []
+        for (sub_query, call), text in zip(calls, described):
+            source = "local"
+            if text is None:
+                text, source = await self._remote_response(sub_query, call)
+            self.metrics.responses.inc(source)
+            sentences.append(text)
+
+        if result.get("timed_out"):
+            sentences.append("I ran out of time for the rest.")
+        response = " ".join(sentences)
+        if result.get("corrected"):
+            response = f"Corrected. {response}"
+        result["response"] = response
+
+    async def _remote_response(self, query: str, call: dict) -> tuple[str, str]:
+        """Ask the respond endpoint for a sentence; returns (text, source)."""
+        if call.get("area") and self.usage.budget_level() == BUDGET_NORMAL:
+            try:
+                result = await self.api_client.respond(query, [call["area"]])
+                text = result.get("response", {}).get("text", "")
+                if text:
+                    return text, "remote"
+            except Exception as err:
+                _LOGGER.debug("Respond fallback failed for '%s': %s", query, err)
+        return ("Done." if call["success"] else "Sorry, that didn't work."), "generic"
+
+    def _topk_candidates(self, query: str, result_data: dict) -> list[str]:
+        """Return the areas worth resolving in parallel when the router is unsure.
+
+        The margin is the top confidence minus the runner-up's when the API
+        lists alternatives, else minus the probability mass it left over.
+        Candidates are the top label, the API's alternatives, then areas
+        ranked locally by name and entity matches.
+        """
+        if self.topk < 2 or self.usage.budget_level() != BUDGET_NORMAL:
+            return []
+        top = result_data["classification"]
+        confidence = result_data.get("confidence")
+        if confidence is None:
+            return []
+        alternatives = [
+            alt["classification"]
+            for alt in sorted(
+                result_data.get("alternatives") or [],
+                key=lambda alt: alt.get("confidence", 0),
+                reverse=True,
+            )
+            if alt.get("classification") not in (top, "correction")
+        ]
+        if alternatives:
+            runner_up = max(
+                alt.get("confidence", 0) for alt in result_data["alternatives"]
+            )
+        else:
+            runner_up = 1 - confidence
+        if confidence - runner_up >= self.topk_margin:
+            return []
+
+        candidates = []
+        for area in [top, *alternatives, *self.toolset_manager.rank_areas(query)]:
+            if area in self.toolset_manager.toolsets and area not in candidates:
+                candidates.append(area)
+        return candidates[: self.topk]
+
+    async def _resolve_top_k(
+        self, query: str, candidates: list[str], banks: list[str] | None
+    ) -> dict:
+        """Resolve against several areas at once and execute the best fit.
+
+        Resolutions are ranked by how well they validate against their own
+        toolset, then by the resolver's confidence if it reports one, then
+        by the router's order.
+        """
+        results = await asyncio.gather(
+            *(
+                self.api_client.resolve(query, [area], banks=banks)
+                for area in candidates
+            ),
+            return_exceptions=True,
+        )
+
+        scored = []
+        best = None
+        for rank, (area, result) in enumerate(zip(candidates, results)):
+            if isinstance(result, Exception):
+                scored.append({"area": area, "error": str(result)})
+                continue
+            tool_name = result["resolved"]["tool"]
+            parameters = result["resolved"]["parameters"]
+            score = self.validator.score(area, tool_name, parameters)
+            confidence = result.get("metadata", {}).get("confidence") or 0
+            scored.append({"area": area, "tool": tool_name, "score": score})
+            key = (score, confidence, -rank)
+            if best is None or key > best[0]:
+                best = (key, area, tool_name, parameters, result)
+
+        if best is None:
+            self.metrics.topk_resolves.inc("failed")
+            raise results[0]
+
+        _, area, tool_name, parameters, result = best
+        outcome = "top" if area == candidates[0] else "alternate"
+        self.metrics.topk_resolves.inc(outcome)
+        _LOGGER.debug("Top-k resolve for '%s' picked %s of %s", query, area, scored)
+
+        success = await self.execute_tool(tool_name, parameters, area, query)
+        self._save_last_command(query, tool_name, parameters, area)
+        if success:
+            self._cache_result(query, tool_name, parameters, area)
+
+        return {
+            "success": success,
+            "tool": tool_name,
+            "parameters": parameters,
+            "area": area,
+            "extracted": False,
+            "metadata": {**result.get("metadata", {}), "candidates": scored},
+        }
 
     async def handle_command_with_classify_respond(self, query: str):
         """Process command using classify/respond endpoint for chat-like responses."""
@@ -263,12 +1025,13 @@ class CommandHandler:
 
             response_text = result.get("response", "")
             classifications = result.get("classifications", [])
+            _emit("classified", areas=[c["label"] for c in classifications])
 
             # Execute tools for each classification
             results = []
             for classification in classifications:
                 area = classification["label"]
-                    toolset_signature = area
+                toolset_signature = area
 
                 # Resolve the specific command for this area
                 resolve_result = await self.api_client.resolve(
@@ -278,7 +1041,9 @@ class CommandHandler:
                 parameters = resolve_result["resolved"]["parameters"]
 
                 # Execute the tool
-                success = await self.execute_tool(tool_name, parameters)
+                success = await self.execute_tool(
+                    tool_name, parameters, toolset_signature, query
+                )
 
                 results.append(
                     {
@@ -296,12 +1061,212 @@ class CommandHandler:
                 "metadata": result.get("metadata", {}),
             }
 
+        except DeadlineExceeded:
+            raise
         except Exception as err:
             _LOGGER.error("Classify/respond command failed: %s", err)
             return {"success": False, "error": str(err)}
 
-    async def execute_tool(self, tool_name: str, parameters: dict):
-        """Execute a tool by calling HA service."""
+    async def _plan_command(self, query: str) -> dict:
+        """Classify and resolve a query into tool calls without executing them."""
+        match = self.correction_index.lookup(query)
+        if match is None and self.usage.budget_level() != BUDGET_NORMAL:
+            match = self._cached_result(query)
+        if match is not None:
+            call = {
+                "query": query,
+                "tool": match["tool"],
+                "parameters": dict(match["parameters"]),
+                "area": match["area"],
+                "local": True,
+            }
+            return {"calls": [call]}
+        if self.usage.budget_level() == BUDGET_EXHAUSTED:
+            return {"error": self.usage.quota_message()}
+
+        area = self.toolset_manager.area_matcher.match(query)
+        if area is not None:
+            result = await self.api_client.resolve(
+                query, [area], banks=self._get_banks()
+            )
+            call = {
+                "query": query,
+                "tool": result["resolved"]["tool"],
+                "parameters": result["resolved"]["parameters"],
+                "area": area,
+            }
+            return {"calls": [call]}
+
+        classification_result = await self.api_client.classify(
+            query,
+            classification_set="ha-area-router-v1",
+            context="Home Assistant voice command routing",
+        )
+        result_data = classification_result["results"][0]
+        area = result_data["classification"]
+
+        if result_data.get("extracted"):
+            targets = [
+                (extracted["query"], extracted["classification"])
+                for extracted in result_data["extracted"]
+            ]
+        elif area == "correction":
+            return {"error": "Corrections are not supported in bulk commands"}
+        elif not area:
+            return {"error": "Could not classify command"}
+        else:
+            targets = [(query, area)]
+
+        banks = self._get_banks()
+
+        async def resolve(sub_query: str, sub_area: str) -> dict:
+            result = await self.api_client.resolve(sub_query, [sub_area], banks=banks)
+            return {
+                "query": sub_query,
+                "tool": result["resolved"]["tool"],
+                "parameters": result["resolved"]["parameters"],
+                "area": sub_area,
+            }
+
+        calls = await asyncio.gather(*(resolve(q, a) for q, a in targets))
+        return {"calls": list(calls)}
+
+    async def handle_commands(
+        self,
+        queries: list[str],
+        max_concurrency: int = BULK_MAX_CONCURRENCY,
+        batch_size: int = BULK_EXECUTE_BATCH,
+        timeout: float | None = None,
+    ) -> list[dict]:
+        """Process several independent commands, e.g. from an automation.
+
+        Queries are deduplicated (by normalized phrasing), then classified
+        and resolved concurrently, at most max_concurrency at a time. The
+        resulting tool calls are executed in input order in batches of
+        batch_size concurrent service calls; a batch is closed early when
+        an entity repeats, so two calls on one entity never race. Returns
+        one result per input query, in input order. With a timeout, calls
+        still running when it runs out are cancelled and no later batch
+        starts; the calls left are marked "ran": False. Either way they
+        carry the error.
+        """
+        deadline_token = start_deadline(timeout)
+        start = time.monotonic()
+        token = self.usage.start_command()
+        self.usage.set_path("bulk")
+        trace_token = self.tracer.start(f"[bulk] {len(queries)} commands")
+        outcome = "error"
+        try:
+            await self.toolset_manager.ensure_synced()
+
+            unique: dict[str, str] = {}
+            for query in queries:
+                unique.setdefault(" ".join(normalize_query(query)), query)
+
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+            async def plan(query: str) -> dict:
+                async with semaphore:
+                    try:
+                        return await self._plan_command(query)
+                    except Exception as err:
+                        _LOGGER.error("Bulk command '%s' failed: %s", query, err)
+                        return {"error": str(err)}
+
+            plans = dict(
+                zip(
+                    unique,
+                    await asyncio.gather(*(plan(q) for q in unique.values())),
+                )
+            )
+
+            await self._execute_batches(
+                [
+                    call
+                    for plan_result in plans.values()
+                    for call in plan_result.get("calls", [])
+                ],
+                batch_size,
+            )
+
+            results = []
+            seen = set()
+            for query in queries:
+                key = " ".join(normalize_query(query))
+                plan_result = plans[key]
+                calls = plan_result.get("calls", [])
+                entry = {
+                    "query": query,
+                    "success": bool(calls) and all(c["success"] for c in calls),
+                    "results": calls,
+                }
+                if "error" in plan_result:
+                    entry["error"] = plan_result["error"]
+                if key in seen:
+                    entry["deduplicated"] = True
+                seen.add(key)
+                results.append(entry)
+
+            outcome = (
+                "success" if all(r["success"] for r in results) else "failure"
+            )
+            _LOGGER.info(
+                "Bulk: %d commands (%d unique) in %.0f ms",
+                len(queries),
+                len(unique),
+                (time.monotonic() - start) * 1000,
+            )
+            return results
+        finally:
+            reset_deadline(deadline_token)
+            self.usage.finish_command(token)
+            self.metrics.commands.inc("bulk", outcome)
+            self.metrics.command_duration.observe(time.monotonic() - start, "bulk")
+            self.tracer.finish(trace_token, path="bulk", outcome=outcome)
+
+    async def execute_tool(
+        self,
+        tool_name: str,
+        parameters: dict,
+        toolset: str | None = None,
+        query: str | None = None,
+    ):
+        """Execute a tool by calling HA service.
+
+        When the toolset is known, parameters are validated and repaired in
+        place against its schema before dispatch.
+        """
+        _emit(
+            "resolved",
+            query=query,
+            tool=tool_name,
+            parameters=dict(parameters),
+            area=toolset,
+        )
+        success = await self._dispatch_tool(tool_name, parameters, toolset, query)
+        _emit(
+            "executed",
+            query=query,
+            tool=tool_name,
+            parameters=parameters,
+            success=success,
+        )
+        return success
+
+    async def _dispatch_tool(
+        self,
+        tool_name: str,
+        parameters: dict,
+        toolset: str | None,
+        query: str | None,
+    ) -> bool:
+        """Validate parameters and make the HA service call."""
+        error = self.validator.validate(toolset, tool_name, parameters, query)
+        if error:
+            _LOGGER.warning("Rejected %s before dispatch: %s", tool_name, error)
+            finish_span(start_span("validate", tool=tool_name), error=error)
+            return False
+
         entity_id = parameters.get("entity_id")
         action = parameters.get("action")
 
@@ -309,8 +1274,17 @@ class CommandHandler:
             _LOGGER.error("Missing entity_id in parameters")
             return False
 
-        # Extract domain from entity_id
-        domain = entity_id.split(".")[0]
+        # Extract domain from entity_id; a list must share one domain
+        entity_ids = entity_id if isinstance(entity_id, list) else [entity_id]
+        if not all(isinstance(item, str) for item in entity_ids):
+            _LOGGER.error("Invalid entity_id in parameters: %r", entity_id)
+            return False
+        domains = {item.split(".")[0] for item in entity_ids}
+        if len(domains) != 1:
+            _LOGGER.error("Entities of several domains in one call: %s", entity_id)
+            return False
+        domain = domains.pop()
+        targets = ", ".join(entity_ids)
 
         # Map action to service
         service_map = {
@@ -355,12 +1329,19 @@ class CommandHandler:
         if "position" in parameters:
             service_data["position"] = parameters["position"]
 
+        span = start_span("service", service=f"{domain}.{service}", entity_id=entity_id)
         try:
-            await self.hass.services.async_call(
-                domain, service, service_data, blocking=True
-            )
-            _LOGGER.info("Executed %s.%s on %s", domain, service, entity_id)
+            async with stage(f"running {domain}.{service} on {targets}"):
+                await self.hass.services.async_call(
+                    domain, service, service_data, blocking=True
+                )
+            _LOGGER.info("Executed %s.%s on %s", domain, service, targets)
+            finish_span(span)
             return True
+        except DeadlineExceeded as err:
+            finish_span(span, error=str(err))
+            raise
         except Exception as err:
             _LOGGER.error("Service call failed: %s", err)
+            finish_span(span, error=str(err))
             return False
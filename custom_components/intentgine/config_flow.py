@@ -4,8 +4,37 @@ import logging
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
-
-from .const import DOMAIN, CONF_API_KEY, CONF_ENDPOINT, DEFAULT_ENDPOINT
+from homeassistant.util.ssl import get_default_context
+
+from .const import (
+    DOMAIN,
+    CONF_API_KEY,
+    CONF_ENDPOINT,
+    DEFAULT_ENDPOINT,
+    CONF_CLASSIFY_BATCH_WINDOW,
+    CONF_CLASSIFY_BATCH_SIZE,
+    DEFAULT_CLASSIFY_BATCH_WINDOW,
+    DEFAULT_CLASSIFY_BATCH_SIZE,
+    CONF_KEEPALIVE,
+    DEFAULT_KEEPALIVE,
+    CONF_TOPK_RESOLVE,
+    CONF_TOPK_MARGIN,
+    DEFAULT_TOPK_RESOLVE,
+    DEFAULT_TOPK_MARGIN,
+    CONF_SHADOW_MODE,
+    DEFAULT_SHADOW_MODE,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_RECORD_TRAFFIC,
+    CONF_RATE_LIMIT,
+    DEFAULT_RATE_LIMIT,
+    CONF_SEMANTIC_CACHE_THRESHOLD,
+    DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+    CONF_ENABLE_AREA_TOOLSETS,
+    DEFAULT_ENABLE_AREA_TOOLSETS,
+    CONF_SYNC_FREQUENCY,
+    DEFAULT_SYNC_FREQUENCY,
+    SYNC_FREQUENCIES,
+)
 from .api_client import IntentgineAPIClient
 
 _LOGGER = logging.getLogger(__name__)
@@ -31,7 +60,9 @@ class IntentgineConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             # Test API connection
             try:
                 _LOGGER.info("Testing connection to %s", endpoint)
-                client = IntentgineAPIClient(api_key, endpoint)
+                client = IntentgineAPIClient(
+                    api_key, endpoint, ssl_context=get_default_context()
+                )
                 _LOGGER.info("Client created, calling list_toolsets...")
                 await client.list_toolsets()
                 _LOGGER.info("list_toolsets succeeded!")
@@ -100,7 +131,74 @@ class IntentgineOptionsFlow(config_entries.OptionsFlow):
                 step_id="init",
                 data_schema=vol.Schema(
                     {
-                        vol.Optional("enable_area_toolsets", default=True): bool,
+                        vol.Optional(
+                            CONF_ENABLE_AREA_TOOLSETS,
+                            default=self.config_entry.options.get(
+                                CONF_ENABLE_AREA_TOOLSETS, DEFAULT_ENABLE_AREA_TOOLSETS
+                            ),
+                        ): bool,
+                        vol.Optional(
+                            CONF_SYNC_FREQUENCY,
+                            default=self.config_entry.options.get(
+                                CONF_SYNC_FREQUENCY, DEFAULT_SYNC_FREQUENCY
+                            ),
+                        ): vol.In(list(SYNC_FREQUENCIES)),
+                        vol.Optional(
+                            CONF_CLASSIFY_BATCH_WINDOW,
+                            default=self.config_entry.options.get(
+                                CONF_CLASSIFY_BATCH_WINDOW,
+                                DEFAULT_CLASSIFY_BATCH_WINDOW,
+                            ),
+                        ): vol.All(vol.Coerce(int), vol.Range(min=0, max=200)),
+                        vol.Optional(
+                            CONF_CLASSIFY_BATCH_SIZE,
+                            default=self.config_entry.options.get(
+                                CONF_CLASSIFY_BATCH_SIZE, DEFAULT_CLASSIFY_BATCH_SIZE
+                            ),
+                        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+                        vol.Optional(
+                            CONF_KEEPALIVE,
+                            default=self.config_entry.options.get(
+                                CONF_KEEPALIVE, DEFAULT_KEEPALIVE
+                            ),
+                        ): bool,
+                        vol.Optional(
+                            CONF_TOPK_RESOLVE,
+                            default=self.config_entry.options.get(
+                                CONF_TOPK_RESOLVE, DEFAULT_TOPK_RESOLVE
+                            ),
+                        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=5)),
+                        vol.Optional(
+                            CONF_TOPK_MARGIN,
+                            default=self.config_entry.options.get(
+                                CONF_TOPK_MARGIN, DEFAULT_TOPK_MARGIN
+                            ),
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+                        vol.Optional(
+                            CONF_SHADOW_MODE,
+                            default=self.config_entry.options.get(
+                                CONF_SHADOW_MODE, DEFAULT_SHADOW_MODE
+                            ),
+                        ): bool,
+                        vol.Optional(
+                            CONF_RECORD_TRAFFIC,
+                            default=self.config_entry.options.get(
+                                CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC
+                            ),
+                        ): bool,
+                        vol.Optional(
+                            CONF_RATE_LIMIT,
+                            default=self.config_entry.options.get(
+                                CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT
+                            ),
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+                        vol.Optional(
+                            CONF_SEMANTIC_CACHE_THRESHOLD,
+                            default=self.config_entry.options.get(
+                                CONF_SEMANTIC_CACHE_THRESHOLD,
+                                DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+                            ),
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
                     }
                 ),
             )
@@ -1,14 +1,58 @@
 """Constants for the Intentgine integration."""
 
 DOMAIN = "intentgine"
+DATA_METRICS = f"{DOMAIN}_metrics"
+DATA_PROFILER = f"{DOMAIN}_profiler"
+DATA_TRACER = f"{DOMAIN}_tracer"
+DATA_CLIENT_POOL = f"{DOMAIN}_client_pool"
+DATA_LOOP_MONITOR = f"{DOMAIN}_loop_monitor"
 
 CONF_API_KEY = "api_key"
 CONF_ENDPOINT = "endpoint"
 CONF_SYNC_FREQUENCY = "sync_frequency"
 CONF_ENABLE_AREA_TOOLSETS = "enable_area_toolsets"
+CONF_CLASSIFY_BATCH_WINDOW = "classify_batch_window"
+CONF_CLASSIFY_BATCH_SIZE = "classify_batch_size"
+CONF_KEEPALIVE = "keepalive"
+CONF_TOPK_RESOLVE = "topk_resolve"
+CONF_TOPK_MARGIN = "topk_margin"
+CONF_SHADOW_MODE = "shadow_mode"
+CONF_RECORD_TRAFFIC = "record_traffic"
+CONF_RATE_LIMIT = "rate_limit"
+CONF_SEMANTIC_CACHE_THRESHOLD = "semantic_cache_threshold"
 
 DEFAULT_ENDPOINT = "https://api.intentgine.dev"
 DEFAULT_SYNC_FREQUENCY = "daily"
+DEFAULT_ENABLE_AREA_TOOLSETS = True
+# Seconds between scheduled syncs, which is also how stale toolsets may get
+# before a command refreshes them; "manual" only syncs on request
+SYNC_FREQUENCIES = {
+    "hourly": 3600,
+    "daily": 86400,
+    "weekly": 7 * 86400,
+    "manual": None,
+}
+# Milliseconds to hold a classify call for others to join; 0 disables batching
+DEFAULT_CLASSIFY_BATCH_WINDOW = 0
+DEFAULT_CLASSIFY_BATCH_SIZE = 8
+DEFAULT_KEEPALIVE = False
+# Resolve against up to this many areas when the router's margin between
+# its top label and the runner-up is below DEFAULT_TOPK_MARGIN; 1 disables
+DEFAULT_TOPK_RESOLVE = 2
+DEFAULT_TOPK_MARGIN = 0.4
+DEFAULT_SHADOW_MODE = False
+DEFAULT_RECORD_TRAFFIC = False
+# Client-side API requests per second; 0 disables the rate limiter
+DEFAULT_RATE_LIMIT = 10
+# Cosine similarity at which a past command's tool call is reused without
+# any API call; 0 disables the semantic cache
+DEFAULT_SEMANTIC_CACHE_THRESHOLD = 0.9
+
+# Pre-warming: how long pooled connections are kept, how often the client
+# checks in, and how early the JWT is refreshed before it expires
+CONNECTION_KEEPALIVE_SECONDS = 120
+WARM_INTERVAL_SECONDS = 60
+JWT_REFRESH_MARGIN_SECONDS = 120
 
 TOOLSET_PREFIX = "ha"
 TOOLSET_VERSION = "v1"
@@ -16,8 +60,67 @@ TOOLSET_GLOBAL = f"{TOOLSET_PREFIX}-global-{TOOLSET_VERSION}"
 
 CORRECTION_BANK_NAME = "ha-corrections-v1"
 CORRECTION_WINDOW_SECONDS = 30
+CORRECTION_INDEX_MAX_ENTRIES = 500
+CORRECTION_INDEX_MIN_SIMILARITY = 0.8
+
+USAGE_HISTORY_DAYS = 31
+USAGE_LOW_FRACTION = 0.10
+USAGE_CRITICAL_FRACTION = 0.02
+USAGE_EXHAUSTED_RETRY_SECONDS = 3600
+RESULT_CACHE_SIZE = 256
+# Semantic cache: commands kept per toolset, hashed n-gram features, and
+# rows added or replaced before a toolset's IDF weights are recomputed
+SEMANTIC_CACHE_MAX_ENTRIES = 1000
+SEMANTIC_CACHE_DIMENSIONS = 256
+SEMANTIC_CACHE_IDF_REFRESH = 64
+
+PROFILE_MAX_REPORTS = 20
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_MAX_RUNS = 20
+PROFILE_STALL_INTERVAL = 0.005
+LOOP_LAG_INTERVAL = 0.01
+# The lag sampler outlives the last sync or command by this long, so a burst
+# of commands shares one sampler task
+LOOP_LAG_IDLE_SECONDS = 10
+LOOP_STALL_WARN_SECONDS = 0.1
+# CPU time a sync may hold the event loop before yielding to other work
+SYNC_SLICE_SECONDS = 0.005
+TRACE_BUFFER_SIZE = 200
+DIAGNOSTICS_SLOWEST_COMMANDS = 10
+SHADOW_MAX_DISAGREEMENTS = 200
+
+# Traffic recording, one file per entry in the config directory; rotated
+# files get .1, .2, ...
+TRAFFIC_FILE = "intentgine_traffic{entry}.jsonl.gz"
+TRAFFIC_MAX_BYTES = 5 * 1024 * 1024
+TRAFFIC_BACKUPS = 3
+# Records are written (one gzip member) every so often or once this many
+# are queued, whichever comes first
+TRAFFIC_FLUSH_SECONDS = 30
+TRAFFIC_FLUSH_LINES = 100
+
+# Rate limiter bucket size, and the tokens background calls leave for
+# interactive ones
+RATE_LIMIT_BURST = 20
+RATE_LIMIT_RESERVE = 5
+
+# Time budgets for a voice or service command and for a bulk request
+COMMAND_TIMEOUT_SECONDS = 10
+BULK_TIMEOUT_SECONDS = 60
+BULK_MAX_TIMEOUT_SECONDS = 300
+
+BULK_MAX_CONCURRENCY = 4
+BULK_EXECUTE_BATCH = 8
+
+# Budget levels reported by UsageTracker.budget_level()
+BUDGET_NORMAL = "normal"
+BUDGET_LOW = "low"
+BUDGET_CRITICAL = "critical"
+BUDGET_EXHAUSTED = "exhausted"
 
 SERVICE_EXECUTE_COMMAND = "execute_command"
 SERVICE_SYNC_TOOLSETS = "sync_toolsets"
+SERVICE_PROFILE = "profile"
+SERVICE_EXECUTE_COMMANDS = "execute_commands"
 
 ATTR_QUERY = "query"
@@ -9,7 +9,7 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers import intent
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
+from .const import DOMAIN, COMMAND_TIMEOUT_SECONDS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -73,11 +73,20 @@ class IntentgineConversationEntity(
         command_handler = self.hass.data[DOMAIN][self.entry.entry_id]["command_handler"]
 
         try:
-            result = await command_handler.handle_command(user_input.text)
+            # Only confirmations worded locally; anything else gets the
+            # generic sentence below rather than a billed respond call
+            result = await command_handler.handle_command(
+                user_input.text,
+                use_respond=True,
+                timeout=COMMAND_TIMEOUT_SECONDS,
+                remote_response=False,
+            )
 
             intent_response = intent.IntentResponse(language=user_input.language)
 
-            if result.get("success"):
+            if result.get("response"):
+                intent_response.async_set_speech(result["response"])
+            elif result.get("success"):
                 if result.get("corrected"):
                     response_text = (
                         f"Corrected. I executed {result.get('tool', 'the command')} "
@@ -0,0 +1,239 @@
+"""Local overlay index of user-corrected commands."""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .area_matcher import has_correction_cue
+from .const import (
+    DOMAIN,
+    CORRECTION_INDEX_MAX_ENTRIES,
+    CORRECTION_INDEX_MIN_SIMILARITY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.corrections"
+SAVE_DELAY_SECONDS = 10
+
+# Filler words that don't change the meaning of a command
+_STOPWORDS = frozenset(
+    {"the", "a", "an", "please", "my", "could", "can", "you", "would", "hey"}
+)
+_TOKEN_RE = re.compile(r"[a-z0-9%]+")
+
+# Words that only say "do it", and prepositions that move with word order;
+# phrasings may differ in these and still name the same thing
+FILLER_WORDS = frozenset(
+    {"turn", "switch", "put", "set", "to", "in", "at", "of", "now", "just"}
+)
+
+# Action words by what they ask for; two phrasings asking for different
+# actions never share a tool call, however many other words they share
+ACTION_SYNONYMS = {
+    "on": "on",
+    "enable": "on",
+    "activate": "on",
+    "off": "off",
+    "kill": "off",
+    "disable": "off",
+    "deactivate": "off",
+    "open": "open",
+    "raise": "open",
+    "close": "close",
+    "shut": "close",
+    "lower": "close",
+    "lock": "lock",
+    "unlock": "unlock",
+    "up": "up",
+    "down": "down",
+    "dim": "dim",
+    "brighten": "brighten",
+    "stop": "stop",
+    "start": "start",
+    "toggle": "toggle",
+}
+
+
+def normalize_query(query: str) -> tuple[str, ...]:
+    """Lowercase, strip punctuation and filler words, return the token tuple."""
+    return tuple(
+        token
+        for token in _TOKEN_RE.findall(query.lower())
+        if token not in _STOPWORDS
+    )
+
+
+def command_actions(tokens) -> frozenset[str]:
+    """Return the actions a normalized command asks for."""
+    return frozenset(
+        ACTION_SYNONYMS[token] for token in tokens if token in ACTION_SYNONYMS
+    )
+
+
+def command_guard(tokens) -> tuple[frozenset, frozenset, frozenset]:
+    """Return the numbers, actions and other content words of a command.
+
+    Two phrasings may only share a tool call when all three match; the
+    content words are what names the entity and area.
+    """
+    numbers = set()
+    content = set()
+    for token in tokens:
+        if token[0].isdigit():
+            numbers.add(token)
+        elif token not in ACTION_SYNONYMS and token not in FILLER_WORDS:
+            content.add(token)
+    return frozenset(numbers), command_actions(tokens), frozenset(content)
+
+
+class CorrectionIndex:
+    """Bounded, persisted map of corrected queries to their tool calls.
+
+    Keys are normalized token strings. Exact keys hit in O(1); otherwise
+    candidates sharing a token are scored by Jaccard similarity and the best
+    one above CORRECTION_INDEX_MIN_SIMILARITY wins. Numbers, actions and
+    the remaining content words must match exactly (see command_guard), so
+    "50%" never resolves to a correction recorded for "20%", "turn on"
+    never to one for "turn off", nor "kitchen ceiling light" to one for
+    "kitchen light"; similarity only tolerates filler and word order.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        max_entries: int = CORRECTION_INDEX_MAX_ENTRIES,
+        min_similarity: float = CORRECTION_INDEX_MIN_SIMILARITY,
+        entry_id: str | None = None,
+    ):
+        """Initialize the correction index, persisted per config entry."""
+        self.hass = hass
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        key = STORAGE_KEY if entry_id is None else f"{STORAGE_KEY}.{entry_id}"
+        self._store = Store(hass, STORAGE_VERSION, key)
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._by_token: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of indexed corrections."""
+        return len(self._entries)
+
+    async def async_load(self):
+        """Load persisted corrections."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        for entry in data.get("entries", []):
+            self._insert(
+                tuple(entry["tokens"]),
+                entry["tool"],
+                entry["parameters"],
+                entry["area"],
+                entry.get("updated", 0),
+            )
+        _LOGGER.debug("Loaded %d local corrections", len(self._entries))
+
+    def _data_to_save(self) -> dict:
+        """Serialize entries for storage (oldest first, so LRU order survives)."""
+        return {
+            "entries": [
+                {
+                    "tokens": list(entry["tokens"]),
+                    "tool": entry["tool"],
+                    "parameters": entry["parameters"],
+                    "area": entry["area"],
+                    "updated": entry["updated"],
+                }
+                for entry in self._entries.values()
+            ]
+        }
+
+    def _insert(
+        self,
+        tokens: tuple[str, ...],
+        tool: str,
+        parameters: dict,
+        area: str,
+        updated: float,
+    ):
+        """Insert or replace an entry and evict the least recently used."""
+        if not tokens:
+            return
+        key = " ".join(tokens)
+        self._entries.pop(key, None)
+        self._entries[key] = {
+            "tokens": tokens,
+            "tool": tool,
+            "parameters": parameters,
+            "area": area,
+            "updated": updated,
+        }
+        for token in set(tokens):
+            self._by_token.setdefault(token, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            old_key, old = self._entries.popitem(last=False)
+            self._unlink(old_key, old["tokens"])
+
+    def _unlink(self, key: str, tokens: tuple[str, ...]):
+        """Remove a key from the token index."""
+        for token in set(tokens):
+            keys = self._by_token.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_token[token]
+
+    def add(self, query: str, tool: str, parameters: dict, area: str):
+        """Record a correction and schedule a save."""
+        self._insert(normalize_query(query), tool, parameters, area, time.time())
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+
+    def lookup(self, query: str) -> dict | None:
+        """Return the corrected tool call for a query, or None.
+
+        A query correcting the previous command ("no, the other one") is
+        never answered locally; only the router's correction class can.
+        """
+        tokens = normalize_query(query)
+        if not tokens or not self._entries or has_correction_cue(query):
+            return None
+
+        key = " ".join(tokens)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        query_set = set(tokens)
+        query_guard = command_guard(query_set)
+        candidates = set()
+        for token in query_set:
+            candidates |= self._by_token.get(token, set())
+
+        best_key = None
+        best_score = self.min_similarity
+        for candidate in candidates:
+            candidate_set = set(self._entries[candidate]["tokens"])
+            if command_guard(candidate_set) != query_guard:
+                continue
+            score = len(query_set & candidate_set) / len(query_set | candidate_set)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]
+
+    def clear(self):
+        """Forget all corrections."""
+        self._entries.clear()
+        self._by_token.clear()
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
@@ -0,0 +1,89 @@
+"""Per-command deadlines shared by every stage of the pipeline."""
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar, Token
+
+# Loop time by which the command running in the current task must finish;
+# child tasks copy the context, so concurrent sub-requests share it
+_deadline: ContextVar[float | None] = ContextVar("intentgine_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """A command ran out of its time budget during a stage."""
+
+    def __init__(self, stage: str):
+        """Initialize the error with the stage that was cut short."""
+        super().__init__(f"ran out of time {stage}")
+        self.stage = stage
+
+
+def start_deadline(timeout: float | None) -> Token:
+    """Give the current command timeout seconds, never extending a deadline."""
+    when = _deadline.get()
+    if timeout is not None:
+        new = asyncio.get_running_loop().time() + timeout
+        when = new if when is None else min(when, new)
+    return _deadline.set(when)
+
+
+def reset_deadline(token: Token):
+    """Restore the deadline in force before start_deadline()."""
+    _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left for the current command, None without a deadline."""
+    when = _deadline.get()
+    if when is None:
+        return None
+    return max(when - asyncio.get_running_loop().time(), 0.0)
+
+
+def current_deadline() -> float | None:
+    """Loop time by which the current command must finish, if it has one."""
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_at(when: float | None):
+    """Run shared work under a deadline, in place of the calling command's."""
+    token = _deadline.set(when)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def no_deadline():
+    """Run work that must not be cut short by the calling command's budget."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@asynccontextmanager
+async def stage(description: str):
+    """Bound a stage by the current deadline, cancelling it when time is up.
+
+    Raises DeadlineExceeded(description) instead of starting a stage when
+    no time is left, or after cancelling one that overran. Stages don't
+    nest: the outer one would report the timeout.
+    """
+    when = _deadline.get()
+    if when is None:
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    if loop.time() >= when:
+        raise DeadlineExceeded(description)
+    try:
+        async with asyncio.timeout_at(when):
+            yield
+    except TimeoutError as err:
+        if loop.time() >= when:
+            raise DeadlineExceeded(description) from err
+        raise
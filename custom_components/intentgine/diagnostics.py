@@ -0,0 +1,132 @@
+"""Diagnostics support for the Intentgine integration."""
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_API_KEY, DIAGNOSTICS_SLOWEST_COMMANDS
+from .loop_monitor import get_loop_monitor
+from .metrics import get_metrics
+from .tracing import get_tracer
+
+TO_REDACT = {CONF_API_KEY, "token"}
+
+# Local caches with hit/miss counters in intentgine_cache_lookups_total
+CACHES = ("result_cache", "correction_index", "semantic_cache", "area_prefilter")
+
+
+def _percentiles(values: list[float]) -> dict:
+    """Nearest-rank p50/p95/max of a list of milliseconds."""
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        "count": len(ordered),
+        "p50_ms": ordered[min(int(0.5 * len(ordered)), last)],
+        "p95_ms": ordered[min(int(0.95 * len(ordered)), last)],
+        "max_ms": ordered[last],
+    }
+
+
+def _stage(span: dict) -> str:
+    """Group spans by stage, API calls by endpoint."""
+    if span["name"] == "api":
+        return f"api {span.get('endpoint')}"
+    return span["name"]
+
+
+def _latency(traces) -> dict:
+    """Percentiles of command and per-stage durations in recent traces."""
+    stages: dict[str, list[float]] = {}
+    for trace in traces:
+        stages.setdefault(f"command ({trace.get('path')})", []).append(
+            trace["duration_ms"]
+        )
+        for span in trace["spans"]:
+            if "duration_ms" in span:
+                stages.setdefault(_stage(span), []).append(span["duration_ms"])
+    return {stage: _percentiles(values) for stage, values in sorted(stages.items())}
+
+
+def _toolsets(manager) -> dict:
+    """Synced toolsets with their sizes and last successful push."""
+    toolsets = {}
+    for signature, tools in manager.toolsets.items():
+        push = manager.toolset_pushes.get(signature, {})
+        toolsets[signature] = {
+            "tools": {
+                tool["name"]: len(
+                    tool["parameters"]["properties"]["entity_id"].get("enum", [])
+                )
+                for tool in tools
+            },
+            "bytes": push.get("bytes"),
+            "hash": push.get("hash"),
+            "pushed_at": push.get("pushed_at"),
+        }
+    return toolsets
+
+
+def _caches(hass: HomeAssistant, handler, manager) -> dict:
+    """Local cache sizes and hit rates (hit rates are for all entries)."""
+    lookups = get_metrics(hass).cache_lookups
+    sizes = {
+        "result_cache": len(handler._recent_results),
+        "correction_index": len(handler.correction_index),
+        "semantic_cache": len(handler.semantic_cache),
+        "area_prefilter": len(manager.area_matcher),
+    }
+    caches = {}
+    for cache in CACHES:
+        hits = lookups.value(cache, "hit")
+        misses = lookups.value(cache, "miss")
+        caches[cache] = {
+            "entries": sizes[cache],
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return caches
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict:
+    """Return a redacted snapshot of the entry's state and recent performance.
+
+    Everything is read from live objects and the trace ring buffer; nothing
+    is fetched from the API or written.
+    """
+    diagnostics = {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+    }
+    data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if data is None:
+        diagnostics["loaded"] = False
+        return diagnostics
+
+    handler = data["command_handler"]
+    manager = data["toolset_manager"]
+    tracer = get_tracer(hass)
+    diagnostics.update(
+        {
+            "loaded": True,
+            "shared_with_entries": data["backend"].refs - 1,
+            "toolsets": _toolsets(manager),
+            "exposed_entities": len(manager.entity_names),
+            "last_sync_age_s": manager.last_sync_age(),
+            "caches": _caches(hass, handler, manager),
+            "semantic_cache": handler.semantic_cache.stats(),
+            "validation": handler.validator.stats(),
+            "connection": data["api_client"].connection_stats(),
+            "usage": data["usage"].summary(),
+            "event_loop": get_loop_monitor(hass).snapshot(),
+            "latency": _latency(tracer.traces),
+            "slowest_commands": async_redact_data(
+                tracer.recent(DIAGNOSTICS_SLOWEST_COMMANDS, slowest=True), TO_REDACT
+            ),
+        }
+    )
+    return diagnostics
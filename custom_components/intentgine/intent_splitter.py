@@ -0,0 +1,47 @@
+"""Local splitting of conjunctive commands so extraction can be skipped."""
+
+import re
+
+from .area_matcher import AreaMatcher
+
+# "then" (", then", "and then") orders what comes after it
+_SEQUENCE = re.compile(r"\s*,?\s*\b(?:and\s+)?then\b\s*,?\s*", re.I)
+
+# "and", commas and semicolons join commands that can run in any order
+_CONJUNCTION = re.compile(r"\s*(?:[,;]\s*(?:and\b\s*)?|\band\b\s*)", re.I)
+
+# A part has to say what to do, or it is probably half of a name
+# ("Tom and Jerry lamp") or leans on the previous part ("and dim them")
+_ACTION_CUE = re.compile(
+    r"\b(?:turn|switch|set|dim|brighten|open|close|shut|raise|lower|stop|"
+    r"toggle|activate|start|on|off)\b",
+    re.I,
+)
+
+
+def split_command(
+    query: str, matcher: AreaMatcher
+) -> list[list[tuple[str, str]]] | None:
+    """Split a conjunctive command into ordered stages of independent parts.
+
+    Returns [[(sub_query, area toolset), ...], ...]: stages run in order,
+    the parts of a stage in any order. Only confident splits are returned,
+    where every part has an action cue and names exactly one known area
+    with no correction cue (see AreaMatcher.match). Anything else returns
+    None and goes to the router, whose extraction splits it instead.
+    """
+    stages = []
+    count = 0
+    for stage_text in _SEQUENCE.split(query.strip()):
+        stage = []
+        for part in _CONJUNCTION.split(stage_text):
+            part = part.strip(" .!?")
+            if not part or not _ACTION_CUE.search(part):
+                return None
+            area = matcher.match(part)
+            if area is None:
+                return None
+            stage.append((part, area))
+        stages.append(stage)
+        count += len(stage)
+    return stages if count > 1 else None
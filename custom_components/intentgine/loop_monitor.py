@@ -0,0 +1,217 @@
+"""Event-loop lag monitoring during syncs and commands."""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DATA_LOOP_MONITOR,
+    LOOP_LAG_IDLE_SECONDS,
+    LOOP_LAG_INTERVAL,
+    LOOP_STALL_WARN_SECONDS,
+    SYNC_SLICE_SECONDS,
+)
+from .metrics import get_metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LoopStallMonitor:
+    """Measure how late the event loop wakes a periodic sleeper."""
+
+    def __init__(self, hass: HomeAssistant, interval: float = LOOP_LAG_INTERVAL):
+        """Initialize the monitor."""
+        self.hass = hass
+        self.interval = interval
+        self.max_stall = 0.0
+        self.total_stall = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        """Start sampling."""
+        self._task = self.hass.async_create_background_task(
+            self._run(), "intentgine loop stall monitor"
+        )
+
+    def stop(self):
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        """Sleep for the interval and record any overshoot as a stall."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            stall = loop.time() - start - self.interval
+            if stall > 0:
+                self._record(stall)
+
+    def _record(self, stall: float):
+        """Account for one late wake-up."""
+        self.total_stall += stall
+        self.max_stall = max(self.max_stall, stall)
+
+
+class LagWindow:
+    """Worst stall seen while one sync or command was running."""
+
+    __slots__ = ("activity", "max_stall", "cause")
+
+    def __init__(self, activity: str):
+        """Initialize the window."""
+        self.activity = activity
+        self.max_stall = 0.0
+        self.cause: str | None = None
+
+
+class LoopLagMonitor(LoopStallMonitor):
+    """Sample event-loop lag while the integration has work in flight.
+
+    One sampler task serves every open watch(); it starts with the first
+    and keeps running for LOOP_LAG_IDLE_SECONDS after the last closes, so
+    back-to-back commands don't each start one. Samples taken while no
+    watch is open are discarded. Our own synchronous slices report
+    their duration through note(). A sampler wake-up can queue behind
+    several slices, so a stall is blamed on the cause with the most slice
+    time since the previous sample when our slices account for at least
+    half of it, and on other code sharing the loop otherwise.
+    """
+
+    def __init__(self, hass: HomeAssistant, interval: float = LOOP_LAG_INTERVAL):
+        """Initialize the monitor."""
+        super().__init__(hass, interval)
+        self.metrics = get_metrics(hass)
+        self.max_stall_cause: str | None = None
+        self.max_stall_at: str | None = None
+        self._windows: list[LagWindow] = []
+        self._idle_since = 0.0
+        # cause -> slice seconds noted since the previous sample
+        self._slices: dict[str, float] = {}
+
+    @contextmanager
+    def watch(self, activity: str):
+        """Sample lag for the duration of a sync or command."""
+        window = LagWindow(activity)
+        self._windows.append(window)
+        if self._task is None:
+            self.start()
+        try:
+            yield window
+        finally:
+            self._windows.remove(window)
+            if not self._windows:
+                self._idle_since = time.monotonic()
+                self._slices.clear()
+
+    async def _run(self):
+        """Sample until no watch has been open for LOOP_LAG_IDLE_SECONDS."""
+        loop = asyncio.get_running_loop()
+        try:
+            while (
+                self._windows
+                or time.monotonic() - self._idle_since < LOOP_LAG_IDLE_SECONDS
+            ):
+                start = loop.time()
+                await asyncio.sleep(self.interval)
+                stall = loop.time() - start - self.interval
+                if stall > 0 and self._windows:
+                    self._record(stall)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    def note(self, cause: str, seconds: float):
+        """Report a synchronous slice of our own that held the loop."""
+        self._slices[cause] = self._slices.get(cause, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, cause: str):
+        """Time a block of synchronous work and note() it."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.note(cause, time.perf_counter() - start)
+
+    async def run_sliced(self, cause: str, items, step) -> list:
+        """Apply step to each item, yielding to the loop between slices.
+
+        A slice ends once it has run SYNC_SLICE_SECONDS; results that are
+        None are dropped. Items are copied first, since whatever they come
+        from may change while we are yielded.
+        """
+        start = time.perf_counter()
+        results = []
+        for item in list(items):
+            result = step(item)
+            if result is not None:
+                results.append(result)
+            elapsed = time.perf_counter() - start
+            if elapsed >= SYNC_SLICE_SECONDS:
+                self.note(cause, elapsed)
+                await asyncio.sleep(0)
+                start = time.perf_counter()
+        self.note(cause, time.perf_counter() - start)
+        return results
+
+    def _cause(self, stall: float) -> tuple[str, bool]:
+        """Attribute a stall, consuming the slices noted since the last sample.
+
+        Returns the cause and whether it was our own work.
+        """
+        slices, self._slices = self._slices, {}
+        if slices and sum(slices.values()) >= stall / 2:
+            return max(slices, key=slices.get), True
+        activities = sorted({window.activity for window in self._windows})
+        return f"outside intentgine (during {', '.join(activities)})", False
+
+    def _record(self, stall: float):
+        """Attribute, export and log a late wake-up."""
+        cause, ours = self._cause(stall)
+        if stall > self.max_stall:
+            self.max_stall_cause = cause
+            self.max_stall_at = dt_util.utcnow().isoformat()
+            self.metrics.loop_stall_max = (stall, cause)
+        super()._record(stall)
+
+        activities = set()
+        for window in self._windows:
+            activities.add(window.activity)
+            if stall > window.max_stall:
+                window.max_stall = stall
+                window.cause = cause
+        for activity in activities:
+            self.metrics.loop_lag.observe(stall, activity)
+
+        if stall >= LOOP_STALL_WARN_SECONDS:
+            # Other integrations' stalls are theirs to report
+            _LOGGER.log(
+                logging.WARNING if ours else logging.DEBUG,
+                "Event loop stalled for %.0f ms (%s)",
+                stall * 1000,
+                cause,
+            )
+
+    def snapshot(self) -> dict:
+        """Worst stall since startup, for diagnostics."""
+        return {
+            "max_stall_ms": round(self.max_stall * 1000, 3),
+            "max_stall_cause": self.max_stall_cause,
+            "max_stall_at": self.max_stall_at,
+            "total_stall_ms": round(self.total_stall * 1000, 3),
+        }
+
+
+def get_loop_monitor(hass: HomeAssistant) -> LoopLagMonitor:
+    """Return the shared loop lag monitor, creating it on first use."""
+    monitor = hass.data.get(DATA_LOOP_MONITOR)
+    if monitor is None:
+        monitor = hass.data[DATA_LOOP_MONITOR] = LoopLagMonitor(hass)
+    return monitor
@@ -0,0 +1,323 @@
+"""Prometheus-format metrics for the Intentgine integration."""
+
+import bisect
+import logging
+import math
+
+from aiohttp import web
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_METRICS
+from .rate_limiter import PRIORITIES
+
+_LOGGER = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SYNC_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    """Escape a label value for the exposition format."""
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """Render a {name="value",...} label set."""
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    """Render a sample value."""
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = ()):
+        """Initialize the counter."""
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        """Increment the counter for a label set."""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        """Current count for a label set."""
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        """Yield exposition lines."""
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, doc: str, labelnames: tuple = (), buckets=LATENCY_BUCKETS
+    ):
+        """Initialize the histogram."""
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        """Record an observation for a label set."""
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        """Yield exposition lines with cumulative buckets."""
+        for labels, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield (
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} "
+                    f"{cumulative}"
+                )
+            label_str = _labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_number(series[-1])}"
+            yield f"{self.name}_count{label_str} {cumulative}"
+
+
+class IntentgineMetrics:
+    """All metrics collected by the integration.
+
+    Recording is a dict lookup and an increment, so it stays on in the
+    command hot path. Gauges describing toolsets, caches and quota are
+    computed from the live objects at scrape time instead.
+    """
+
+    def __init__(self):
+        """Initialize the metric families."""
+        self.commands = Counter(
+            "intentgine_commands_total",
+            "Commands handled by path and outcome",
+            ("path", "outcome"),
+        )
+        self.command_duration = Histogram(
+            "intentgine_command_duration_seconds",
+            "End-to-end command handling time",
+            ("path",),
+        )
+        self.api_latency = Histogram(
+            "intentgine_api_request_duration_seconds",
+            "Intentgine API request latency",
+            ("endpoint", "status"),
+        )
+        self.sync_duration = Histogram(
+            "intentgine_sync_duration_seconds",
+            "Toolset sync duration",
+            ("outcome",),
+            buckets=SYNC_BUCKETS,
+        )
+        self.cache_lookups = Counter(
+            "intentgine_cache_lookups_total",
+            "Local cache lookups by cache and result",
+            ("cache", "result"),
+        )
+        self.jwt_refreshes = Counter(
+            "intentgine_jwt_refreshes_total",
+            "API key to JWT exchanges",
+            ("outcome",),
+        )
+        self.topk_resolves = Counter(
+            "intentgine_topk_resolves_total",
+            "Ambiguous classifications resolved against several areas, by pick",
+            ("outcome",),
+        )
+        self.shadow_comparisons = Counter(
+            "intentgine_shadow_comparisons_total",
+            "Shadow-mode local predictions by path and agreement with the API",
+            ("path", "result"),
+        )
+        self.rate_limit_wait = Histogram(
+            "intentgine_rate_limit_wait_seconds",
+            "Time API requests queued in the client-side rate limiter",
+            ("priority",),
+            buckets=WAIT_BUCKETS,
+        )
+        self.responses = Counter(
+            "intentgine_responses_total",
+            "Spoken confirmations by source (local, remote, generic)",
+            ("source",),
+        )
+        self.loop_lag = Histogram(
+            "intentgine_loop_lag_seconds",
+            "Event loop lag sampled while a sync or command runs",
+            ("activity",),
+            buckets=LAG_BUCKETS,
+        )
+        # (seconds, cause) of the worst stall, set by the loop monitor
+        self.loop_stall_max: tuple[float, str] | None = None
+        self._families = (
+            self.commands,
+            self.command_duration,
+            self.api_latency,
+            self.sync_duration,
+            self.cache_lookups,
+            self.jwt_refreshes,
+            self.topk_resolves,
+            self.shadow_comparisons,
+            self.responses,
+            self.rate_limit_wait,
+            self.loop_lag,
+        )
+
+    @staticmethod
+    def _gauge(name: str, doc: str, samples) -> list[str]:
+        """Render a gauge family from (labels, value) pairs."""
+        lines = [f"# HELP {name} {doc}", f"# TYPE {name} gauge"]
+        for labels, value in samples:
+            lines.append(
+                f"{name}{_labels(tuple(labels), tuple(labels.values()))} "
+                f"{_number(value)}"
+            )
+        return lines
+
+    def _gauges(self, entries: dict) -> list[str]:
+        """Compute point-in-time gauges from the running entries.
+
+        Per-entry gauges carry an entry_id label and per-account ones
+        (shared by the entries of one account) an account label, so no
+        series is reported twice.
+        """
+        toolsets, tools, cache_sizes, validations, remaining = [], [], [], [], []
+        first_command, warmup, queued = [], [], []
+        shared = set()
+        for entry_id, data in entries.items():
+            manager = data["toolset_manager"]
+            handler = data["command_handler"]
+            usage = data["usage"]
+            entry = {"entry_id": entry_id}
+            for cache, size in (
+                ("correction_index", len(handler.correction_index)),
+                ("result_cache", len(handler._recent_results)),
+                ("semantic_cache", len(handler.semantic_cache)),
+            ):
+                cache_sizes.append(({**entry, "cache": cache}, size))
+            stats = handler.validator.stats()
+            for result in ("checked", "repaired", "rejected"):
+                validations.append(({**entry, "result": result}, stats[result]))
+            if handler.first_command_duration is not None:
+                first_command.append((entry, handler.first_command_duration))
+
+            # Entries of the same account share these; report them once
+            backend = data["backend"]
+            if backend.account in shared:
+                continue
+            shared.add(backend.account)
+            account = {"account": backend.account}
+            toolsets.append((account, len(manager.toolsets)))
+            for signature, toolset_tools in manager.toolsets.items():
+                tools.append(({**account, "toolset": signature}, len(toolset_tools)))
+            if usage.remaining_estimate() is not None:
+                remaining.append((account, usage.remaining_estimate()))
+            if data["api_client"].warmup_duration is not None:
+                warmup.append((account, data["api_client"].warmup_duration))
+            limiter = data["api_client"].limiter
+            if limiter is not None:
+                for priority in PRIORITIES:
+                    queued.append(
+                        ({**account, "priority": priority}, limiter.queued(priority))
+                    )
+
+        lines = []
+        lines += self._gauge("intentgine_toolsets", "Synced toolsets", toolsets)
+        lines += self._gauge("intentgine_toolset_tools", "Tools per toolset", tools)
+        lines += self._gauge(
+            "intentgine_cache_entries", "Local cache sizes", cache_sizes
+        )
+        lines += self._gauge(
+            "intentgine_param_validations",
+            "Resolved parameter validations by result",
+            validations,
+        )
+        lines += self._gauge(
+            "intentgine_requests_remaining", "Estimated API quota left", remaining
+        )
+        lines += self._gauge(
+            "intentgine_first_command_duration_seconds",
+            "Time to respond to the first command after startup",
+            first_command,
+        )
+        lines += self._gauge(
+            "intentgine_warmup_duration_seconds",
+            "Session, connection and JWT warm-up time at startup",
+            warmup,
+        )
+        lines += self._gauge(
+            "intentgine_rate_limit_queued",
+            "API requests waiting in the client-side rate limiter",
+            queued,
+        )
+        if self.loop_stall_max is not None:
+            stall, cause = self.loop_stall_max
+            lines += self._gauge(
+                "intentgine_loop_stall_max_seconds",
+                "Worst event loop stall seen during a sync or command, by cause",
+                [({"cause": cause}, stall)],
+            )
+        return lines
+
+    def render(self, entries: dict | None = None) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for family in self._families:
+            lines.append(f"# HELP {family.name} {family.doc}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(family.samples())
+        lines += self._gauges(entries or {})
+        return "\n".join(lines) + "\n"
+
+
+def get_metrics(hass: HomeAssistant) -> IntentgineMetrics:
+    """Return the shared metrics registry, creating it on first use."""
+    metrics = hass.data.get(DATA_METRICS)
+    if metrics is None:
+        metrics = hass.data[DATA_METRICS] = IntentgineMetrics()
+    return metrics
+
+
+class IntentgineMetricsView(HomeAssistantView):
+    """Expose metrics to an authenticated Prometheus scraper."""
+
+    url = "/api/intentgine/metrics"
+    name = "api:intentgine:metrics"
+    requires_auth = True
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the current metrics."""
+        hass = request.app[KEY_HASS]
+        entries = hass.data.get(DOMAIN, {})
+        body = get_metrics(hass).render(entries)
+        return web.Response(body=body.encode(), headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,261 @@
+"""Schema validation and repair of resolved tool parameters."""
+
+import logging
+import re
+
+_LOGGER = logging.getLogger(__name__)
+
+# Minimum difflib ratio for a fuzzy enum/entity repair to be accepted
+FUZZY_CUTOFF = 0.75
+
+# Common off-schema spellings of action values
+_ACTION_ALIASES = {
+    "on": "turn_on",
+    "off": "turn_off",
+    "switch_on": "turn_on",
+    "switch_off": "turn_off",
+    "open_cover": "open",
+    "close_cover": "close",
+    "stop_cover": "stop",
+    "raise": "open",
+    "lower": "close",
+}
+
+# Query words that imply an action when the resolver omitted it
+_ACTION_CUES = {
+    "on": "turn_on",
+    "off": "turn_off",
+    "toggle": "toggle",
+    "open": "open",
+    "raise": "open",
+    "close": "close",
+    "shut": "close",
+    "lower": "close",
+    "stop": "stop",
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+class _CompiledTool:
+    """Precomputed checks for one tool schema."""
+
+    __slots__ = ("name", "required", "enums", "numbers", "strings")
+
+    def __init__(self, tool: dict):
+        """Compile a tool's JSON schema."""
+        schema = tool.get("parameters", {})
+        properties = schema.get("properties", {})
+        self.name = tool["name"]
+        self.required = tuple(schema.get("required", ()))
+        self.enums: dict[str, frozenset] = {}
+        self.numbers: dict[str, tuple[float | None, float | None]] = {}
+        self.strings: set[str] = set()
+
+        for param, spec in properties.items():
+            if "enum" in spec:
+                self.enums[param] = frozenset(spec["enum"])
+            elif spec.get("type") == "number":
+                self.numbers[param] = (spec.get("minimum"), spec.get("maximum"))
+            else:
+                self.strings.add(param)
+
+
+class ParameterValidator:
+    """Validate resolved parameters against the synced toolset schemas.
+
+    Compiled schemas are cached per toolset signature and recompiled only
+    when ToolsetManager replaces that toolset's tool list during a sync.
+    Parameters are repaired in place; validate() returns an error string
+    when the call cannot be made safe.
+    """
+
+    def __init__(self, toolset_manager):
+        """Initialize the validator."""
+        self.toolset_manager = toolset_manager
+        self._compiled: dict[str, tuple[list, dict[str, _CompiledTool]]] = {}
+        self.checked = 0
+        self.repaired = 0
+        self.rejected = 0
+
+    def _get_compiled(self, signature: str) -> dict[str, _CompiledTool] | None:
+        """Return compiled tools for a toolset, recompiling if it changed."""
+        tools = self.toolset_manager.toolsets.get(signature)
+        if tools is None:
+            return None
+        cached = self._compiled.get(signature)
+        if cached is not None and cached[0] is tools:
+            return cached[1]
+        compiled = {tool["name"]: _CompiledTool(tool) for tool in tools}
+        self._compiled[signature] = (tools, compiled)
+        return compiled
+
+    def _repair_entity(self, value, allowed: frozenset) -> str | list | None:
+        """Map an entity_id or friendly name to the closest one in the toolset.
+
+        A list is repaired item by item, or not at all.
+        """
+        if isinstance(value, list) and value:
+            fixed = [self._repair_entity(item, allowed) for item in value]
+            return None if None in fixed else fixed
+        if not isinstance(value, str):
+            return None
+        if value in allowed:
+            return value
+        names = self.toolset_manager.entity_names
+        wanted = value.split(".", 1)[-1].replace("_", " ").lower()
+
+        lookup = {}
+        for entity_id in allowed:
+            lookup[entity_id.split(".", 1)[-1].replace("_", " ")] = entity_id
+            name = names.get(entity_id)
+            if name:
+                lookup[name.lower()] = entity_id
+
+        import difflib  # repairs are rare; don't load it at startup
+
+        match = difflib.get_close_matches(wanted, lookup, n=1, cutoff=FUZZY_CUTOFF)
+        return lookup[match[0]] if match else None
+
+    @staticmethod
+    def _repair_enum(param: str, value, allowed: frozenset, query: str | None):
+        """Map an off-schema (or missing) enum value to an allowed one."""
+        if param == "action":
+            if isinstance(value, str) and _ACTION_ALIASES.get(value) in allowed:
+                return _ACTION_ALIASES[value]
+            if value is None and query:
+                cues = {
+                    _ACTION_CUES[word]
+                    for word in _WORD_RE.findall(query.lower())
+                    if word in _ACTION_CUES
+                }
+                cues &= allowed
+                if len(cues) == 1:
+                    return cues.pop()
+        if isinstance(value, str):
+            import difflib
+
+            match = difflib.get_close_matches(
+                value.lower(), allowed, n=1, cutoff=FUZZY_CUTOFF
+            )
+            if match:
+                return match[0]
+        return None
+
+    def validate(
+        self,
+        signature: str | None,
+        tool_name: str,
+        parameters: dict,
+        query: str | None = None,
+    ) -> str | None:
+        """Check and repair parameters in place.
+
+        Returns None if the call may be dispatched, or an error message.
+        Toolsets that aren't synced locally are passed through unchecked.
+        """
+        compiled = self._get_compiled(signature) if signature else None
+        if compiled is None:
+            return None
+        self.checked += 1
+
+        tool = compiled.get(tool_name)
+        if tool is None:
+            self.rejected += 1
+            return f"Unknown tool {tool_name} for {signature}"
+
+        repairs = []
+
+        for param, allowed in tool.enums.items():
+            value = parameters.get(param)
+            if isinstance(value, str) and value in allowed:
+                continue
+            if param == "entity_id":
+                # Only entities of this toolset; one exposed in another area
+                # is still a wrong guess for a command routed here
+                fixed = self._repair_entity(value, allowed)
+            else:
+                fixed = self._repair_enum(param, value, allowed, query)
+            if fixed is not None and fixed == value:
+                continue
+            if fixed is not None:
+                parameters[param] = fixed
+                repairs.append(f"{param}: {value!r} -> {fixed!r}")
+            elif param in tool.required:
+                self.rejected += 1
+                return f"Invalid {param} {value!r} for {tool_name}"
+            elif value is not None:
+                del parameters[param]
+                repairs.append(f"{param}: dropped {value!r}")
+
+        for param, (minimum, maximum) in tool.numbers.items():
+            raw = parameters.get(param)
+            if raw is None:
+                continue
+            value = raw
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                try:
+                    value = float(str(value).rstrip("%"))
+                except ValueError:
+                    del parameters[param]
+                    repairs.append(f"{param}: dropped {raw!r}")
+                    continue
+            if minimum is not None and value < minimum:
+                value = minimum
+            if maximum is not None and value > maximum:
+                value = maximum
+            if value != raw:
+                parameters[param] = value
+                repairs.append(f"{param}: {raw!r} -> {value!r}")
+
+        for param in tool.required:
+            if parameters.get(param) is None:
+                self.rejected += 1
+                return f"Missing {param} for {tool_name}"
+
+        if repairs:
+            self.repaired += 1
+            _LOGGER.info("Repaired %s parameters: %s", tool_name, "; ".join(repairs))
+        return None
+
+    def score(self, signature: str, tool_name: str, parameters: dict) -> float:
+        """Rate how well a resolved call fits a toolset, without repairing.
+
+        1.0 is a call that validates as-is, 0.0 one that would be rejected;
+        calls that would need repairs land in between. Used to pick among
+        candidate resolutions, so counters are left alone.
+        """
+        compiled = self._get_compiled(signature)
+        if compiled is None:
+            return 0.5
+        tool = compiled.get(tool_name)
+        if tool is None:
+            return 0.0
+        if any(parameters.get(param) is None for param in tool.required):
+            return 0.0
+
+        score = 1.0
+        for param, allowed in tool.enums.items():
+            value = parameters.get(param)
+            if value is None or (isinstance(value, str) and value in allowed):
+                continue
+            if param == "entity_id":
+                fixed = self._repair_entity(value, allowed)
+                if fixed is None:
+                    return 0.0
+                if fixed != value:
+                    score -= 0.5
+            else:
+                score -= 0.25
+        return max(score, 0.0)
+
+    def stats(self) -> dict:
+        """Return validation counters and rates."""
+        checked = self.checked or 1
+        return {
+            "checked": self.checked,
+            "repaired": self.repaired,
+            "rejected": self.rejected,
+            "repair_rate": self.repaired / checked,
+            "rejection_rate": self.rejected / checked,
+        }
@@ -0,0 +1,257 @@
+"""On-demand profiling of the command and sync hot paths."""
+
+import asyncio
+import logging
+import os
+import selectors
+import sys
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    DATA_PROFILER,
+    PROFILE_MAX_REPORTS,
+    PROFILE_TOP_FUNCTIONS,
+    PROFILE_MAX_RUNS,
+    PROFILE_STALL_INTERVAL,
+)
+from .loop_monitor import LoopStallMonitor
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.profile"
+
+TARGET_COMMAND = "command"
+TARGET_SYNC = "sync"
+
+# The event loop's own machinery; its time is idle waiting, not our work
+_LOOP_FILES = (os.path.dirname(asyncio.__file__), selectors.__file__)
+
+# Session profiling the command or sync running in the current task; tasks
+# it spawns copy the context, other commands' tasks never see it
+_current_session: ContextVar["_Session | None"] = ContextVar(
+    "intentgine_profile_session", default=None
+)
+
+
+def _dispatch(frame, event, arg):
+    """Thread-wide profile hook; hands events to the current task's session."""
+    session = _current_session.get()
+    if session is not None:
+        session.dispatch(frame, event, arg)
+
+
+def _function_label(key: tuple) -> str:
+    """Render a (filename, line, name) key compactly."""
+    filename, line, name = key
+    if not line:
+        return name
+    short = os.sep.join(filename.split(os.sep)[-2:])
+    return f"{short}:{line}({name})"
+
+
+class _Session:
+    """sys.setprofile hook recording wall and CPU time per function.
+
+    Coroutine suspensions arrive as return events and resumptions as call
+    events, so times are on-stack times: waiting on I/O is excluded, and
+    a function whose wall time far exceeds its CPU time is blocking the
+    loop. Only events from the profiled run's own tasks reach the session
+    (see _dispatch), so other work on the loop is left out, and cpu is
+    the CPU time those tasks used.
+    """
+
+    def __init__(self):
+        """Initialize an empty session."""
+        # key -> [calls, wall, cpu, self_wall, self_cpu]
+        self.stats: dict[tuple, list] = {}
+        self.cpu = 0.0
+        # [frame, c_function, start_wall, start_cpu, child_wall, child_cpu]
+        self._stack: list[list] = []
+
+    def dispatch(self, frame, event, arg):
+        """Profile hook."""
+        if event == "call":
+            self._stack.append(
+                [frame, None, time.perf_counter(), time.thread_time(), 0.0, 0.0]
+            )
+            return
+        if event == "c_call":
+            self._stack.append(
+                [frame, arg, time.perf_counter(), time.thread_time(), 0.0, 0.0]
+            )
+            return
+
+        # return / c_return / c_exception; ignore frames entered before
+        # profiling started
+        if not self._stack:
+            return
+        top = self._stack[-1]
+        c_function = None if event == "return" else arg
+        if top[0] is not frame or top[1] is not c_function:
+            return
+        self._stack.pop()
+
+        wall = time.perf_counter() - top[2]
+        cpu = time.thread_time() - top[3]
+        if c_function is None:
+            code = frame.f_code
+            key = (code.co_filename, code.co_firstlineno, code.co_name)
+        else:
+            # Keyed by the caller's file so loop-internal calls can be dropped
+            name = getattr(c_function, "__qualname__", repr(c_function))
+            key = (frame.f_code.co_filename, 0, f"<built-in {name}>")
+
+        entry = self.stats.get(key)
+        if entry is None:
+            entry = self.stats[key] = [0, 0.0, 0.0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += wall
+        entry[2] += cpu
+        entry[3] += wall - top[4]
+        entry[4] += cpu - top[5]
+
+        if self._stack:
+            self._stack[-1][4] += wall
+            self._stack[-1][5] += cpu
+        else:
+            self.cpu += cpu
+
+    def top(self, limit: int) -> list[dict]:
+        """Return the functions with the most cumulative wall time."""
+        ranked = sorted(
+            (
+                item
+                for item in self.stats.items()
+                if not item[0][0].startswith(_LOOP_FILES)
+            ),
+            key=lambda item: item[1][1],
+            reverse=True,
+        )
+        return [
+            {
+                "function": _function_label(key),
+                "calls": calls,
+                "wall_ms": round(wall * 1000, 3),
+                "cpu_ms": round(cpu * 1000, 3),
+                "self_wall_ms": round(self_wall * 1000, 3),
+                "self_cpu_ms": round(self_cpu * 1000, 3),
+            }
+            for key, (calls, wall, cpu, self_wall, self_cpu) in ranked[:limit]
+        ]
+
+
+class Profiler:
+    """Profile the next N commands or syncs when armed by the profile service.
+
+    Callers check pending_commands / pending_syncs (a plain attribute read)
+    before routing through run(), so nothing is hooked while disarmed.
+    Concurrent runs are profiled separately, each seeing only its own
+    tasks; the loop stall figures are for the whole loop.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """Initialize the profiler."""
+        self.hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self.pending_commands = 0
+        self.pending_syncs = 0
+        self._sessions = 0
+        # Profile hook installed before ours (a debugger, say); put back after
+        self._previous_hook = None
+        self._loaded = False
+        self.reports: deque[dict] = deque(maxlen=PROFILE_MAX_REPORTS)
+
+    async def async_load(self):
+        """Load previous reports (once, however many entries share us)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        data = await self._store.async_load()
+        if data:
+            self.reports.extend(data.get("reports", []))
+
+    def _data_to_save(self) -> dict:
+        """Serialize reports for storage."""
+        return {"reports": list(self.reports)}
+
+    def arm(self, target: str, count: int):
+        """Profile the next `count` commands or syncs."""
+        count = max(1, min(int(count), PROFILE_MAX_RUNS))
+        if target == TARGET_SYNC:
+            self.pending_syncs = count
+        else:
+            self.pending_commands = count
+        _LOGGER.info("Profiling the next %d %s run(s)", count, target)
+
+    async def run(self, target: str, label: str, func, *args):
+        """Run func(*args) under the profiler and store a report."""
+        if _current_session.get() is not None:
+            # Nested (e.g. a lazy sync inside a profiled command); the outer
+            # session already covers it
+            return await func(*args)
+
+        if target == TARGET_SYNC:
+            self.pending_syncs = max(self.pending_syncs - 1, 0)
+        else:
+            self.pending_commands = max(self.pending_commands - 1, 0)
+
+        session = _Session()
+        monitor = LoopStallMonitor(self.hass, PROFILE_STALL_INTERVAL)
+        monitor.start()
+        started = dt_util.utcnow().isoformat()
+        wall_start = time.perf_counter()
+        token = _current_session.set(session)
+        self._sessions += 1
+        if self._sessions == 1:
+            self._previous_hook = sys.getprofile()
+            sys.setprofile(_dispatch)
+        try:
+            return await func(*args)
+        finally:
+            self._sessions -= 1
+            if not self._sessions:
+                # Unless someone else took the hook over meanwhile
+                if sys.getprofile() is _dispatch:
+                    sys.setprofile(self._previous_hook)
+                self._previous_hook = None
+            _current_session.reset(token)
+            wall = time.perf_counter() - wall_start
+            cpu = session.cpu
+            monitor.stop()
+            self.reports.append(
+                {
+                    "target": target,
+                    "label": label,
+                    "started": started,
+                    "wall_ms": round(wall * 1000, 3),
+                    "cpu_ms": round(cpu * 1000, 3),
+                    "loop_stall_max_ms": round(monitor.max_stall * 1000, 3),
+                    "loop_stall_total_ms": round(monitor.total_stall * 1000, 3),
+                    "functions": session.top(PROFILE_TOP_FUNCTIONS),
+                }
+            )
+            self._store.async_delay_save(self._data_to_save, 1)
+            _LOGGER.info(
+                "Profiled %s '%s': %.1f ms wall, %.1f ms CPU, max loop stall %.1f ms",
+                target,
+                label,
+                wall * 1000,
+                cpu * 1000,
+                monitor.max_stall * 1000,
+            )
+
+
+def get_profiler(hass: HomeAssistant) -> Profiler:
+    """Return the shared profiler, creating it on first use."""
+    profiler = hass.data.get(DATA_PROFILER)
+    if profiler is None:
+        profiler = hass.data[DATA_PROFILER] = Profiler(hass)
+    return profiler
@@ -0,0 +1,136 @@
+"""Client-side token-bucket rate limiting with priority classes."""
+
+import asyncio
+import time
+from collections import deque
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+# Highest priority first
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+# Calls a voice command waits on; everything else (toolset and
+# classification-set sync, bank management, keepalive pings) is background
+INTERACTIVE_PATHS = frozenset(
+    {
+        "/v1/classify",
+        "/v1/classify-batch",
+        "/v1/classify-respond",
+        "/v1/resolve",
+        "/v1/resolve-respond",
+        "/v1/correct",
+    }
+)
+
+
+def request_priority(path: str) -> str:
+    """Return the priority class of an API path."""
+    return PRIORITY_INTERACTIVE if path in INTERACTIVE_PATHS else PRIORITY_BACKGROUND
+
+
+class RateLimiter:
+    """Token bucket shared by all requests of one API client.
+
+    Tokens refill at rate per second up to burst. Waiters are served
+    strictly by priority, then FIFO: no background call is let through
+    while an interactive one is queued. Background calls also leave
+    reserve tokens in the bucket, so a sync drains it only down to the
+    headroom a burst of voice commands needs.
+    """
+
+    def __init__(self, rate: float, burst: int, reserve: int = 0, metrics=None):
+        """Initialize the limiter."""
+        self.rate = rate
+        self.burst = burst
+        self.reserve = min(reserve, burst - 1)
+        self.metrics = metrics
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiters: dict[str, deque[asyncio.Future]] = {
+            priority: deque() for priority in PRIORITIES
+        }
+        self._timer: asyncio.TimerHandle | None = None
+
+    def set_rate(self, rate: float):
+        """Change the refill rate, keeping the tokens earned so far."""
+        self._refill()
+        self.rate = rate
+        if self._timer is not None:
+            self._wake()
+
+    def queued(self, priority: str) -> int:
+        """Number of calls of a class waiting for a token."""
+        return sum(1 for future in self._waiters[priority] if not future.done())
+
+    def _threshold(self, priority: str) -> float:
+        """Tokens that must be in the bucket for a class to take one."""
+        return 1 if priority == PRIORITY_INTERACTIVE else 1 + self.reserve
+
+    def _refill(self):
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: str = PRIORITY_INTERACTIVE):
+        """Wait for a token; returns the seconds spent waiting."""
+        start = time.monotonic()
+        self._refill()
+        ahead = any(
+            self._waiters[p] for p in PRIORITIES[: PRIORITIES.index(priority) + 1]
+        )
+        if not ahead and self._tokens >= self._threshold(priority):
+            self._tokens -= 1
+            self._observe(priority, 0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; hand the token back
+                self._tokens += 1
+            else:
+                future.cancel()
+            self._wake()
+            raise
+        waited = time.monotonic() - start
+        self._observe(priority, waited)
+        return waited
+
+    def _observe(self, priority: str, waited: float):
+        """Report a queue wait."""
+        if self.metrics is not None:
+            self.metrics.rate_limit_wait.observe(waited, priority)
+
+    def _schedule(self):
+        """Wake waiters now if possible, else when the head one can go."""
+        if self._timer is None:
+            self._wake()
+
+    def _wake(self):
+        """Grant tokens to waiters in priority order."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters and (
+                waiters[0].done() or self._tokens >= self._threshold(priority)
+            ):
+                future = waiters.popleft()
+                if not future.done():
+                    self._tokens -= 1
+                    future.set_result(None)
+            if waiters:
+                # Lower classes wait behind this one
+                needed = self._threshold(priority) - self._tokens
+                self._timer = asyncio.get_running_loop().call_later(
+                    max(needed / self.rate, 0.001), self._wake
+                )
+                return
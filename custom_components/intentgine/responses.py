@@ -0,0 +1,131 @@
+"""Local confirmation sentences for executed tool calls."""
+
+
+def _compile(templates: dict[tuple[str, str], str]) -> dict:
+    """Bind each template's format method once, at import."""
+    return {key: template.format for key, template in templates.items()}
+
+
+# (tool, variant) -> sentence; variants come from _variant()
+_TEMPLATES = _compile(
+    {
+        ("control_light", "turn_on"): "{name} turned on",
+        ("control_light", "turn_off"): "{name} turned off",
+        ("control_light", "toggle"): "{name} toggled",
+        ("control_light", "brightness"): "{name} set to {brightness}%",
+        ("control_light", "color_temp"): "{name} color temperature set",
+        ("control_switch", "turn_on"): "{name} turned on",
+        ("control_switch", "turn_off"): "{name} turned off",
+        ("control_switch", "toggle"): "{name} toggled",
+        ("control_climate", "temperature"): "{name} set to {temperature}°",
+        ("control_climate", "hvac_mode"): "{name} set to {hvac_mode}",
+        ("control_climate", "mode_temperature"): (
+            "{name} set to {hvac_mode} at {temperature}°"
+        ),
+        ("control_climate", "turn_on"): "{name} turned on",
+        ("control_cover", "open"): "{name} opened",
+        ("control_cover", "close"): "{name} closed",
+        ("control_cover", "stop"): "{name} stopped",
+        ("control_cover", "toggle"): "{name} toggled",
+        ("control_cover", "position"): "{name} set to {position}% open",
+        ("activate_scene", "activate"): "{name} activated",
+    }
+)
+
+
+def _variant(tool: str, parameters: dict) -> str | None:
+    """Pick the template variant for a tool call's parameters."""
+    action = parameters.get("action")
+    if tool == "control_light" and action == "turn_on":
+        if parameters.get("brightness") is not None:
+            return "brightness"
+        if parameters.get("color_temp") is not None:
+            return "color_temp"
+    elif tool == "control_cover" and parameters.get("position") is not None:
+        return "position"
+    elif tool == "control_climate":
+        temperature = parameters.get("temperature") is not None
+        if parameters.get("hvac_mode") and temperature:
+            return "mode_temperature"
+        if temperature:
+            return "temperature"
+        if parameters.get("hvac_mode"):
+            return "hvac_mode"
+        return "turn_on"
+    elif tool == "activate_scene":
+        return "activate"
+    return action
+
+
+def _number(value) -> str:
+    """Format a number without a trailing .0."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return f"{value:g}"
+
+
+class ResponseSynthesizer:
+    """Build spoken confirmations from executed tool calls.
+
+    Sentences come from per-tool templates filled with the entity's
+    friendly name and, when the name doesn't already say it, the area.
+    describe() returns None for calls no template covers, which is the
+    caller's cue to fall back to the API's respond endpoint.
+    """
+
+    def __init__(self, toolset_manager):
+        """Initialize the synthesizer."""
+        self.toolset_manager = toolset_manager
+
+    def _entity_name(self, entity_id: str | list) -> str:
+        """Friendly name of an entity, or a readable form of its id.
+
+        A list of entities is named as "A, B and C".
+        """
+        if isinstance(entity_id, list):
+            names = [self._entity_name(item) for item in entity_id]
+            if len(names) < 2:
+                return "".join(names)
+            return f"{', '.join(names[:-1])} and {names[-1]}"
+        name = self.toolset_manager.entity_names.get(entity_id)
+        if name:
+            return name
+        return entity_id.split(".", 1)[-1].replace("_", " ")
+
+    def _area_name(self, area: str | None) -> str | None:
+        """Display name of an area toolset, if it is an area."""
+        names = self.toolset_manager.area_names.get(area) if area else None
+        if not names:
+            return None
+        # [area id with spaces, area name, aliases...]
+        return names[1] if len(names) > 1 else names[0]
+
+    def describe(
+        self, tool: str, parameters: dict, area: str | None, success: bool = True
+    ) -> str | None:
+        """Return a sentence confirming one tool call, or None."""
+        entity_id = parameters.get("entity_id")
+        template = _TEMPLATES.get((tool, _variant(tool, parameters)))
+        if not entity_id or template is None:
+            return None
+
+        name = self._entity_name(entity_id)
+        area_name = self._area_name(area)
+        if area_name and area_name.lower() not in name.lower():
+            name = f"{name} in the {area_name}"
+        if not success:
+            return f"Sorry, I couldn't control {name}."
+
+        brightness = parameters.get("brightness")
+        text = template(
+            name=name,
+            brightness=(
+                round(float(brightness) / 255 * 100) if brightness is not None else None
+            ),
+            temperature=_number(parameters.get("temperature")),
+            hvac_mode=str(parameters.get("hvac_mode", "")).replace("_", " "),
+            position=_number(parameters.get("position")),
+        )
+        return f"{text[:1].upper()}{text[1:]}."
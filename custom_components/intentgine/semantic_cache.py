@@ -0,0 +1,389 @@
+"""Local cache of resolved commands, matched by n-gram similarity."""
+
+import logging
+
+from .area_matcher import has_correction_cue
+from .const import (
+    DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_DIMENSIONS,
+    SEMANTIC_CACHE_IDF_REFRESH,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+)
+from .correction_index import ACTION_SYNONYMS, FILLER_WORDS, normalize_query
+
+_LOGGER = logging.getLogger(__name__)
+
+NGRAM = 3
+
+
+def command_key(words, names: frozenset | None = None) -> int:
+    """Return the hash of what canonical words ask for.
+
+    The hash covers the actions, the numbers and the words of entity and
+    area names, which must all match exactly: "50%" never reuses a call
+    recorded for "20%", nor "the desk lamp" one recorded for "the lamp".
+    Other words are left to similarity. Without known names (before the
+    first sync) every remaining word counts as one.
+    """
+    actions = set()
+    numbers = []
+    named = set()
+    for word in words:
+        if word in ACTION_SYNONYMS:
+            actions.add(word)
+        elif word[0].isdigit():
+            numbers.append(word)
+        elif names is None or word in names:
+            named.add(word)
+    return hash((frozenset(actions), tuple(sorted(numbers)), frozenset(named)))
+
+
+def canonical_query(query: str, names: frozenset | None = None) -> tuple[str, int]:
+    """Return a query's canonical text and its command_key().
+
+    The text drops filler and folds action synonyms, so phrasings differing
+    only in those have the same text.
+    """
+    words = [
+        ACTION_SYNONYMS.get(token, token)
+        for token in normalize_query(query)
+        if token not in FILLER_WORDS
+    ]
+    return " ".join(words), command_key(words, names)
+
+
+def _entities_known(entity_id, known: set) -> bool:
+    """Whether a call's entity_id (absent, one or a list) is still known."""
+    if entity_id is None:
+        return True
+    if isinstance(entity_id, list):
+        return all(item in known for item in entity_id)
+    return entity_id in known
+
+
+class _Partition:
+    """Cached commands of one toolset, one row of n-gram counts each.
+
+    Rows are term counts; inverse document frequencies are kept beside
+    them and folded in at lookup, with each row's TF-IDF norm cached, so
+    scoring all rows is one matrix-vector product.
+    """
+
+    def __init__(self, dimensions: int):
+        """Initialize an empty partition."""
+        import numpy as np  # only loaded once something is cached
+
+        self.keys: dict[str, int] = {}
+        self.calls: list[dict] = []
+        self.counts = np.zeros((0, dimensions), np.float32)
+        self.norms = np.zeros(0, np.float32)
+        self.guards = np.zeros(0, np.int64)
+        self.used = np.zeros(0, np.int64)
+        self.df = np.zeros(dimensions, np.int64)
+        self.idf = np.ones(dimensions, np.float32)
+        self.idf_rows = 0
+        self.changes = 0
+        self.tools: list | None = None
+        self.tools_hash: str | None = None
+        self.names: frozenset | None = None
+
+    def __len__(self) -> int:
+        """Return the number of cached commands."""
+        return len(self.calls)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays."""
+        return sum(
+            array.nbytes
+            for array in (self.counts, self.norms, self.guards, self.used, self.df)
+        )
+
+    def _grow(self, max_entries: int):
+        """Double the row capacity, up to max_entries."""
+        import numpy as np
+
+        capacity = min(max(2 * len(self.norms), 16), max_entries)
+        grown = len(self.calls)
+        counts = np.zeros((capacity, self.counts.shape[1]), np.float32)
+        counts[:grown] = self.counts[:grown]
+        self.counts = counts
+        self.norms = np.resize(self.norms, capacity)
+        self.guards = np.resize(self.guards, capacity)
+        self.used = np.resize(self.used, capacity)
+
+    def add(
+        self, key: str, vector, guard: int, call: dict, tick: int, max_entries: int
+    ):
+        """Insert or replace a row, evicting the least recently used."""
+        import numpy as np
+
+        slot = self.keys.get(key)
+        if slot is not None:
+            self.calls[slot] = call
+            self.used[slot] = tick
+            return
+        if len(self.calls) < max_entries:
+            if len(self.calls) == len(self.norms):
+                self._grow(max_entries)
+            slot = len(self.calls)
+            self.calls.append(call)
+        else:
+            slot = int(np.argmin(self.used[: len(self.calls)]))
+            self.df -= self.counts[slot] > 0
+            del self.keys[self.calls[slot]["key"]]
+            self.calls[slot] = call
+
+        self.keys[key] = slot
+        self.counts[slot] = vector
+        self.df += vector > 0
+        self.guards[slot] = guard
+        self.used[slot] = tick
+        self.norms[slot] = np.linalg.norm(vector * self.idf)
+        # The IDF of a young partition drifts fast, so refresh as it doubles;
+        # a full one keeps replacing rows, so also every so many changes
+        self.changes += 1
+        if (
+            len(self.calls) >= 2 * self.idf_rows
+            or self.changes >= SEMANTIC_CACHE_IDF_REFRESH
+        ):
+            self.refresh()
+
+    def refresh(self, chunk: int = 4096):
+        """Recompute the IDF weights and every row's norm under them."""
+        import numpy as np
+
+        rows = len(self.calls)
+        self.idf = (np.log((1 + rows) / (1 + self.df)) + 1).astype(np.float32)
+        weights = self.idf * self.idf
+        for start in range(0, rows, chunk):
+            block = self.counts[start : min(start + chunk, rows)]
+            self.norms[start : start + len(block)] = np.sqrt((block * block) @ weights)
+        self.idf_rows = rows
+        self.changes = 0
+
+    def rekey(self, names: frozenset | None):
+        """Recompute each row's command_key() for new entity and area names."""
+        for slot, call in enumerate(self.calls):
+            self.guards[slot] = command_key(call["key"].split(), names)
+        self.names = names
+
+    def best(self, vector, guard: int) -> tuple[float, int] | None:
+        """Return the most similar row asking for the same thing."""
+        import numpy as np
+
+        rows = len(self.calls)
+        if not rows:
+            return None
+        weighted = vector * self.idf
+        query_norm = np.linalg.norm(weighted)
+        if not query_norm:
+            return None
+        scores = self.counts[:rows] @ (weighted * self.idf)
+        scores /= self.norms[:rows] * query_norm
+        scores[self.guards[:rows] != guard] = -1.0
+        slot = int(np.argmax(scores))
+        return float(scores[slot]), slot
+
+    def keep(self, mask: list[bool]):
+        """Drop the rows not in mask and refresh the weights."""
+        import numpy as np
+
+        keep = np.flatnonzero(np.array(mask, bool))
+        self.calls = [self.calls[slot] for slot in keep]
+        self.keys = {call["key"]: slot for slot, call in enumerate(self.calls)}
+        self.counts = self.counts[keep]
+        self.norms = self.norms[keep]
+        self.guards = self.guards[keep]
+        self.used = self.used[keep]
+        self.df = (self.counts > 0).sum(axis=0)
+        self.refresh()
+
+
+class SemanticCache:
+    """Past commands' tool calls, reused for paraphrases.
+
+    Each query becomes a vector of hashed character trigram counts over its
+    canonical text (filler dropped, action synonyms folded). Vectors are
+    kept in one NumPy matrix per toolset signature, bounded at max_entries
+    rows with least-recently-used eviction, and a lookup scores every row
+    by TF-IDF cosine similarity in one vectorized pass per toolset. The
+    best row at or above threshold is returned if it asks for the same
+    actions and numbers and uses the same words of synced entity and area
+    names (see command_key()). Queries that correct the previous command
+    never hit.
+
+    A sync replaces a toolset's tool list and the names; a partition is
+    then pruned of calls whose tool or entity is gone and rekeyed, keeping
+    the rest, the same way ParameterValidator recompiles only the toolsets
+    that changed. This happens when a lookup would return one of its rows
+    (or a command is added to it), so a lookup brings at most the
+    partitions it hits up to date.
+    """
+
+    def __init__(
+        self,
+        toolset_manager,
+        threshold: float = DEFAULT_SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        dimensions: int = SEMANTIC_CACHE_DIMENSIONS,
+    ):
+        """Initialize the cache."""
+        self.toolset_manager = toolset_manager
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self._partitions: dict[str, _Partition] = {}
+        self._tick = 0
+        self._names: frozenset | None = None
+        self._names_of: tuple = (None, None)
+
+    def __len__(self) -> int:
+        """Return the number of cached commands."""
+        return sum(len(partition) for partition in self._partitions.values())
+
+    @property
+    def enabled(self) -> bool:
+        """Whether lookups can hit."""
+        return self.threshold > 0
+
+    def _vectorize(self, text: str):
+        """Hashed character trigram counts of canonical text."""
+        import numpy as np
+
+        padded = f" {text} "
+        features = [
+            hash(padded[i : i + NGRAM]) % self.dimensions
+            for i in range(len(padded) - NGRAM + 1)
+        ]
+        return np.bincount(features, minlength=self.dimensions).astype(np.float32)
+
+    def _name_words(self) -> frozenset | None:
+        """Words of the synced entity and area names, None before a sync."""
+        manager = self.toolset_manager
+        source = (manager.name_index, manager.area_names)
+        if source[0] is not self._names_of[0] or source[1] is not self._names_of[1]:
+            words = set(manager.name_index)
+            for names in manager.area_names.values():
+                for name in names:
+                    words.update(normalize_query(name))
+            self._names = frozenset(words) or None
+            self._names_of = source
+        return self._names
+
+    def add(self, query: str, tool: str, parameters: dict, area: str):
+        """Remember a resolved tool call for the query's phrasing."""
+        if not self.enabled:
+            return
+        names = self._name_words()
+        text, guard = canonical_query(query, names)
+        if not text:
+            return
+        partition = self._partitions.get(area)
+        if partition is None:
+            partition = self._partitions[area] = _Partition(self.dimensions)
+        if self._stale(area, partition, names):
+            self._revalidate(area, partition)
+        self._tick += 1
+        partition.add(
+            text,
+            self._vectorize(text),
+            guard,
+            {"key": text, "tool": tool, "parameters": dict(parameters), "area": area},
+            self._tick,
+            self.max_entries,
+        )
+
+    def lookup(self, query: str) -> dict | None:
+        """Return the cached tool call most similar to the query, or None."""
+        if not self.enabled or not self._partitions or has_correction_cue(query):
+            return None
+        names = self._name_words()
+        text, guard = canonical_query(query, names)
+        if not text:
+            return None
+        vector = self._vectorize(text)
+
+        while True:
+            best = None
+            for area, partition in self._partitions.items():
+                found = partition.best(vector, guard)
+                if found is not None and (best is None or found[0] > best[0]):
+                    best = (found[0], area, partition, found[1])
+            if best is None or best[0] < self.threshold:
+                return None
+            score, area, partition, slot = best
+            if not self._stale(area, partition, names):
+                break
+            # Synced since this partition was last used; update it and rescore
+            self._revalidate(area, partition)
+
+        self._tick += 1
+        partition.used[slot] = self._tick
+        call = partition.calls[slot]
+        _LOGGER.debug(
+            "Semantic cache hit for '%s' (%.2f): '%s'", query, score, call["key"]
+        )
+        return {**call, "similarity": round(score, 3)}
+
+    def _stale(self, area: str, partition: _Partition, names) -> bool:
+        """Whether a sync changed the names or the partition's toolset."""
+        toolsets = self.toolset_manager.toolsets
+        return partition.names is not names or bool(
+            toolsets and toolsets.get(area) is not partition.tools
+        )
+
+    def _revalidate(self, area: str, partition: _Partition) -> bool:
+        """Rekey a partition and prune it after a sync changed its toolset.
+
+        Returns False, dropping the partition, if the toolset is gone.
+        """
+        names = self._name_words()
+        if partition.names is not names:
+            partition.rekey(names)
+        toolsets = self.toolset_manager.toolsets
+        tools = toolsets.get(area)
+        if tools is partition.tools or not toolsets:
+            return True
+        if tools is None:
+            del self._partitions[area]
+            return False
+
+        push = self.toolset_manager.toolset_pushes.get(area, {})
+        if push.get("hash") is None or push["hash"] != partition.tools_hash:
+            entities = {
+                tool["name"]: set(
+                    tool["parameters"]["properties"]
+                    .get("entity_id", {})
+                    .get("enum", [])
+                )
+                for tool in tools
+            }
+            mask = [
+                call["tool"] in entities
+                and _entities_known(
+                    call["parameters"].get("entity_id"), entities[call["tool"]]
+                )
+                for call in partition.calls
+            ]
+            if not all(mask):
+                _LOGGER.debug(
+                    "Semantic cache dropping %d commands for %s after sync",
+                    mask.count(False),
+                    area,
+                )
+                partition.keep(mask)
+        partition.tools = tools
+        partition.tools_hash = push.get("hash")
+        return True
+
+    def stats(self) -> dict:
+        """Entries and memory per toolset, for diagnostics."""
+        return {
+            area: {"entries": len(partition), "bytes": partition.nbytes}
+            for area, partition in self._partitions.items()
+        }
+
+    def clear(self):
+        """Forget all cached commands."""
+        self._partitions.clear()
@@ -0,0 +1,132 @@
+"""Shadow comparison of local fast paths against the remote pipeline."""
+
+import logging
+import time
+from collections import deque
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SHADOW_MAX_DISAGREEMENTS
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.shadow"
+SAVE_DELAY_SECONDS = 30
+
+# Local paths that can predict a command's outcome
+SHADOW_PATHS = (
+    "correction_index",
+    "result_cache",
+    "semantic_cache",
+    "area_prefilter",
+)
+
+
+class ShadowRecorder:
+    """Tally how often each local fast path agrees with the remote pipeline.
+
+    In shadow mode CommandHandler asks every local path for its prediction,
+    runs the remote classify/resolve pipeline regardless, and reports both
+    here. Per-path totals and the most recent disagreements are persisted,
+    so the evidence survives restarts while the mode is left on.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        enabled: bool = False,
+        max_disagreements: int = SHADOW_MAX_DISAGREEMENTS,
+        entry_id: str | None = None,
+    ):
+        """Initialize the recorder, persisted per config entry."""
+        self.hass = hass
+        self.enabled = enabled
+        key = STORAGE_KEY if entry_id is None else f"{STORAGE_KEY}.{entry_id}"
+        self._store = Store(hass, STORAGE_VERSION, key)
+        self.commands = 0
+        self.paths: dict[str, dict] = {}
+        self.disagreements: deque[dict] = deque(maxlen=max_disagreements)
+
+    async def async_load(self):
+        """Load persisted totals."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        self.commands = data.get("commands", 0)
+        self.paths = data.get("paths", {})
+        self.disagreements.extend(data.get("disagreements", []))
+
+    def _data_to_save(self) -> dict:
+        """Serialize totals for storage."""
+        return {
+            "commands": self.commands,
+            "paths": self.paths,
+            "disagreements": list(self.disagreements),
+        }
+
+    def record(
+        self,
+        path: str,
+        query: str,
+        local,
+        remote,
+        local_ms: float,
+        remote_ms: float,
+    ) -> bool:
+        """Record one comparison; returns whether the paths agreed."""
+        agreed = local == remote
+        stats = self.paths.setdefault(
+            path,
+            {"compared": 0, "agreed": 0, "local_ms": 0.0, "remote_ms": 0.0},
+        )
+        stats["compared"] += 1
+        stats["agreed"] += agreed
+        stats["local_ms"] += local_ms
+        stats["remote_ms"] += remote_ms
+        if not agreed:
+            self.disagreements.append(
+                {
+                    "time": time.time(),
+                    "path": path,
+                    "query": query,
+                    "local": local,
+                    "remote": remote,
+                }
+            )
+            _LOGGER.debug(
+                "Shadow %s disagreed on '%s': %s vs %s", path, query, local, remote
+            )
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+        return agreed
+
+    def finish_command(self):
+        """Count a shadowed command, whether or not any path predicted it."""
+        self.commands += 1
+
+    def reset(self):
+        """Start collecting evidence afresh."""
+        self.commands = 0
+        self.paths = {}
+        self.disagreements.clear()
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+
+    def summary(self, disagreements: int = 20) -> dict:
+        """Return agreement, coverage and latency per path."""
+        paths = {}
+        for path, stats in self.paths.items():
+            compared = stats["compared"] or 1
+            paths[path] = {
+                "compared": stats["compared"],
+                "agreement_rate": round(stats["agreed"] / compared, 4),
+                "coverage": round(stats["compared"] / (self.commands or 1), 4),
+                "local_ms_avg": round(stats["local_ms"] / compared, 3),
+                "remote_ms_avg": round(stats["remote_ms"] / compared, 3),
+            }
+        return {
+            "enabled": self.enabled,
+            "commands": self.commands,
+            "paths": paths,
+            "disagreements": list(self.disagreements)[-disagreements:][::-1],
+        }
@@ -1,20 +1,64 @@
 """Toolset manager for Intentgine integration."""
 
+import hashlib
+import json
 import logging
 import time
+from datetime import timedelta
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import (
     device_registry as dr,
     entity_registry as er,
     area_registry as ar,
 )
-
-from .const import TOOLSET_PREFIX, TOOLSET_VERSION, TOOLSET_GLOBAL, CORRECTION_BANK_NAME
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .area_matcher import AreaMatcher
+from .correction_index import normalize_query
+from .deadline import no_deadline, remaining
+from .loop_monitor import get_loop_monitor
+from .const import (
+    TOOLSET_PREFIX,
+    TOOLSET_VERSION,
+    TOOLSET_GLOBAL,
+    CORRECTION_BANK_NAME,
+    DEFAULT_SYNC_FREQUENCY,
+    SYNC_FREQUENCIES,
+    DATA_PROFILER,
+)
+from .metrics import get_metrics
 
 _LOGGER = logging.getLogger(__name__)
 
-# Sync every 30 minutes by default
-SYNC_INTERVAL_SECONDS = 30 * 60
+# A command refreshes toolsets older than this, whatever the sync schedule
+STALE_AFTER_SECONDS = 30 * 60
+
+
+def describe_push(tools: list) -> dict:
+    """Fingerprint a toolset as pushed: content hash, size and time."""
+    payload = json.dumps(tools, sort_keys=True, separators=(",", ":")).encode()
+    return {
+        "hash": hashlib.sha256(payload).hexdigest()[:16],
+        "bytes": len(payload),
+        "pushed_at": dt_util.utcnow().isoformat(),
+    }
+
+
+def build_name_index(
+    entity_areas: dict[str, str], entity_names: dict[str, str]
+) -> dict[str, list[tuple[str, str, int]]]:
+    """Map each word of an entity's friendly name to the entities using it.
+
+    Postings are (entity_id, toolset signature, words in the name), so
+    rank_areas() only visits entities sharing a word with the query.
+    """
+    index: dict[str, list[tuple[str, str, int]]] = {}
+    for entity_id, signature in entity_areas.items():
+        words = set(normalize_query(entity_names.get(entity_id, "")))
+        for word in words:
+            index.setdefault(word, []).append((entity_id, signature, len(words)))
+    return index
 
 
 class ToolsetManager:
@@ -28,52 +72,135 @@ class ToolsetManager:
         self._last_sync: float = 0
         self._syncing: bool = False
         self.correction_bank_id: str | None = None
+        self.entity_names: dict[str, str] = {}
+        self.area_names: dict[str, list[str]] = {}
+        self.area_matcher = AreaMatcher()
+        self.entity_areas: dict[str, str] = {}
+        # word -> entities whose friendly name has it (see build_name_index)
+        self.name_index: dict[str, list[tuple[str, str, int]]] = {}
+        # signature -> describe_push() of its last successful upload
+        self.toolset_pushes: dict[str, dict] = {}
+        self.area_toolsets = True
+        self.sync_interval: float | None = SYNC_FREQUENCIES[DEFAULT_SYNC_FREQUENCY]
+        self._unsub_schedule = None
+        self.metrics = get_metrics(hass)
+        self.loop_monitor = get_loop_monitor(hass)
+
+    def configure(self, area_toolsets: bool, sync_interval: float | None) -> bool:
+        """Apply toolset layout and schedule options.
+
+        Returns whether the remote toolsets have to be rebuilt. A sync
+        runs every sync_interval seconds (None: only on request).
+        """
+        rebuild = area_toolsets != self.area_toolsets
+        self.area_toolsets = area_toolsets
+        if sync_interval != self.sync_interval or (
+            sync_interval and self._unsub_schedule is None
+        ):
+            self.sync_interval = sync_interval
+            self._schedule_sync()
+        return rebuild
+
+    def _schedule_sync(self):
+        """(Re)start the periodic sync timer."""
+        self.stop()
+        if self.sync_interval:
+            self._unsub_schedule = async_track_time_interval(
+                self.hass,
+                self._async_scheduled_sync,
+                timedelta(seconds=self.sync_interval),
+            )
+
+    async def _async_scheduled_sync(self, now=None):
+        """Run a periodic sync."""
+        if self._syncing:
+            return
+        try:
+            await self.sync_all()
+        except Exception as err:
+            _LOGGER.warning("Scheduled toolset sync failed: %s", err)
+
+    def stop(self):
+        """Cancel the periodic sync."""
+        if self._unsub_schedule is not None:
+            self._unsub_schedule()
+            self._unsub_schedule = None
+
+    def _exposed_entity(self, entity, device_reg) -> dict | None:
+        """Describe a registry entry if it is exposed to voice assistants."""
+        if not entity.options.get("conversation", {}).get("should_expose", False):
+            return None
+        state = self.hass.states.get(entity.entity_id)
+        if not state:
+            return None
+
+        # Resolve area: entity override > device area
+        area_id = entity.area_id
+        if not area_id and entity.device_id:
+            device = device_reg.async_get(entity.device_id)
+            if device:
+                area_id = device.area_id
+
+        return {
+            "entity_id": entity.entity_id,
+            "name": state.attributes.get("friendly_name", entity.entity_id),
+            "domain": entity.domain,
+            "area_id": area_id,
+        }
 
     def get_exposed_entities(self):
         """Get all entities exposed to voice assistants."""
-        entity_reg = er.async_get(self.hass)
         device_reg = dr.async_get(self.hass)
         exposed = []
+        for entity in er.async_get(self.hass).entities.values():
+            described = self._exposed_entity(entity, device_reg)
+            if described is not None:
+                exposed.append(described)
+        return exposed
 
-        for entity in entity_reg.entities.values():
-            if entity.options.get("conversation", {}).get("should_expose", False):
-                state = self.hass.states.get(entity.entity_id)
-                if state:
-                    # Resolve area: entity override > device area
-                    area_id = entity.area_id
-                    if not area_id and entity.device_id:
-                        device = device_reg.async_get(entity.device_id)
-                        if device:
-                            area_id = device.area_id
-
-                    exposed.append(
-                        {
-                            "entity_id": entity.entity_id,
-                            "name": state.attributes.get(
-                                "friendly_name", entity.entity_id
-                            ),
-                            "domain": entity.domain,
-                            "area_id": area_id,
-                        }
-                    )
+    async def async_get_exposed_entities(self):
+        """Get exposed entities, yielding to the event loop as the scan goes.
 
-        return exposed
+        The entity registry of a large install holds tens of thousands of
+        entries, most of them not exposed; scanning it in one go holds up
+        every other integration.
+        """
+        device_reg = dr.async_get(self.hass)
+        return await self.loop_monitor.run_sliced(
+            "toolset sync: scanning entities",
+            er.async_get(self.hass).entities.values(),
+            lambda entity: self._exposed_entity(entity, device_reg),
+        )
+
+    def _place_entity(self, entity, by_area, no_area):
+        """Add an entity to its area's group, or to the global one."""
+        area_id = entity.get("area_id") if self.area_toolsets else None
+        if area_id:
+            by_area.setdefault(area_id, []).append(entity)
+        else:
+            no_area.append(entity)
 
     def group_entities_by_area(self, entities):
-        """Group entities by area."""
+        """Group entities by area, or all into the global toolset."""
         by_area = {}
         no_area = []
-
         for entity in entities:
-            area_id = entity.get("area_id")
-            if area_id:
-                by_area.setdefault(area_id, []).append(entity)
-            else:
-                no_area.append(entity)
-
+            self._place_entity(entity, by_area, no_area)
         if no_area:
             by_area["global"] = no_area
+        return by_area
 
+    async def async_group_entities_by_area(self, entities):
+        """Group entities by area, yielding to the event loop as it goes."""
+        by_area = {}
+        no_area = []
+        await self.loop_monitor.run_sliced(
+            "toolset sync: grouping entities",
+            entities,
+            lambda entity: self._place_entity(entity, by_area, no_area),
+        )
+        if no_area:
+            by_area["global"] = no_area
         return by_area
 
     def generate_tools_for_entities(self, entities):
@@ -230,35 +357,100 @@ class ToolsetManager:
 
         return tools
 
+    def _build_toolsets(self, by_area: dict) -> tuple[dict, dict, dict]:
+        """Generate each area's tools, map entities and index their names.
+
+        Pure CPU work over plain dicts, run in the executor.
+        """
+        tools_by_area = {}
+        entity_areas = {}
+        for area_id, entities in by_area.items():
+            tools = self.generate_tools_for_entities(entities)
+            if not tools:
+                continue
+            tools_by_area[area_id] = tools
+            if area_id == "global":
+                signature = TOOLSET_GLOBAL
+            else:
+                signature = f"{TOOLSET_PREFIX}-{area_id}-{TOOLSET_VERSION}"
+            for entity in entities:
+                entity_areas[entity["entity_id"]] = signature
+        entity_names = {
+            entity["entity_id"]: entity["name"]
+            for entities in by_area.values()
+            for entity in entities
+        }
+        return (
+            tools_by_area,
+            entity_areas,
+            build_name_index(entity_areas, entity_names),
+        )
+
     async def sync_all(self):
-        """Sync all toolsets and classification set."""
+        """Sync all toolsets and classification set.
+
+        A sync is never cut short by the deadline of the command that
+        triggered it; a half-uploaded set of toolsets is worse than a late one.
+        """
         self._syncing = True
+        start = time.monotonic()
+        outcome = "error"
         try:
-            await self._do_sync()
+            with no_deadline(), self.loop_monitor.watch("sync") as lag:
+                profiler = self.hass.data.get(DATA_PROFILER)
+                if profiler is not None and profiler.pending_syncs:
+                    await profiler.run("sync", "toolset sync", self._do_sync)
+                else:
+                    await self._do_sync()
             self._last_sync = time.time()
+            outcome = "success"
         finally:
             self._syncing = False
+            self.metrics.sync_duration.observe(time.monotonic() - start, outcome)
+        _LOGGER.debug(
+            "Toolset sync held up the event loop for at most %.1f ms (%s)",
+            lag.max_stall * 1000,
+            lag.cause or "no stall",
+        )
 
     async def ensure_synced(self):
         """Ensure toolsets are synced, refreshing if stale."""
         if self._syncing:
             return  # Already syncing
 
+        if self.sync_interval is None and self._last_sync:
+            return  # Manual sync only
+
         elapsed = time.time() - self._last_sync
-        if elapsed > SYNC_INTERVAL_SECONDS:
+        if elapsed > STALE_AFTER_SECONDS:
             _LOGGER.info("Toolsets stale (%.0f min old), refreshing...", elapsed / 60)
+            if remaining() is not None:
+                # Don't spend a command's time budget on a sync; the command
+                # goes ahead with the toolsets the API already has
+                self._syncing = True
+                self.hass.async_create_background_task(
+                    self.sync_all(), "intentgine toolset sync"
+                )
+                return
             await self.sync_all()
 
     async def _do_sync(self):
         """Sync all toolsets and classification set."""
         _LOGGER.info("Starting toolset sync")
 
-        exposed = self.get_exposed_entities()
+        exposed = await self.async_get_exposed_entities()
         if not exposed:
             _LOGGER.warning("No exposed entities found")
             return
 
-        by_area = self.group_entities_by_area(exposed)
+        self.entity_names = dict(
+            await self.loop_monitor.run_sliced(
+                "toolset sync: naming entities",
+                exposed,
+                lambda entity: (entity["entity_id"], entity["name"]),
+            )
+        )
+        by_area = await self.async_group_entities_by_area(exposed)
         area_reg = ar.async_get(self.hass)
 
         # Create classification set for area routing
@@ -317,12 +509,20 @@ class ToolsetManager:
             except Exception as err:
                 _LOGGER.error("Failed to create/update classification set: %s", err)
 
-        # Create toolsets (one per area)
-        for area_id, entities in by_area.items():
-            tools = self.generate_tools_for_entities(entities)
-            if not tools:
-                continue
-
+        # Create toolsets (one per area). Built aside and swapped in, so
+        # toolsets of removed areas (or all areas, with area toolsets
+        # disabled) drop out. Generating tools, mapping entities and
+        # hashing what was pushed grow with the install; none of it
+        # touches Home Assistant state, so it runs in the executor
+        (
+            tools_by_area,
+            entity_areas,
+            name_index,
+        ) = await self.hass.async_add_executor_job(self._build_toolsets, by_area)
+        toolsets = {}
+        pushed_toolsets = {}
+        pushes = {}
+        for area_id, tools in tools_by_area.items():
             if area_id == "global":
                 signature = TOOLSET_GLOBAL
                 name = "Home Assistant - Global"
@@ -332,6 +532,7 @@ class ToolsetManager:
                 signature = f"{TOOLSET_PREFIX}-{area_id}-{TOOLSET_VERSION}"
                 name = f"Home Assistant - {area_name}"
 
+            pushed = True
             try:
                 await self.api_client.update_toolset(signature, name, tools)
                 _LOGGER.info("Updated toolset %s with %d tools", signature, len(tools))
@@ -342,9 +543,48 @@ class ToolsetManager:
                         "Created toolset %s with %d tools", signature, len(tools)
                     )
                 except Exception as err:
+                    pushed = False
                     _LOGGER.error("Failed to create toolset %s: %s", signature, err)
 
-            self.toolsets[signature] = tools
+            toolsets[signature] = tools
+            if pushed:
+                pushed_toolsets[signature] = tools
+            elif signature in self.toolset_pushes:
+                pushes[signature] = self.toolset_pushes[signature]
+        pushes.update(
+            await self.hass.async_add_executor_job(
+                lambda: {
+                    signature: describe_push(tools)
+                    for signature, tools in pushed_toolsets.items()
+                }
+            )
+        )
+
+        self.toolsets = toolsets
+        self.entity_areas = entity_areas
+        self.name_index = name_index
+        self.toolset_pushes = pushes
+
+        # Areas with a toolset can be matched by name without classification
+        area_names = {}
+        for area_id in by_area:
+            signature = f"{TOOLSET_PREFIX}-{area_id}-{TOOLSET_VERSION}"
+            if area_id == "global" or signature not in self.toolsets:
+                continue
+            area = area_reg.async_get_area(area_id)
+            names = [area_id.replace("_", " ")]
+            if area:
+                names.append(area.name)
+                names.extend(area.aliases)
+            area_names[signature] = names
+        self.area_names = area_names
+        with self.loop_monitor.timed("toolset sync: compiling area matcher"):
+            self.area_matcher = AreaMatcher(area_names)
+        _LOGGER.debug(
+            "Area matcher compiled with %d names for %d areas",
+            len(self.area_matcher),
+            len(area_names),
+        )
 
         # Ensure correction memory bank exists and is assigned
         await self._ensure_correction_bank()
@@ -375,6 +615,54 @@ class ToolsetManager:
         except Exception as err:
             _LOGGER.warning("Failed to ensure correction bank: %s", err)
 
+    def last_sync_age(self) -> float | None:
+        """Seconds since the last completed sync, None before the first."""
+        if not self._last_sync:
+            return None
+        return round(time.time() - self._last_sync, 1)
+
+    def snapshot(self) -> dict:
+        """Return the synced state commands are routed against."""
+        return {
+            "toolsets": self.toolsets,
+            "entity_names": self.entity_names,
+            "entity_areas": self.entity_areas,
+            "area_names": self.area_names,
+            "correction_bank_id": self.correction_bank_id,
+        }
+
+    def restore(self, snapshot: dict):
+        """Adopt a snapshot() as if it had just been synced (used by replay)."""
+        self.toolsets = snapshot["toolsets"]
+        self.entity_names = snapshot["entity_names"]
+        self.entity_areas = snapshot["entity_areas"]
+        self.name_index = build_name_index(self.entity_areas, self.entity_names)
+        self.area_names = snapshot["area_names"]
+        self.area_matcher = AreaMatcher(self.area_names)
+        self.correction_bank_id = snapshot["correction_bank_id"]
+        self._last_sync = time.time()
+
+    def rank_areas(self, query: str) -> list[str]:
+        """Rank area toolsets by how well a query matches them locally.
+
+        Areas named in the query come first, then areas holding entities
+        whose friendly names share words with the query. Only entities
+        sharing a word are visited, through the name index built at sync.
+        """
+        ranked = self.area_matcher.find_all(query)
+        shared: dict[str, list] = {}
+        for word in set(normalize_query(query)):
+            for entity_id, signature, size in self.name_index.get(word, ()):
+                entry = shared.setdefault(entity_id, [signature, size, 0])
+                entry[2] += 1
+        scores: dict[str, float] = {}
+        for signature, size, count in shared.values():
+            scores[signature] = max(scores.get(signature, 0.0), count / size)
+        for signature in sorted(scores, key=scores.get, reverse=True):
+            if signature not in ranked:
+                ranked.append(signature)
+        return ranked
+
     def get_all_toolset_signatures(self):
         """Get all toolset signatures."""
         return list(self.toolsets.keys())
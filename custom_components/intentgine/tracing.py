@@ -0,0 +1,119 @@
+"""Per-command tracing for the Intentgine integration."""
+
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+
+from .const import DATA_TRACER, TRACE_BUFFER_SIZE
+
+# The trace of the command running in the current task. Child tasks copy
+# the context, so concurrent work spawned by a command lands in its trace.
+_current_trace: ContextVar["Trace | None"] = ContextVar(
+    "intentgine_current_trace", default=None
+)
+
+
+class Trace:
+    """Timed spans for one handle_command invocation."""
+
+    __slots__ = ("trace_id", "query", "started", "_start", "duration", "spans")
+
+    def __init__(self, query: str):
+        """Start a trace."""
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.query = query
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.duration: float | None = None
+        self.spans: list[dict] = []
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the trace started."""
+        return (time.perf_counter() - self._start) * 1000
+
+    def as_dict(self, outcome: dict) -> dict:
+        """Serialize a finished trace."""
+        return {
+            "trace_id": self.trace_id,
+            "query": self.query,
+            "started": self.started,
+            "duration_ms": round(self.duration * 1000, 3),
+            **outcome,
+            "spans": self.spans,
+        }
+
+
+def start_span(name: str, **attrs):
+    """Open a span in the current trace; returns None when not tracing."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    span = {"name": name, "start_ms": round(trace.elapsed_ms(), 3), **attrs}
+    trace.spans.append(span)
+    return trace, span
+
+
+def finish_span(handle, error: str | None = None, **attrs):
+    """Close a span opened with start_span."""
+    if handle is None:
+        return
+    trace, span = handle
+    span["duration_ms"] = round(trace.elapsed_ms() - span["start_ms"], 3)
+    span.update(attrs)
+    if error is not None:
+        span["error"] = error
+
+
+def current_spans() -> list[dict]:
+    """Return the spans recorded so far for the running command."""
+    trace = _current_trace.get()
+    return trace.spans if trace is not None else []
+
+
+def current_trace_id() -> str | None:
+    """Return the id of the trace for the running command, if any."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+class Tracer:
+    """Ring buffer of recently finished command traces."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        """Initialize the tracer."""
+        self.traces: deque[dict] = deque(maxlen=size)
+
+    @staticmethod
+    def start(query: str):
+        """Begin tracing a command in the current task."""
+        return _current_trace.set(Trace(query))
+
+    def finish(self, token, **outcome) -> dict:
+        """Close the current trace and add it to the ring buffer."""
+        trace = _current_trace.get()
+        _current_trace.reset(token)
+        trace.duration = time.perf_counter() - trace._start
+        finished = trace.as_dict(outcome)
+        self.traces.append(finished)
+        return finished
+
+    def get(self, trace_id: str) -> dict | None:
+        """Return one trace by id."""
+        return next((t for t in self.traces if t["trace_id"] == trace_id), None)
+
+    def recent(self, limit: int, slowest: bool = False) -> list[dict]:
+        """Return the most recent (or slowest recent) traces."""
+        if slowest:
+            ordered = sorted(self.traces, key=lambda t: t["duration_ms"], reverse=True)
+        else:
+            ordered = list(reversed(self.traces))
+        return ordered[:limit]
+
+
+def get_tracer(hass) -> Tracer:
+    """Return the shared tracer, creating it on first use."""
+    tracer = hass.data.get(DATA_TRACER)
+    if tracer is None:
+        tracer = hass.data[DATA_TRACER] = Tracer()
+    return tracer
@@ -0,0 +1,226 @@
+"""Opt-in recording of command traffic for offline replay."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+
+from .const import (
+    TRAFFIC_FILE,
+    TRAFFIC_MAX_BYTES,
+    TRAFFIC_BACKUPS,
+    TRAFFIC_FLUSH_SECONDS,
+    TRAFFIC_FLUSH_LINES,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# API exchanges made by the command running in the current task, when
+# recording; child tasks copy the context so concurrent calls land here too
+_exchanges: ContextVar[list | None] = ContextVar(
+    "intentgine_traffic_exchanges", default=None
+)
+
+# How a serialized "toolsets" record begins ("type" is its first key)
+_SNAPSHOT_START = '{"type": "toolsets"'
+
+
+def record_exchange(
+    method: str,
+    path: str,
+    request: dict | None,
+    response,
+    status,
+    error: str | None,
+    duration: float,
+):
+    """Add an API request and its outcome to the current recording, if any."""
+    exchanges = _exchanges.get()
+    if exchanges is None:
+        return
+    exchanges.append(
+        {
+            "method": method,
+            "path": path,
+            "request": request,
+            "status": status,
+            "response": response,
+            "error": error,
+            "ms": round(duration * 1000, 3),
+        }
+    )
+
+
+class TrafficRecorder:
+    """Append each command to a rotating, gzip-compressed JSONL file.
+
+    Every config entry records to its own file, so only this recorder's
+    writer task ever appends to or rotates it.
+
+    Records are serialized on the loop (they are small) and written in the
+    executor by a single background task, so a slow disk never stalls a
+    command. Writes are batched (TRAFFIC_FLUSH_SECONDS or
+    TRAFFIC_FLUSH_LINES), each batch one gzip member, and whatever is
+    queued is written when the entry unloads or Home Assistant stops.
+    Each line is a "command" record; a "toolsets" record with the routing
+    state precedes the first command after every sync and starts every
+    rotated file, so a replay can route exactly as the recording did.
+    """
+
+    def __init__(
+        self, hass, toolset_manager, enabled: bool = False, entry_id: str | None = None
+    ):
+        """Initialize the recorder, with one file per config entry."""
+        self.hass = hass
+        self.toolset_manager = toolset_manager
+        self.enabled = enabled
+        self.path = hass.config.path(
+            TRAFFIC_FILE.format(entry=f".{entry_id}" if entry_id else "")
+        )
+        self._buffer: list[str] = []
+        self._writing = None
+        self._write_now = asyncio.Event()
+        self._unsub_stop = None
+        self._snapshot_of = None
+        # Latest "toolsets" line queued, and the one in force at the end of
+        # what has been written; a new file starts with the latter
+        self._snapshot_line: str | None = None
+        self._written_snapshot: str | None = None
+
+    def start(self):
+        """Begin capturing API exchanges for the current command."""
+        if not self.enabled:
+            return None
+        return _exchanges.set([])
+
+    def finish(self, token, query: str, options: dict, result, trace: dict):
+        """Queue the command's record for writing."""
+        if token is None:
+            return
+        exchanges = _exchanges.get()
+        _exchanges.reset(token)
+
+        # The matcher is replaced on every sync
+        if self._snapshot_of is not self.toolset_manager.area_matcher:
+            self._snapshot_of = self.toolset_manager.area_matcher
+            self._add(
+                {
+                    "type": "toolsets",
+                    "time": time.time(),
+                    **self.toolset_manager.snapshot(),
+                }
+            )
+        self._add(
+            {
+                "type": "command",
+                "time": time.time(),
+                "query": query,
+                "options": options,
+                "result": result,
+                "duration_ms": trace["duration_ms"],
+                "path": trace.get("path"),
+                "spans": trace["spans"],
+                "exchanges": exchanges,
+            }
+        )
+
+    def _add(self, record: dict):
+        """Serialize a record and make sure a writer is running."""
+        line = json.dumps(record, default=str)
+        self._buffer.append(line)
+        if record["type"] == "toolsets":
+            self._snapshot_line = line
+        if len(self._buffer) >= TRAFFIC_FLUSH_LINES:
+            self._write_now.set()
+        if self._writing is None:
+            self._writing = self.hass.async_create_background_task(
+                self._flush(), "intentgine traffic recorder"
+            )
+        if self._unsub_stop is None:
+            self._unsub_stop = self.hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_final_write
+            )
+
+    async def _flush(self):
+        """Write buffered lines in batches until the buffer stays empty."""
+        try:
+            while self._buffer:
+                try:
+                    async with asyncio.timeout(TRAFFIC_FLUSH_SECONDS):
+                        await self._write_now.wait()
+                except TimeoutError:
+                    pass
+                await self._write_batch()
+        finally:
+            self._writing = None
+
+    async def _write_batch(self):
+        """Write everything queued as one batch."""
+        self._write_now.clear()
+        lines, self._buffer = self._buffer, []
+        snapshot = self._written_snapshot
+        if lines[0].startswith(_SNAPSHOT_START):
+            snapshot = None  # the batch brings its own
+        self._written_snapshot = self._snapshot_line
+        try:
+            await self.hass.async_add_executor_job(self._write, lines, snapshot)
+        except OSError as err:
+            _LOGGER.warning("Failed to record command traffic: %s", err)
+
+    async def async_close(self):
+        """Write what is queued now, e.g. before the entry unloads."""
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        await self._write_queued()
+
+    async def _async_final_write(self, event):
+        """Write what is queued before Home Assistant stops."""
+        self._unsub_stop = None
+        await self._write_queued()
+
+    async def _write_queued(self):
+        """Write what is queued now instead of at the end of the batch wait."""
+        if self._writing is not None:
+            self._write_now.set()
+            await asyncio.wait([self._writing])
+        if self._buffer:
+            # The writer was cancelled, as it is when Home Assistant stops
+            await self._write_batch()
+
+    def _write(self, lines: list[str], snapshot: str | None):
+        """Append lines as one gzip member (executor).
+
+        A full file is rotated first, and the new file starts with the
+        routing state (snapshot) the first of the lines was recorded under.
+        """
+        rotated = (
+            os.path.exists(self.path)
+            and os.path.getsize(self.path) >= TRAFFIC_MAX_BYTES
+        )
+        if rotated:
+            for index in range(TRAFFIC_BACKUPS - 1, 0, -1):
+                older = f"{self.path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+            if snapshot is not None:
+                lines = [snapshot, *lines]
+        import gzip  # only needed once recording is switched on
+
+        with gzip.open(self.path, "at", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+def read_traffic(path: str):
+    """Yield the records of a recording, oldest first."""
+    import gzip
+
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
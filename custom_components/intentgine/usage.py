@@ -0,0 +1,233 @@
+"""API usage accounting and quota tracking for Intentgine."""
+
+import logging
+import time
+from contextvars import ContextVar
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api_client import endpoint_name
+from .const import (
+    DOMAIN,
+    BUDGET_NORMAL,
+    BUDGET_LOW,
+    BUDGET_CRITICAL,
+    BUDGET_EXHAUSTED,
+    USAGE_HISTORY_DAYS,
+    USAGE_LOW_FRACTION,
+    USAGE_CRITICAL_FRACTION,
+    USAGE_EXHAUSTED_RETRY_SECONDS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.usage"
+SAVE_DELAY_SECONDS = 30
+
+# Endpoints that cost a request when the response doesn't report requests_used
+BILLED_ENDPOINTS = frozenset(
+    {
+        "/v1/classify",
+        "/v1/classify-batch",
+        "/v1/classify-respond",
+        "/v1/resolve",
+        "/v1/resolve-respond",
+        "/v1/correct",
+    }
+)
+
+# Per-command accounting; asyncio tasks copy the context so concurrent
+# commands never see each other's counters
+_current_command: ContextVar[dict | None] = ContextVar(
+    "intentgine_current_command", default=None
+)
+
+
+class UsageTracker:
+    """Count billed requests per endpoint and per command path.
+
+    Daily totals are persisted per account; the remaining quota comes from the
+    `requests_remaining` metadata and X-RateLimit headers the API returns,
+    and budget_level() turns it into a policy hint for CommandHandler.
+    """
+
+    def __init__(self, hass: HomeAssistant, account: str | None = None):
+        """Initialize the usage tracker for an account (see account_id())."""
+        self.hass = hass
+        key = STORAGE_KEY if account is None else f"{STORAGE_KEY}.{account}"
+        self._store = Store(hass, STORAGE_VERSION, key)
+        self.days: dict[str, dict] = {}
+        self.requests_remaining: int | None = None
+        self.requests_limit: int | None = None
+        self.reset_at: float | None = None
+        self.updated_at: float = 0
+
+    async def async_load(self):
+        """Load persisted usage."""
+        data = await self._store.async_load()
+        if not data:
+            return
+        self.days = data.get("days", {})
+        self.requests_remaining = data.get("requests_remaining")
+        self.requests_limit = data.get("requests_limit")
+        self.reset_at = data.get("reset_at")
+        self.updated_at = data.get("updated_at", 0)
+
+    def _data_to_save(self) -> dict:
+        """Serialize usage for storage."""
+        return {
+            "days": self.days,
+            "requests_remaining": self.requests_remaining,
+            "requests_limit": self.requests_limit,
+            "reset_at": self.reset_at,
+            "updated_at": self.updated_at,
+        }
+
+    def _today(self) -> dict:
+        """Return today's bucket, pruning buckets past the history window."""
+        key = dt_util.now().date().isoformat()
+        day = self.days.get(key)
+        if day is None:
+            day = self.days[key] = {"total": 0, "endpoints": {}, "paths": {}}
+            for old in sorted(self.days)[:-USAGE_HISTORY_DAYS]:
+                del self.days[old]
+        return day
+
+    def start_command(self):
+        """Begin accounting for a command in the current task."""
+        return _current_command.set({"requests": 0, "path": "classify"})
+
+    @staticmethod
+    def set_path(path: str):
+        """Label the command path taken by the current command."""
+        current = _current_command.get()
+        if current is not None:
+            current["path"] = path
+
+    def finish_command(self, token) -> dict:
+        """Close the current command's accounting and record it."""
+        current = _current_command.get()
+        _current_command.reset(token)
+        if current is None:
+            return {}
+        paths = self._today()["paths"]
+        bucket = paths.setdefault(current["path"], {"commands": 0, "requests": 0})
+        bucket["commands"] += 1
+        bucket["requests"] += current["requests"]
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+        return current
+
+    def _read_headers(self, headers) -> bool:
+        """Pick up X-RateLimit-* headers; return True if they gave the remaining."""
+        if headers is None:
+            return False
+        try:
+            if "X-RateLimit-Limit" in headers:
+                self.requests_limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+            if "X-RateLimit-Remaining" in headers:
+                self.requests_remaining = int(headers["X-RateLimit-Remaining"])
+                return True
+        except ValueError:
+            pass
+        return False
+
+    def record_request(self, method: str, path: str, metadata: dict | None, headers):
+        """Record a completed API request."""
+        from_headers = self._read_headers(headers)
+        metadata = metadata or {}
+        used = metadata.get("requests_used")
+        if used is None:
+            used = 1 if path in BILLED_ENDPOINTS else 0
+        if metadata.get("requests_remaining") is not None:
+            self.requests_remaining = metadata["requests_remaining"]
+        elif not from_headers and self.requests_remaining is not None and used:
+            self.requests_remaining = max(self.requests_remaining - used, 0)
+        self.updated_at = time.time()
+
+        day = self._today()
+        day["total"] += used
+        name = endpoint_name(method, path)
+        bucket = day["endpoints"].setdefault(name, {"calls": 0, "requests": 0})
+        bucket["calls"] += 1
+        bucket["requests"] += used
+
+        current = _current_command.get()
+        if current is not None:
+            current["requests"] += used
+
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+
+    def record_exhausted(self, headers):
+        """Record a 402 from the API."""
+        self._read_headers(headers)
+        self.requests_remaining = 0
+        self.updated_at = time.time()
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY_SECONDS)
+
+    def _average_daily(self) -> float:
+        """Average billed requests per day over the last week with data."""
+        recent = [self.days[key]["total"] for key in sorted(self.days)[-7:]]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def remaining_estimate(self) -> int | None:
+        """Best estimate of requests left in the billing period."""
+        now = time.time()
+        if self.reset_at is not None and now >= self.reset_at:
+            # Period rolled over since the last report; quota is unknown again
+            return None
+        if (
+            self.requests_remaining == 0
+            and self.reset_at is None
+            and now - self.updated_at > USAGE_EXHAUSTED_RETRY_SECONDS
+        ):
+            # No reset time known; let a request through to find out
+            return None
+        return self.requests_remaining
+
+    def budget_level(self) -> str:
+        """Return how tight the remaining budget is."""
+        remaining = self.remaining_estimate()
+        if remaining is None:
+            return BUDGET_NORMAL
+        if remaining <= 0:
+            return BUDGET_EXHAUSTED
+
+        level = BUDGET_NORMAL
+        if self.requests_limit:
+            fraction = remaining / self.requests_limit
+            if fraction < USAGE_CRITICAL_FRACTION:
+                return BUDGET_CRITICAL
+            if fraction < USAGE_LOW_FRACTION:
+                level = BUDGET_LOW
+
+        if self.reset_at is not None:
+            days_left = max((self.reset_at - time.time()) / 86400, 0)
+            projected = self._average_daily() * days_left
+            if projected and remaining < projected / 2:
+                return BUDGET_CRITICAL
+            if projected and remaining < projected:
+                level = BUDGET_LOW
+        return level
+
+    def quota_message(self) -> str:
+        """Explain a 402 in terms the user can act on."""
+        if self.reset_at is None:
+            return "Insufficient requests remaining"
+        reset = dt_util.as_local(dt_util.utc_from_timestamp(self.reset_at))
+        return f"Insufficient requests remaining (quota resets {reset:%Y-%m-%d %H:%M})"
+
+    def summary(self) -> dict:
+        """Return today's totals and the quota estimate."""
+        return {
+            "today": self._today(),
+            "average_daily": round(self._average_daily(), 1),
+            "requests_remaining": self.remaining_estimate(),
+            "requests_limit": self.requests_limit,
+            "reset_at": self.reset_at,
+            "budget_level": self.budget_level(),
+        }
@@ -0,0 +1,127 @@
+"""Websocket commands for the Intentgine integration."""
+
+import logging
+
+import voluptuous as vol
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .client_pool import get_entry_data
+from .tracing import get_tracer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant):
+    """Register the integration's websocket commands."""
+    websocket_api.async_register_command(hass, websocket_traces)
+    websocket_api.async_register_command(hass, websocket_command)
+    websocket_api.async_register_command(hass, websocket_shadow)
+
+
+def _get_command_handler(hass: HomeAssistant, entry_id: str | None):
+    """Return the command handler for an entry, or the first loaded one."""
+    data = get_entry_data(hass, entry_id)
+    return data["command_handler"] if data else None
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "intentgine/traces",
+        vol.Optional("trace_id"): str,
+        vol.Optional("limit", default=20): vol.All(int, vol.Range(min=1)),
+        vol.Optional("order", default="recent"): vol.In(["recent", "slowest"]),
+    }
+)
+@websocket_api.require_admin
+@callback
+def websocket_traces(hass: HomeAssistant, connection, msg: dict):
+    """Return recent command traces from the ring buffer."""
+    tracer = get_tracer(hass)
+    if "trace_id" in msg:
+        trace = tracer.get(msg["trace_id"])
+        if trace is None:
+            connection.send_error(msg["id"], "not_found", "Trace not found")
+            return
+        connection.send_result(msg["id"], {"traces": [trace]})
+        return
+
+    traces = tracer.recent(msg["limit"], slowest=msg["order"] == "slowest")
+    connection.send_result(msg["id"], {"traces": traces})
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "intentgine/shadow",
+        vol.Optional("entry_id"): str,
+        vol.Optional("reset", default=False): bool,
+    }
+)
+@websocket_api.require_admin
+@callback
+def websocket_shadow(hass: HomeAssistant, connection, msg: dict):
+    """Return the shadow-mode comparison summary, optionally resetting it."""
+    handler = _get_command_handler(hass, msg.get("entry_id"))
+    if handler is None:
+        connection.send_error(msg["id"], "not_found", "Intentgine is not loaded")
+        return
+    summary = handler.shadow.summary()
+    if msg["reset"]:
+        handler.shadow.reset()
+    connection.send_result(msg["id"], summary)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "intentgine/command",
+        vol.Required("query"): str,
+        vol.Optional("use_respond", default=False): bool,
+        vol.Optional("entry_id"): str,
+        vol.Optional("timeout"): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+@callback
+def websocket_command(hass: HomeAssistant, connection, msg: dict):
+    """Run a command as a subscription, streaming progress events.
+
+    Events are {"event": "classified" | "resolved" | "executed", ...}
+    followed by a final {"event": "result", "result": {...}}. Unsubscribing
+    (unsubscribe_events) cancels the command wherever it is; after the
+    result it is a no-op, so clients always unsubscribe when done.
+    """
+    handler = _get_command_handler(hass, msg.get("entry_id"))
+    if handler is None:
+        connection.send_error(msg["id"], "not_found", "Intentgine is not loaded")
+        return
+
+    msg_id = msg["id"]
+
+    @callback
+    def forward(event: str, data: dict):
+        connection.send_message(
+            websocket_api.event_message(msg_id, {"event": event, **data})
+        )
+
+    async def run():
+        try:
+            result = await handler.handle_command(
+                msg["query"],
+                msg["use_respond"],
+                on_progress=forward,
+                timeout=msg.get("timeout"),
+            )
+        except Exception as err:
+            _LOGGER.exception("Error running websocket command")
+            connection.subscriptions.pop(msg_id, None)
+            connection.send_error(msg_id, "unknown_error", str(err))
+            return
+        forward("result", {"result": result})
+
+    # Not started eagerly: the subscription must be confirmed and
+    # registered before the command can send events or end it
+    connection.send_result(msg_id)
+    task = hass.async_create_task(
+        run(), "intentgine websocket command", eager_start=False
+    )
+    connection.subscriptions[msg_id] = task.cancel
@@ -35,23 +35,58 @@ class IntentgineChatCard extends HTMLElement {
       
       const sendMessage = async () => {
         const query = input.value.trim();
-        if (!query) return;
+        if (!query || this._cancel) return;
         
         this._addMessage('user', query);
         input.value = '';
-        button.disabled = true;
+        button.textContent = 'Stop';
+        
+        let done;
+        const finished = new Promise((resolve) => { done = resolve; });
         
         try {
-          await this._hass.callService('intentgine', 'execute_command', { query });
-          this._addMessage('action', `✓ Command executed`);
+          // Each executed action shows up as soon as it completes
+          const unsubscribe = await this._hass.connection.subscribeMessage(
+            (msg) => {
+              if (msg.event === 'executed') {
+                this._addMessage('action', `${msg.success ? '✓' : '✗'} ${msg.tool}`);
+              } else if (msg.event === 'result') {
+                done(msg.result);
+              }
+            },
+            { type: 'intentgine/command', query, use_respond: true }
+          );
+          // Cancel and completion both unsubscribe; only the first may
+          let subscribed = true;
+          const stop = () => {
+            if (subscribed) {
+              subscribed = false;
+              unsubscribe();
+            }
+          };
+          this._cancel = () => {
+            stop();
+            done({ success: false, error: 'Stopped' });
+          };
+          const response = await finished;
+          this._cancel = null;
+          stop();
+          if (response.response) {
+            this._addMessage('assistant', response.response);
+          } else if (response.success === false) {
+            this._addMessage('assistant', `Error: ${response.error || 'Command failed'}`);
+          }
         } catch (err) {
           this._addMessage('assistant', `Error: ${err.message}`);
         }
         
-        button.disabled = false;
+        button.textContent = 'Send';
       };
       
-      button.addEventListener('click', sendMessage);
+      button.addEventListener('click', () => {
+        if (this._cancel) this._cancel();
+        else sendMessage();
+      });
       input.addEventListener('keypress', (e) => {
         if (e.key === 'Enter') sendMessage();
       });
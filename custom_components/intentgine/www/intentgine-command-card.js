@@ -37,37 +37,79 @@ class IntentgineCommandCard extends HTMLElement {
       const button = this.querySelector('#run-button');
       const result = this.querySelector('#result');
       
+      const finish = (query, response) => {
+        if (response && response.success !== false) {
+          result.className = 'result success';
+          result.textContent = '✓ Command executed successfully';
+          this._addToHistory(query, true);
+        } else {
+          result.className = 'result error';
+          result.textContent = `✗ ${response?.error || 'Command failed'}`;
+          this._addToHistory(query, false);
+        }
+      };
+
       const executeCommand = async () => {
         const query = input.value.trim();
-        if (!query) return;
+        if (!query || this._cancel) return;
         
-        button.disabled = true;
+        button.textContent = 'Cancel';
         result.className = 'result loading';
         result.textContent = 'Processing...';
         
+        const steps = [];
+        let done;
+        const finished = new Promise((resolve) => { done = resolve; });
+        
         try {
-          const response = await this._hass.callService('intentgine', 'execute_command', { query });
-          
-          if (response && response.success !== false) {
-            result.className = 'result success';
-            result.textContent = '✓ Command executed successfully';
-            this._addToHistory(query, true);
-          } else {
-            result.className = 'result error';
-            result.textContent = `✗ ${response?.error || 'Command failed'}`;
-            this._addToHistory(query, false);
-          }
+          // Stream progress so the card updates as each step completes
+          const unsubscribe = await this._hass.connection.subscribeMessage(
+            (msg) => {
+              if (msg.event === 'classified') {
+                steps.push(`Routed to ${msg.area || (msg.areas || []).join(', ')}`);
+              } else if (msg.event === 'resolved') {
+                steps.push(`${msg.tool} → ${msg.parameters?.entity_id || '?'}`);
+              } else if (msg.event === 'executed') {
+                steps.push(`${msg.success ? '✓' : '✗'} ${msg.tool}`);
+              } else if (msg.event === 'result') {
+                done(msg.result);
+                return;
+              }
+              result.textContent = steps.join(' · ');
+            },
+            { type: 'intentgine/command', query }
+          );
+          // Unsubscribing cancels the command server-side if still running
+          // Cancel and completion both unsubscribe; only the first may
+          let subscribed = true;
+          const stop = () => {
+            if (subscribed) {
+              subscribed = false;
+              unsubscribe();
+            }
+          };
+          this._cancel = () => {
+            stop();
+            done({ success: false, error: 'Cancelled' });
+          };
+          const response = await finished;
+          this._cancel = null;
+          stop();
+          finish(query, response);
         } catch (err) {
           result.className = 'result error';
           result.textContent = `✗ Error: ${err.message}`;
           this._addToHistory(query, false);
         }
         
-        button.disabled = false;
+        button.textContent = 'Run';
         input.value = '';
       };
       
-      button.addEventListener('click', executeCommand);
+      button.addEventListener('click', () => {
+        if (this._cancel) this._cancel();
+        else executeCommand();
+      });
       input.addEventListener('keypress', (e) => {
         if (e.key === 'Enter') executeCommand();
       });
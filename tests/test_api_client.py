@@ -0,0 +1,195 @@
+"""Tests for the API client's classify batching and warm-up."""
+
+import asyncio
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.intentgine.api_client import IntentgineAPIClient
+from custom_components.intentgine.client_pool import get_client_pool
+from custom_components.intentgine.const import (
+    CONF_KEEPALIVE,
+    JWT_REFRESH_MARGIN_SECONDS,
+    WARM_INTERVAL_SECONDS,
+)
+from custom_components.intentgine.deadline import (
+    DeadlineExceeded,
+    reset_deadline,
+    start_deadline,
+)
+
+
+class _StandInClient(IntentgineAPIClient):
+    """Client answering requests itself after a delay."""
+
+    def __init__(self, delay: float = 0.0, **kwargs):
+        super().__init__("key", "http://api.invalid", **kwargs)
+        self.delay = delay
+        self.requests = []
+        self.exchanges = 0
+
+    async def _exchange_token(self):
+        self.exchanges += 1
+        self._jwt_token = "jwt"
+        self._jwt_expires_at = time.time() + 3600
+
+    async def _send_request(self, method, path, data, priority):
+        self.requests.append((method, path, data))
+        self.last_request = time.monotonic()
+        await asyncio.sleep(self.delay)
+        if path == "/v1/banks":
+            return []
+        if path == "/v1/classify-batch":
+            return {
+                "results": [
+                    {"input": text, "classification": text.split()[-1]}
+                    for text in data["data"]
+                ]
+            }
+        return {"results": [{"classification": data["data"].split()[-1]}]}
+
+
+async def _classify(client, text, timeout=None):
+    token = start_deadline(timeout)
+    try:
+        result = await client.classify(text, "ha-area-router-v1")
+    finally:
+        reset_deadline(token)
+    return result["results"][0]["classification"]
+
+
+async def test_concurrent_calls_share_one_request():
+    client = _StandInClient(classify_batch_size=8, classify_batch_wait=0.01)
+    results = await asyncio.gather(
+        _classify(client, "lights kitchen"),
+        _classify(client, "blinds office"),
+        _classify(client, "lights kitchen"),
+    )
+
+    assert results == ["kitchen", "office", "kitchen"]
+    assert [path for _, path, _ in client.requests] == ["/v1/classify-batch"]
+    assert client.requests[0][2]["data"] == ["lights kitchen", "blinds office"]
+    assert client.batcher.batched_calls == 3
+
+
+async def test_full_batch_is_sent_without_waiting():
+    client = _StandInClient(classify_batch_size=2, classify_batch_wait=10)
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            _classify(client, "lights kitchen"), _classify(client, "lights office")
+        ),
+        1,
+    )
+    assert results == ["kitchen", "office"]
+
+
+async def test_opener_deadline_does_not_fail_the_joiners():
+    client = _StandInClient(0.2, classify_batch_size=8, classify_batch_wait=0.01)
+    opener, joiner = await asyncio.gather(
+        _classify(client, "lights kitchen", timeout=0.05),
+        _classify(client, "lights office", timeout=2),
+        return_exceptions=True,
+    )
+
+    assert isinstance(opener, DeadlineExceeded)
+    assert joiner == "office"
+
+
+async def test_batch_stops_at_the_last_deadline():
+    client = _StandInClient(5, classify_batch_size=8, classify_batch_wait=0.01)
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            _classify(client, "lights kitchen", timeout=0.05),
+            _classify(client, "lights office", timeout=0.1),
+            return_exceptions=True,
+        ),
+        1,
+    )
+    assert all(isinstance(result, DeadlineExceeded) for result in results)
+    await asyncio.sleep(0)
+    assert not client.batcher._tasks
+
+
+async def test_failed_batch_fails_every_caller():
+    client = _StandInClient(classify_batch_size=8, classify_batch_wait=0.01)
+
+    async def broken(method, path, data, priority):
+        raise Exception("API error 500: down")
+
+    client._send_request = broken
+    results = await asyncio.gather(
+        _classify(client, "lights kitchen"),
+        _classify(client, "lights office"),
+        return_exceptions=True,
+    )
+    assert [str(result) for result in results] == ["API error 500: down"] * 2
+
+
+async def test_pool_stats_come_from_public_attributes():
+    client = _StandInClient(ssl_context=False)
+    assert "pool" not in client.connection_stats()
+    await client._get_session()
+    try:
+        assert client.connection_stats()["pool"] == {
+            "limit": 100,
+            "limit_per_host": 0,
+        }
+    finally:
+        await client.close()
+
+
+async def test_warm_up_refreshes_a_token_close_to_expiry():
+    client = _StandInClient(ssl_context=False)
+    try:
+        await client.warm_up()
+        assert client.exchanges == 1
+        assert client.warmup_duration is not None
+
+        await client.warm_up()
+        assert client.exchanges == 1
+
+        margin = WARM_INTERVAL_SECONDS + JWT_REFRESH_MARGIN_SECONDS
+        client._jwt_expires_at = time.time() + margin - 1
+        await client.warm_up()
+        assert client.exchanges == 2
+    finally:
+        await client.close()
+
+
+async def test_keepalive_pings_only_an_idle_connection():
+    client = _StandInClient(ssl_context=False)
+    try:
+        await client.warm_up(ping=True)
+        assert [path for _, path, _ in client.requests] == ["/v1/banks"]
+
+        await client.warm_up(ping=True)
+        assert len(client.requests) == 1
+
+        client.last_request -= WARM_INTERVAL_SECONDS
+        await client.warm_up(ping=True)
+        assert len(client.requests) == 2
+    finally:
+        await client.close()
+
+
+async def test_pool_keeps_the_backend_warm(hass):
+    with patch.object(IntentgineAPIClient, "warm_up") as warm_up:
+        pool = get_client_pool(hass)
+        backend, created = await pool.acquire(
+            "http://api.invalid", "key", {CONF_KEEPALIVE: True}
+        )
+        await hass.async_block_till_done()
+        assert created
+        warm_up.assert_awaited_once_with()
+
+        async_fire_time_changed(
+            hass, dt_util.utcnow() + timedelta(seconds=WARM_INTERVAL_SECONDS + 1)
+        )
+        await hass.async_block_till_done()
+        warm_up.assert_awaited_with(ping=True)
+
+        await pool.release(backend)
+        assert len(pool) == 0
@@ -0,0 +1,204 @@
+"""Tests for bulk planning and execution in the command handler."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from homeassistant.exceptions import HomeAssistantError
+from pytest_homeassistant_custom_component.common import async_mock_service
+
+from custom_components.intentgine.area_matcher import AreaMatcher
+from custom_components.intentgine.command_handler import (
+    CommandHandler,
+    _conflict_free_batches,
+)
+from custom_components.intentgine.usage import UsageTracker
+
+
+def _call(entity_id):
+    return {"tool": "control_light", "parameters": {"entity_id": entity_id}}
+
+
+def _entities(batches):
+    return [[call["parameters"]["entity_id"] for call in batch] for batch in batches]
+
+
+def test_distinct_entities_share_a_batch():
+    calls = [_call("light.a"), _call("light.b"), _call("light.c")]
+    assert _entities(_conflict_free_batches(calls, 8)) == [
+        ["light.a", "light.b", "light.c"]
+    ]
+
+
+def test_batches_are_capped_at_batch_size():
+    calls = [_call(f"light.{n}") for n in range(5)]
+    assert [len(batch) for batch in _conflict_free_batches(calls, 2)] == [2, 2, 1]
+
+
+def test_repeated_entity_waits_for_the_next_batch_in_order():
+    calls = [_call("light.a"), _call("light.b"), _call("light.a"), _call("light.c")]
+    assert _entities(_conflict_free_batches(calls, 8)) == [
+        ["light.a", "light.b"],
+        ["light.a", "light.c"],
+    ]
+
+
+def test_entity_lists_conflict_with_any_member():
+    calls = [_call(["light.a", "light.b"]), _call("light.c"), _call("light.b")]
+    assert _entities(_conflict_free_batches(calls, 8)) == [
+        [["light.a", "light.b"], "light.c"],
+        ["light.b"],
+    ]
+
+
+def test_no_calls_no_batches():
+    assert _conflict_free_batches([], 8) == []
+
+
+# Each area's light, as the API would resolve "<action> the <area> light"
+RESOLVED = {
+    "kitchen": "light.kitchen",
+    "office": "light.office",
+    "garage": "switch.garage",
+}
+
+
+async def _resolve(query, toolsets, banks=None):
+    area = next(area for area in RESOLVED if area in query)
+    action = "turn_off" if " off " in f" {query} " else "turn_on"
+    return {
+        "resolved": {
+            "tool": "control_light",
+            "parameters": {"entity_id": RESOLVED[area], "action": action},
+        }
+    }
+
+
+@pytest.fixture
+def handler(hass):
+    """A command handler resolving through a stand-in API client."""
+    toolset_manager = SimpleNamespace(
+        toolsets={},
+        toolset_pushes={},
+        entity_names={},
+        name_index={},
+        area_names={area: [area] for area in RESOLVED},
+        correction_bank_id=None,
+        area_matcher=AreaMatcher({area: [area] for area in RESOLVED}),
+        ensure_synced=AsyncMock(),
+    )
+    api_client = SimpleNamespace(
+        usage=UsageTracker(hass), resolve=AsyncMock(side_effect=_resolve)
+    )
+    return CommandHandler(hass, api_client, toolset_manager)
+
+
+async def test_bulk_runs_every_command_once(hass, handler):
+    calls = async_mock_service(hass, "light", "turn_on")
+    results = await handler.handle_commands(
+        ["turn on the kitchen light", "Turn on the kitchen light!", "office light on"]
+    )
+
+    assert [result["success"] for result in results] == [True, True, True]
+    assert results[1]["deduplicated"] is True
+    assert handler.api_client.resolve.await_count == 2
+    assert sorted(call.data["entity_id"] for call in calls) == [
+        "light.kitchen",
+        "light.office",
+    ]
+
+
+async def test_bulk_failing_call_does_not_fail_the_others(hass, handler):
+    async_mock_service(hass, "light", "turn_on")
+
+    async def broken(call):
+        raise HomeAssistantError("relay offline")
+
+    hass.services.async_register("switch", "turn_on", broken)
+    results = await handler.handle_commands(
+        ["turn on the garage light", "turn on the kitchen light"]
+    )
+
+    assert [result["success"] for result in results] == [False, True]
+    assert results[0]["results"][0]["success"] is False
+
+
+async def test_bulk_stops_at_the_deadline(hass, handler):
+    async def slow(call):
+        await asyncio.sleep(5)
+
+    hass.services.async_register("light", "turn_on", slow)
+    results = await handler.handle_commands(
+        ["turn on the kitchen light", "turn off the kitchen light"], timeout=0.1
+    )
+
+    first, second = (result["results"][0] for result in results)
+    assert first["success"] is False
+    assert "ran out of time" in first["error"]
+    assert second["ran"] is False
+    assert second["error"].endswith("not run")
+
+
+LIGHTS = {
+    "name": "control_light",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "entity_id": {
+                "type": "string",
+                "enum": ["light.kitchen", "light.office", "switch.garage"],
+            },
+            "action": {"type": "string", "enum": ["turn_on", "turn_off"]},
+        },
+        "required": ["entity_id", "action"],
+    },
+}
+
+
+async def test_entity_list_is_validated_and_dispatched_in_one_call(hass, handler):
+    calls = async_mock_service(hass, "light", "turn_on")
+    handler.toolset_manager.toolsets["kitchen"] = [LIGHTS]
+    parameters = {"entity_id": ["light.kitchen", "office"], "action": "on"}
+
+    assert await handler.execute_tool("control_light", parameters, "kitchen")
+    assert calls[0].data["entity_id"] == ["light.kitchen", "light.office"]
+    assert (
+        handler.responder.describe("control_light", parameters, None)
+        == "Kitchen and office turned on."
+    )
+
+
+async def test_entity_list_of_mixed_domains_is_rejected(hass, handler):
+    calls = async_mock_service(hass, "light", "turn_on")
+    handler.toolset_manager.toolsets["kitchen"] = [LIGHTS]
+    parameters = {"entity_id": ["light.kitchen", "switch.garage"], "action": "turn_on"}
+
+    assert not await handler.execute_tool("control_light", parameters, "kitchen")
+    assert not calls
+
+
+async def test_untemplated_call_is_only_described_remotely_on_request(hass, handler):
+    async_mock_service(hass, "light", "turn_on")
+    handler.api_client.resolve = AsyncMock(
+        return_value={
+            "resolved": {
+                "tool": "light_scene",
+                "parameters": {"entity_id": "light.kitchen", "action": "turn_on"},
+            }
+        }
+    )
+    handler.api_client.respond = AsyncMock(
+        return_value={"response": {"text": "Scene set."}}
+    )
+
+    local = await handler.handle_command(
+        "kitchen scene please", use_respond=True, remote_response=False
+    )
+    assert local["success"] is True
+    assert "response" not in local
+    handler.api_client.respond.assert_not_awaited()
+
+    remote = await handler.handle_command("kitchen scene please", use_respond=True)
+    assert remote["response"] == "Scene set."
+    handler.api_client.respond.assert_awaited_once()
@@ -0,0 +1,72 @@
+"""Tests for the local correction index's matching guards."""
+
+from unittest.mock import MagicMock
+
+from custom_components.intentgine.correction_index import (
+    CorrectionIndex,
+    normalize_query,
+)
+
+CALL = {"entity_id": "light.kitchen", "action": "turn_off"}
+
+
+def _index():
+    index = CorrectionIndex(MagicMock())
+    index._insert(
+        normalize_query("turn off the kitchen lights"),
+        "control_light",
+        CALL,
+        "ha-kitchen-v1",
+        0,
+    )
+    index._insert(
+        normalize_query("set the kitchen lights to 50%"),
+        "control_light",
+        {"entity_id": "light.kitchen", "brightness": 128},
+        "ha-kitchen-v1",
+        0,
+    )
+    return index
+
+
+def test_exact_and_similar_phrasings_hit():
+    index = _index()
+    assert index.lookup("Turn off the kitchen lights!")["parameters"] == CALL
+    assert index.lookup("turn off kitchen lights now")["parameters"] == CALL
+
+
+def test_other_entity_never_matches():
+    index = _index()
+    index._insert(
+        normalize_query("turn on kitchen light"),
+        "control_light",
+        {"entity_id": "light.kitchen", "action": "turn_on"},
+        "ha-kitchen-v1",
+        0,
+    )
+    assert index.lookup("turn on the kitchen ceiling light") is None
+    assert index.lookup("turn on the kitchen lamp") is None
+    assert index.lookup("just turn on kitchen light")["parameters"] == {
+        "entity_id": "light.kitchen",
+        "action": "turn_on",
+    }
+
+
+def test_other_action_never_matches():
+    assert _index().lookup("turn on the kitchen lights") is None
+
+
+def test_other_number_never_matches():
+    assert _index().lookup("set the kitchen lights to 20%") is None
+
+
+def test_corrections_never_match():
+    assert _index().lookup("no, turn off the kitchen lights") is None
+
+
+def test_least_recently_used_is_evicted():
+    index = CorrectionIndex(MagicMock(), max_entries=1)
+    index._insert(("a",), "tool_a", {}, "x", 0)
+    index._insert(("b",), "tool_b", {}, "x", 0)
+    assert len(index) == 1
+    assert index.lookup("a") is None
@@ -0,0 +1,95 @@
+"""Tests for per-command deadlines."""
+
+import asyncio
+
+import pytest
+import voluptuous as vol
+
+from custom_components.intentgine import EXECUTE_COMMAND_SCHEMA
+from custom_components.intentgine.const import COMMAND_TIMEOUT_SECONDS
+from custom_components.intentgine.deadline import (
+    DeadlineExceeded,
+    current_deadline,
+    deadline_at,
+    no_deadline,
+    remaining,
+    reset_deadline,
+    stage,
+    start_deadline,
+)
+
+
+async def test_stage_overrunning_the_deadline_is_cancelled():
+    token = start_deadline(0.05)
+    try:
+        with pytest.raises(DeadlineExceeded) as err:
+            async with stage("calling light.turn_on"):
+                await asyncio.sleep(1)
+    finally:
+        reset_deadline(token)
+
+    assert err.value.stage == "calling light.turn_on"
+    assert str(err.value) == "ran out of time calling light.turn_on"
+
+
+async def test_stage_does_not_start_once_time_is_up():
+    token = start_deadline(0)
+    started = False
+    try:
+        with pytest.raises(DeadlineExceeded):
+            async with stage("resolving"):
+                started = True
+    finally:
+        reset_deadline(token)
+
+    assert not started
+
+
+async def test_stage_without_a_deadline_is_unbounded():
+    async with stage("syncing"):
+        await asyncio.sleep(0)
+    assert remaining() is None
+
+
+async def test_nested_deadline_never_extends_the_outer_one():
+    outer = start_deadline(1)
+    when = current_deadline()
+    inner = start_deadline(60)
+    try:
+        assert current_deadline() == when
+        assert remaining() <= 1
+    finally:
+        reset_deadline(inner)
+        reset_deadline(outer)
+
+    assert current_deadline() is None
+
+
+async def test_no_deadline_and_deadline_at_replace_the_callers_budget():
+    token = start_deadline(0.01)
+    try:
+        with no_deadline():
+            assert remaining() is None
+            async with stage("keeping the session warm"):
+                await asyncio.sleep(0.02)
+
+        later = asyncio.get_running_loop().time() + 30
+        with deadline_at(later):
+            assert current_deadline() == later
+        assert current_deadline() < later
+    finally:
+        reset_deadline(token)
+
+
+def test_execute_command_schema_bounds_the_timeout():
+    assert EXECUTE_COMMAND_SCHEMA({"query": "lights on"})["timeout"] == (
+        COMMAND_TIMEOUT_SECONDS
+    )
+    assert EXECUTE_COMMAND_SCHEMA({"query": "lights on", "timeout": "30"})[
+        "timeout"
+    ] == 30.0
+    for timeout in (0, -5, 301, "soon"):
+        with pytest.raises(vol.Invalid):
+            EXECUTE_COMMAND_SCHEMA({"query": "lights on", "timeout": timeout})
+    with pytest.raises(vol.Invalid):
+        EXECUTE_COMMAND_SCHEMA({"timeout": 10})
@@ -0,0 +1,80 @@
+"""Tests for local splitting of conjunctive commands."""
+
+from custom_components.intentgine.area_matcher import AreaMatcher
+from custom_components.intentgine.intent_splitter import split_command
+
+MATCHER = AreaMatcher(
+    {
+        "ha-kitchen-v1": ["kitchen"],
+        "ha-office-v1": ["office", "study"],
+        "ha-master_bedroom-v1": ["master bedroom"],
+    }
+)
+
+
+def test_parts_joined_by_and_form_one_stage():
+    assert split_command(
+        "Turn on the kitchen lights and close the office blinds", MATCHER
+    ) == [
+        [
+            ("Turn on the kitchen lights", "ha-kitchen-v1"),
+            ("close the office blinds", "ha-office-v1"),
+        ]
+    ]
+
+
+def test_commas_and_aliases():
+    assert split_command(
+        "turn off the kitchen lights, dim the study lamp, and open the "
+        "master bedroom blinds",
+        MATCHER,
+    ) == [
+        [
+            ("turn off the kitchen lights", "ha-kitchen-v1"),
+            ("dim the study lamp", "ha-office-v1"),
+            ("open the master bedroom blinds", "ha-master_bedroom-v1"),
+        ]
+    ]
+
+
+def test_then_starts_a_new_stage():
+    assert split_command(
+        "close the office blinds and then turn on the office lights", MATCHER
+    ) == [
+        [("close the office blinds", "ha-office-v1")],
+        [("turn on the office lights", "ha-office-v1")],
+    ]
+
+
+def test_single_command_is_not_split():
+    assert split_command("turn on the kitchen lights", MATCHER) is None
+
+
+def test_part_without_an_action_is_not_split():
+    # "Tom and Jerry lamp" is one name, not two commands
+    assert split_command("turn on the kitchen Tom and Jerry lamp", MATCHER) is None
+
+
+def test_part_leaning_on_the_previous_one_is_not_split():
+    assert split_command("turn on the kitchen lights and dim them", MATCHER) is None
+
+
+def test_part_naming_no_or_two_areas_is_not_split():
+    query = "turn on the lights and close the office blinds"
+    assert split_command(query, MATCHER) is None
+    assert (
+        split_command(
+            "turn on the kitchen and office lights and close the office blinds",
+            MATCHER,
+        )
+        is None
+    )
+
+
+def test_correction_is_not_split():
+    assert (
+        split_command(
+            "no, turn on the kitchen lights and close the office blinds", MATCHER
+        )
+        is None
+    )
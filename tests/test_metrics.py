@@ -0,0 +1,79 @@
+"""Tests for the Prometheus text exposition of the metrics."""
+
+from types import SimpleNamespace
+
+from custom_components.intentgine.metrics import (
+    Counter,
+    Histogram,
+    IntentgineMetrics,
+)
+
+
+def test_counter_renders_labels_and_escapes_values():
+    counter = Counter("things_total", "Things", ("kind",))
+    counter.inc('say "hi"\n')
+    counter.inc("plain", amount=2.5)
+    assert list(counter.samples()) == [
+        'things_total{kind="say \\"hi\\"\\n"} 1',
+        'things_total{kind="plain"} 2.5',
+    ]
+
+
+def test_unlabelled_counter_has_no_braces():
+    counter = Counter("runs_total", "Runs")
+    counter.inc()
+    assert list(counter.samples()) == ["runs_total 1"]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("wait_seconds", "Wait", ("path",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, "api")
+    assert list(histogram.samples()) == [
+        'wait_seconds_bucket{path="api",le="0.1"} 1',
+        'wait_seconds_bucket{path="api",le="1"} 3',
+        'wait_seconds_bucket{path="api",le="+Inf"} 4',
+        'wait_seconds_sum{path="api"} 4.05',
+        'wait_seconds_count{path="api"} 4',
+    ]
+
+
+def _entry(account):
+    handler = SimpleNamespace(
+        correction_index=[],
+        _recent_results={},
+        semantic_cache=[],
+        validator=SimpleNamespace(
+            stats=lambda: {"checked": 1, "repaired": 0, "rejected": 0}
+        ),
+        first_command_duration=None,
+    )
+    return {
+        "toolset_manager": SimpleNamespace(toolsets={"ha-kitchen-v1": [{}, {}]}),
+        "command_handler": handler,
+        "usage": SimpleNamespace(remaining_estimate=lambda: 900),
+        "backend": SimpleNamespace(account=account),
+        "api_client": SimpleNamespace(warmup_duration=None, limiter=None),
+    }
+
+
+def test_render_has_help_and_type_and_unique_series():
+    metrics = IntentgineMetrics()
+    metrics.commands.inc("single", "success")
+    text = metrics.render(
+        {"one": _entry("acct1"), "two": _entry("acct1"), "three": _entry("acct2")}
+    )
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "# TYPE intentgine_commands_total counter" in lines
+    assert 'intentgine_commands_total{path="single",outcome="success"} 1' in lines
+    assert "# TYPE intentgine_toolsets gauge" in lines
+    # Per-account gauges once per account, per-entry ones once per entry
+    assert [line for line in lines if line.startswith("intentgine_toolsets{")] == [
+        'intentgine_toolsets{account="acct1"} 1',
+        'intentgine_toolsets{account="acct2"} 1',
+    ]
+    sizes = [line for line in lines if line.startswith("intentgine_cache_entries{")]
+    assert len(sizes) == 9
+    samples = [line.rsplit(" ", 1)[0] for line in lines if not line.startswith("#")]
+    assert len(samples) == len(set(samples))
@@ -0,0 +1,97 @@
+"""Tests for validation and repair of resolved tool parameters."""
+
+from types import SimpleNamespace
+
+from custom_components.intentgine.param_validator import ParameterValidator
+
+LIGHT = {
+    "name": "control_light",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "entity_id": {"type": "string", "enum": ["light.kitchen", "light.pantry"]},
+            "action": {"type": "string", "enum": ["turn_on", "turn_off", "toggle"]},
+            "brightness": {"type": "number", "minimum": 0, "maximum": 255},
+        },
+        "required": ["entity_id", "action"],
+    },
+}
+
+
+def _validator():
+    manager = SimpleNamespace(
+        toolsets={"ha-kitchen-v1": [LIGHT]},
+        entity_names={
+            "light.kitchen": "Kitchen Lights",
+            "light.pantry": "Pantry",
+            "light.office": "Office Lights",
+        },
+    )
+    return ParameterValidator(manager)
+
+
+def test_valid_call_passes_unchanged():
+    params = {"entity_id": "light.kitchen", "action": "turn_on"}
+    validator = _validator()
+    assert validator.validate("ha-kitchen-v1", "control_light", params) is None
+    assert params == {"entity_id": "light.kitchen", "action": "turn_on"}
+    assert validator.repaired == 0
+
+
+def test_friendly_name_and_action_alias_are_repaired():
+    params = {"entity_id": "kitchen lights", "action": "on", "brightness": "300"}
+    validator = _validator()
+    assert validator.validate("ha-kitchen-v1", "control_light", params) is None
+    assert params == {
+        "entity_id": "light.kitchen",
+        "action": "turn_on",
+        "brightness": 255,
+    }
+    assert validator.repaired == 1
+
+
+def test_missing_action_is_taken_from_the_query():
+    params = {"entity_id": "light.pantry"}
+    assert (
+        _validator().validate(
+            "ha-kitchen-v1", "control_light", params, "pantry light off"
+        )
+        is None
+    )
+    assert params["action"] == "turn_off"
+
+
+def test_entity_of_another_area_is_rejected():
+    params = {"entity_id": "light.office", "action": "turn_on"}
+    validator = _validator()
+    error = validator.validate("ha-kitchen-v1", "control_light", params)
+    assert error == "Invalid entity_id 'light.office' for control_light"
+    assert validator.rejected == 1
+
+
+def test_entity_lists_are_checked_item_by_item():
+    validator = _validator()
+    params = {"entity_id": ["light.kitchen", "pantry"], "action": "turn_on"}
+    assert validator.validate("ha-kitchen-v1", "control_light", params) is None
+    assert params["entity_id"] == ["light.kitchen", "light.pantry"]
+
+    params = {"entity_id": ["light.kitchen", "light.office"], "action": "turn_on"}
+    assert validator.validate("ha-kitchen-v1", "control_light", params) is not None
+
+
+def test_unknown_tool_is_rejected_and_unsynced_toolset_passes():
+    validator = _validator()
+    assert validator.validate("ha-kitchen-v1", "control_cover", {}) is not None
+    assert validator.validate("ha-garage-v1", "control_cover", {}) is None
+
+
+def test_score_ranks_without_repairing():
+    validator = _validator()
+    exact = {"entity_id": "light.kitchen", "action": "turn_on"}
+    fuzzy = {"entity_id": "kitchen lights", "action": "turn_on"}
+    wrong = {"entity_id": "light.office", "action": "turn_on"}
+    assert validator.score("ha-kitchen-v1", "control_light", exact) == 1.0
+    assert validator.score("ha-kitchen-v1", "control_light", fuzzy) == 0.5
+    assert validator.score("ha-kitchen-v1", "control_light", wrong) == 0.0
+    assert fuzzy["entity_id"] == "kitchen lights"
+    assert validator.checked == 0
@@ -0,0 +1,50 @@
+"""Tests for the on-demand profiler and its service schema."""
+
+import asyncio
+import sys
+
+import pytest
+import voluptuous as vol
+
+from custom_components.intentgine import PROFILE_SCHEMA
+from custom_components.intentgine.profiler import Profiler
+
+
+def _busy():
+    return sum(range(20000))
+
+
+async def _command():
+    await asyncio.sleep(0)
+    return _busy()
+
+
+async def test_report_covers_the_run(hass):
+    profiler = Profiler(hass)
+    profiler.arm("command", 2)
+
+    assert await profiler.run("command", "turn on the lamp", _command) == _busy()
+    assert profiler.pending_commands == 1
+    report = profiler.reports[-1]
+    assert report["label"] == "turn on the lamp"
+    assert any("_busy" in row["function"] for row in report["functions"])
+
+
+async def test_previous_profile_hook_is_restored(hass):
+    def hook(frame, event, arg):
+        pass
+
+    sys.setprofile(hook)
+    try:
+        await Profiler(hass).run("command", "query", _command)
+        assert sys.getprofile() is hook
+    finally:
+        sys.setprofile(None)
+
+
+def test_service_schema_checks_target_and_count():
+    assert PROFILE_SCHEMA({}) == {"target": "command", "count": 1}
+    assert PROFILE_SCHEMA({"target": "sync", "count": "3"})["count"] == 3
+    for data in ({"count": 0}, {"count": "many"}, {"target": "everything"}):
+        with pytest.raises(vol.Invalid):
+            PROFILE_SCHEMA(data)
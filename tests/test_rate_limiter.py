@@ -0,0 +1,89 @@
+"""Tests for the client-side token bucket."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from custom_components.intentgine.rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    RateLimiter,
+    request_priority,
+)
+
+
+def test_command_paths_are_interactive():
+    assert request_priority("/v1/resolve") == PRIORITY_INTERACTIVE
+    assert request_priority("/v1/toolsets") == PRIORITY_BACKGROUND
+
+
+async def test_burst_is_free_then_calls_wait_for_a_refill():
+    limiter = RateLimiter(rate=50, burst=3)
+    for _ in range(3):
+        assert await limiter.acquire() == 0.0
+
+    waited = await limiter.acquire()
+    assert waited == pytest.approx(1 / 50, abs=0.015)
+
+
+async def test_background_leaves_the_reserve_for_commands():
+    limiter = RateLimiter(rate=0.1, burst=4, reserve=2)
+    await limiter.acquire(PRIORITY_BACKGROUND)
+    await limiter.acquire(PRIORITY_BACKGROUND)
+
+    background = asyncio.ensure_future(limiter.acquire(PRIORITY_BACKGROUND))
+    await asyncio.sleep(0)
+    assert limiter.queued(PRIORITY_BACKGROUND) == 1
+
+    assert await limiter.acquire(PRIORITY_INTERACTIVE) == 0.0
+    assert await limiter.acquire(PRIORITY_INTERACTIVE) == 0.0
+    assert not background.done()
+    background.cancel()
+
+
+async def test_queued_commands_go_before_queued_background_calls():
+    limiter = RateLimiter(rate=100, burst=1)
+    await limiter.acquire()
+    order = []
+
+    async def take(priority):
+        await limiter.acquire(priority)
+        order.append(priority)
+
+    background = asyncio.ensure_future(take(PRIORITY_BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(take(PRIORITY_INTERACTIVE))
+    await asyncio.gather(background, interactive)
+
+    assert order == [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND]
+
+
+async def test_cancelled_waiter_does_not_hold_up_the_queue():
+    limiter = RateLimiter(rate=50, burst=1)
+    await limiter.acquire()
+    first = asyncio.ensure_future(limiter.acquire())
+    second = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    first.cancel()
+    assert await asyncio.wait_for(second, 1) < 0.05
+    assert limiter.queued(PRIORITY_INTERACTIVE) == 0
+
+
+async def test_raising_the_rate_wakes_waiters_sooner():
+    limiter = RateLimiter(rate=0.01, burst=1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    limiter.set_rate(100)
+    assert await asyncio.wait_for(waiter, 1) < 0.05
+
+
+async def test_waits_are_reported_per_class():
+    metrics = MagicMock()
+    limiter = RateLimiter(rate=10, burst=2, metrics=metrics)
+    await limiter.acquire(PRIORITY_BACKGROUND)
+
+    metrics.rate_limit_wait.observe.assert_called_once_with(0.0, PRIORITY_BACKGROUND)
@@ -0,0 +1,159 @@
+"""Tests for the semantic cache's matching guards and upkeep."""
+
+from types import SimpleNamespace
+
+from custom_components.intentgine.const import SEMANTIC_CACHE_IDF_REFRESH
+from custom_components.intentgine.semantic_cache import SemanticCache, canonical_query
+from custom_components.intentgine.toolset_manager import build_name_index
+
+AREA = "ha-kitchen-v1"
+OFFICE = "ha-office-v1"
+
+ENTITY_NAMES = {
+    "light.kitchen": "Kitchen Lights",
+    "light.lamp": "Lamp",
+    "light.desk_lamp": "Desk Lamp",
+}
+
+
+def _manager():
+    entity_areas = {
+        "light.kitchen": AREA,
+        "light.lamp": AREA,
+        "light.desk_lamp": OFFICE,
+    }
+    return SimpleNamespace(
+        toolsets={},
+        toolset_pushes={},
+        name_index=build_name_index(entity_areas, ENTITY_NAMES),
+        area_names={AREA: ["kitchen"], OFFICE: ["office"]},
+    )
+
+
+def _cache(threshold=0.8):
+    cache = SemanticCache(_manager(), threshold=threshold)
+    cache.add(
+        "turn off the kitchen lights",
+        "control_light",
+        {"entity_id": "light.kitchen", "action": "turn_off"},
+        AREA,
+    )
+    cache.add(
+        "turn on the lamp",
+        "control_light",
+        {"entity_id": "light.lamp", "action": "turn_on"},
+        AREA,
+    )
+    cache.add(
+        "set the kitchen lights to 50%",
+        "control_light",
+        {"entity_id": "light.kitchen", "action": "turn_on", "brightness": 128},
+        AREA,
+    )
+    return cache
+
+
+def test_canonical_query_folds_filler_and_synonyms():
+    text, guard = canonical_query("Please switch off the kitchen lights")
+    assert text == "off kitchen lights"
+    assert guard == canonical_query("kill the lights in the kitchen")[1]
+
+
+def test_key_covers_only_known_names():
+    names = frozenset({"kitchen", "lights"})
+    assert (
+        canonical_query("kitchen lights off right away", names)[1]
+        == canonical_query("off kitchen lights", names)[1]
+    )
+    assert (
+        canonical_query("kitchen lights off right away")[1]
+        != canonical_query("off kitchen lights")[1]
+    )
+
+
+def test_paraphrase_reuses_the_call():
+    hit = _cache().lookup("kill the kitchen lights")
+    assert hit["parameters"] == {"entity_id": "light.kitchen", "action": "turn_off"}
+    assert hit["similarity"] >= 0.8
+
+
+def test_paraphrase_with_other_words_is_left_to_the_threshold():
+    query = "kitchen lights off right away"
+    hit = _cache(threshold=0.5).lookup(query)
+    assert hit["parameters"]["entity_id"] == "light.kitchen"
+    assert hit["similarity"] < 0.99
+    assert _cache(threshold=0.99).lookup(query) is None
+
+
+def test_other_action_never_matches():
+    assert _cache().lookup("turn on the kitchen lights") is None
+
+
+def test_other_number_never_matches():
+    assert _cache().lookup("set the kitchen lights to 20%") is None
+
+
+def test_other_entity_or_area_names_never_match():
+    assert _cache().lookup("turn on the desk lamp") is None
+    assert _cache().lookup("turn off the office lights") is None
+
+
+def test_corrections_never_match():
+    assert _cache().lookup("no, turn off the kitchen lights") is None
+
+
+def test_sync_drops_calls_for_removed_entities():
+    cache = _cache()
+    cache.toolset_manager.toolsets[AREA] = [
+        {
+            "name": "control_light",
+            "parameters": {"properties": {"entity_id": {"enum": ["light.kitchen"]}}},
+        }
+    ]
+    assert cache.lookup("switch on lamp") is None
+    assert len(cache) == 2
+
+
+def test_only_the_hit_partition_is_revalidated():
+    cache = _cache()
+    cache.add(
+        "turn on the desk lamp",
+        "control_light",
+        {"entity_id": "light.desk_lamp", "action": "turn_on"},
+        OFFICE,
+    )
+    tools = [
+        {
+            "name": "control_light",
+            "parameters": {"properties": {"entity_id": {"enum": ["light.kitchen"]}}},
+        }
+    ]
+    cache.toolset_manager.toolsets = {AREA: tools, OFFICE: tools}
+
+    assert cache.lookup("switch off the kitchen lights") is not None
+    assert cache._partitions[AREA].tools is tools
+    assert cache._partitions[OFFICE].tools is None
+    assert cache.lookup("desk lamp on please") is None
+    assert cache._partitions[OFFICE].tools is tools
+    assert len(cache._partitions[OFFICE]) == 0
+
+
+def test_full_partition_keeps_refreshing_idf():
+    cache = SemanticCache(_manager(), threshold=0.8, max_entries=8)
+    for index in range(8):
+        cache.add(f"turn on scene {index}", "scene", {}, AREA)
+    partition = cache._partitions[AREA]
+    refreshed = partition.idf.copy()
+
+    for index in range(SEMANTIC_CACHE_IDF_REFRESH):
+        cache.add(f"activate mood number {index} now", "scene", {}, AREA)
+    assert len(partition) == 8
+    assert partition.changes == 0
+    assert (partition.idf != refreshed).any()
+
+
+def test_zero_threshold_disables_the_cache():
+    cache = SemanticCache(_manager(), 0)
+    cache.add("turn on the lamp", "control_light", {"entity_id": "light.lamp"}, AREA)
+    assert len(cache) == 0
+    assert cache.lookup("turn on the lamp") is None
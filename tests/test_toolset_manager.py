@@ -0,0 +1,77 @@
+"""Tests for area ranking and sync staleness in the toolset manager."""
+
+import time
+from unittest.mock import AsyncMock
+
+from custom_components.intentgine.const import SYNC_FREQUENCIES
+from custom_components.intentgine.toolset_manager import (
+    STALE_AFTER_SECONDS,
+    ToolsetManager,
+    build_name_index,
+)
+
+KITCHEN = "ha-kitchen-v1"
+OFFICE = "ha-office-v1"
+BEDROOM = "ha-bedroom-v1"
+
+SNAPSHOT = {
+    "toolsets": {KITCHEN: [], OFFICE: [], BEDROOM: []},
+    "entity_names": {
+        "light.kitchen_ceiling": "Kitchen Ceiling Light",
+        "light.desk": "Desk Lamp",
+        "fan.desk": "Desk Fan",
+        "light.reading": "Reading Lamp",
+    },
+    "entity_areas": {
+        "light.kitchen_ceiling": KITCHEN,
+        "light.desk": OFFICE,
+        "fan.desk": OFFICE,
+        "light.reading": BEDROOM,
+    },
+    "area_names": {KITCHEN: ["kitchen"], OFFICE: ["office"], BEDROOM: ["bedroom"]},
+    "correction_bank_id": None,
+}
+
+
+def test_name_index_holds_each_word_once_per_entity():
+    index = build_name_index(
+        {"light.a": KITCHEN, "light.b": OFFICE},
+        {"light.a": "Lamp lamp", "light.b": "Desk Lamp"},
+    )
+    assert index["lamp"] == [("light.a", KITCHEN, 1), ("light.b", OFFICE, 2)]
+    assert index["desk"] == [("light.b", OFFICE, 2)]
+
+
+async def test_named_areas_rank_first_then_entity_matches(hass):
+    manager = ToolsetManager(hass, None)
+    manager.restore(SNAPSHOT)
+
+    assert manager.rank_areas("turn on the desk lamp") == [OFFICE, BEDROOM]
+    assert manager.rank_areas("bedroom desk fan") == [BEDROOM, OFFICE]
+    assert manager.rank_areas("ceiling light please") == [KITCHEN]
+    assert manager.rank_areas("make it warmer") == []
+
+
+async def test_commands_refresh_stale_toolsets_whatever_the_schedule(hass):
+    manager = ToolsetManager(hass, None)
+    manager.sync_all = AsyncMock()
+    manager.sync_interval = SYNC_FREQUENCIES["daily"]
+
+    manager._last_sync = time.time() - STALE_AFTER_SECONDS / 2
+    await manager.ensure_synced()
+    manager.sync_all.assert_not_awaited()
+
+    manager._last_sync = time.time() - STALE_AFTER_SECONDS - 60
+    await manager.ensure_synced()
+    manager.sync_all.assert_awaited_once()
+
+
+async def test_manual_schedule_syncs_only_once_on_demand(hass):
+    manager = ToolsetManager(hass, None)
+    manager.sync_all = AsyncMock()
+    manager.sync_interval = None
+
+    await manager.ensure_synced()
+    manager._last_sync = time.time() - 7 * 24 * 3600
+    await manager.ensure_synced()
+    manager.sync_all.assert_awaited_once()
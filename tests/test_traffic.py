@@ -0,0 +1,68 @@
+"""Tests for traffic recording and its rotation."""
+
+import gzip
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from custom_components.intentgine.traffic import TrafficRecorder, read_traffic
+
+TRACE = {"duration_ms": 1.0, "spans": []}
+
+
+def _manager():
+    manager = SimpleNamespace(area_matcher=object(), sync=0)
+    manager.snapshot = lambda: {"sync": manager.sync}
+    return manager
+
+
+def _record(recorder, query):
+    token = recorder.start()
+    recorder.finish(token, query, {}, {"success": True}, TRACE)
+
+
+def _types(path):
+    return [
+        record.get("query") or f"toolsets {record['sync']}"
+        for record in read_traffic(path)
+    ]
+
+
+async def test_batch_is_one_gzip_member(hass, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    recorder = TrafficRecorder(hass, _manager(), enabled=True, entry_id="e")
+    for query in ("one", "two", "three"):
+        _record(recorder, query)
+    await recorder.async_close()
+
+    assert _types(recorder.path) == ["toolsets 0", "one", "two", "three"]
+    with open(recorder.path, "rb") as file:
+        assert file.read().count(b"\x1f\x8b\x08") == 1
+
+
+async def test_rotated_file_starts_with_the_toolsets_in_force(hass, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    manager = _manager()
+    recorder = TrafficRecorder(hass, manager, enabled=True, entry_id="e")
+    with patch("custom_components.intentgine.traffic.TRAFFIC_MAX_BYTES", 1):
+        _record(recorder, "one")
+        await recorder.async_close()
+        manager.sync, manager.area_matcher = 1, object()
+        _record(recorder, "two")
+        _record(recorder, "three")
+        await recorder.async_close()
+        _record(recorder, "four")
+        await recorder.async_close()
+
+    assert _types(f"{recorder.path}.2") == ["toolsets 0", "one"]
+    assert _types(f"{recorder.path}.1") == ["toolsets 1", "two", "three"]
+    assert _types(recorder.path) == ["toolsets 1", "four"]
+
+
+async def test_queued_records_are_written_at_shutdown(hass, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    recorder = TrafficRecorder(hass, _manager(), enabled=True, entry_id="e")
+    _record(recorder, "one")
+    await hass.async_stop(force=True)
+
+    with gzip.open(recorder.path, "rt") as file:
+        assert len(file.read().splitlines()) == 2
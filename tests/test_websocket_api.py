@@ -0,0 +1,89 @@
+"""Tests for the command progress subscription."""
+
+import asyncio
+
+from homeassistant.setup import async_setup_component
+
+from custom_components.intentgine.const import DOMAIN
+from custom_components.intentgine.websocket_api import (
+    async_register_websocket_commands,
+)
+
+
+class _Handler:
+    """Stand-in command handler reporting one progress event."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = False
+        self.error = None
+        self.block = False
+
+    async def handle_command(self, query, use_respond, on_progress, timeout):
+        on_progress("classified", {"area": "kitchen"})
+        self.started.set()
+        if self.error:
+            raise self.error
+        if self.block:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        return {"success": True, "query": query}
+
+
+async def _client(hass, hass_ws_client, handler):
+    assert await async_setup_component(hass, "websocket_api", {})
+    async_register_websocket_commands(hass)
+    hass.data[DOMAIN] = {"entry": {"command_handler": handler}}
+    return await hass_ws_client(hass)
+
+
+async def test_progress_is_streamed_then_the_result(hass, hass_ws_client):
+    client = await _client(hass, hass_ws_client, _Handler())
+    await client.send_json({"id": 1, "type": "intentgine/command", "query": "lamp"})
+
+    assert (await client.receive_json())["success"]
+    event = (await client.receive_json())["event"]
+    assert event == {"event": "classified", "area": "kitchen"}
+    event = (await client.receive_json())["event"]
+    assert event == {"event": "result", "result": {"success": True, "query": "lamp"}}
+
+
+async def test_failed_command_ends_the_subscription(hass, hass_ws_client):
+    handler = _Handler()
+    handler.error = RuntimeError("boom")
+    client = await _client(hass, hass_ws_client, handler)
+    await client.send_json({"id": 1, "type": "intentgine/command", "query": "lamp"})
+
+    assert (await client.receive_json())["success"]
+    assert (await client.receive_json())["event"]["event"] == "classified"
+    error = await client.receive_json()
+    assert error["success"] is False
+    assert error["error"] == {"code": "unknown_error", "message": "boom"}
+
+    await client.send_json({"id": 2, "type": "unsubscribe_events", "subscription": 1})
+    assert (await client.receive_json())["error"]["code"] == "not_found"
+
+
+async def test_unsubscribing_cancels_the_command(hass, hass_ws_client):
+    handler = _Handler()
+    handler.block = True
+    client = await _client(hass, hass_ws_client, handler)
+    await client.send_json({"id": 1, "type": "intentgine/command", "query": "lamp"})
+    assert (await client.receive_json())["success"]
+    assert (await client.receive_json())["event"]["event"] == "classified"
+    await handler.started.wait()
+
+    await client.send_json({"id": 2, "type": "unsubscribe_events", "subscription": 1})
+    assert (await client.receive_json())["success"]
+    await hass.async_block_till_done()
+    assert handler.cancelled
+
+
+async def test_not_loaded(hass, hass_ws_client):
+    client = await _client(hass, hass_ws_client, None)
+    hass.data[DOMAIN] = {}
+    await client.send_json({"id": 1, "type": "intentgine/command", "query": "lamp"})
+    assert (await client.receive_json())["error"]["code"] == "not_found"